@@ -1,16 +1,60 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-import requests
+import asyncio
+import httpx
 import json
+import logging
+import math
+import time
 from datetime import datetime, timedelta
 import os
 from typing import Optional, List, Dict
 from dotenv import load_dotenv
+from weather_cache import WeatherCache
+from forecast import ForecastSeries, weather_at, weather_columns_at
+from geometry import GeometryCache
+from route_weather import RouteSampler, aggregate_route_weather, route_coordinates
+from weather_prefetch import WeatherPrefetcher, tile_grid
+from hubs import DELHI_HUB_LEGS, DELHI_INDUSTRIAL_HUBS
+from route_store import RouteStore, parse_departure
+from spatial_index import SpatialIndex, haversine_km
+from hub_matrix import HubMatrix
+from departure_windows import (
+    HUB_TIMEZONE, PEAK_SLOWDOWN, candidate_departures, compile_peak_masks, pick_windows,
+    travel_minutes_by_slot
+)
+from eta_model import WEATHER_COLUMNS as ETA_WEATHER_COLUMNS, EtaFeatures, EtaModel, RouteLog, minute_of_day
+from local_router import RoadGraph
+import numpy as np
+import vrp_solver
+from truck_matching import TruckMatcher, TruckTrip, densify
+from warehouse_index import WarehouseIndex
+from scoring import (
+    ScoredBatch, condition_bits, condition_bits_batch, delay_from_bits, hub_features, risk_from_bits,
+    risk_score, score_batch, suggestions_from_bits, weather_impact_from_bits
+)
+from coalescing import IdempotencyConflict, IdempotencyStore, RequestCoalescer
+from providers import CircuitBreaker, Provider, ProviderChain, ProviderChainError, ProviderDeclined
+from quota import (
+    BACKGROUND, BATCH, PRIORITY_NAMES, QuotaDispatcher, QuotaExhausted, call_priority, with_priority
+)
+from metrics import (
+    FALLBACKS, REQUEST_LATENCY, Gauge, add_span, configure_logging, registry, request_spans,
+    server_timing, track_upstream
+)
 
 # Load environment variables from config.env
 load_dotenv('config.env')
 
+# Structured logging - JSON lines by default, LOG_FORMAT=text for local development
+configure_logging(os.getenv("LOG_LEVEL", "INFO"), os.getenv("LOG_FORMAT", "json"))
+logger = logging.getLogger("cargocrazee.ai")
+
+# Server-Timing header on every response, or only when the client sends X-Timing: 1
+TIMING_HEADER = os.getenv("TIMING_HEADER", "false").lower() in ("1", "true", "yes")
+
 app = FastAPI(title="CargoCrazee AI Service", version="1.0.0")
 
 # CORS setup - Allow Netlify frontend
@@ -27,97 +71,394 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Idempotent-Replayed", "Server-Timing"],
 )
 
 # API Keys from environment variables
 OPENROUTE_API_KEY = os.getenv("OPENROUTE_API_KEY")
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 
+# Upstream base URLs - overridable to point at local stubs (see benchmarks/)
+OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "https://api.openweathermap.org").rstrip("/")
+OPENROUTE_BASE_URL = os.getenv("OPENROUTE_BASE_URL", "https://api.openrouteservice.org").rstrip("/")
+OSRM_BASE_URL = os.getenv("OSRM_BASE_URL", "https://router.project-osrm.org").rstrip("/")
+
 # Validate API keys
 if not OPENROUTE_API_KEY:
     raise ValueError("OPENROUTE_API_KEY environment variable is required")
 if not OPENWEATHER_API_KEY:
     raise ValueError("OPENWEATHER_API_KEY environment variable is required")
 
-# Delhi Industrial Hubs Dataset
-DELHI_INDUSTRIAL_HUBS = {
-    "Okhla Industrial Area": {
-        "name": "Okhla Industrial Area",
-        "coordinates": {"lat": 28.5275, "lon": 77.2750},
-        "type": "Electronics & Textiles",
-        "traffic_level": "High",
-        "peak_hours": ["09:00-11:00", "17:00-19:00"]
-    },
-    "Naraina Industrial Area": {
-        "name": "Naraina Industrial Area", 
-        "coordinates": {"lat": 28.6167, "lon": 77.1167},
-        "type": "Engineering & Manufacturing",
-        "traffic_level": "Medium",
-        "peak_hours": ["08:00-10:00", "16:00-18:00"]
-    },
-    "Wazirpur Industrial Area": {
-        "name": "Wazirpur Industrial Area",
-        "coordinates": {"lat": 28.7000, "lon": 77.1000},
-        "type": "Steel & Engineering",
-        "traffic_level": "High",
-        "peak_hours": ["07:00-09:00", "15:00-17:00"]
-    },
-    "Mayapuri Industrial Area": {
-        "name": "Mayapuri Industrial Area",
-        "coordinates": {"lat": 28.6333, "lon": 77.1167},
-        "type": "Automotive & Spare Parts",
-        "traffic_level": "Medium",
-        "peak_hours": ["08:00-10:00", "16:00-18:00"]
-    },
-    "Kirti Nagar Industrial Area": {
-        "name": "Kirti Nagar Industrial Area",
-        "coordinates": {"lat": 28.6500, "lon": 77.1333},
-        "type": "Furniture & Wood",
-        "traffic_level": "Low",
-        "peak_hours": ["09:00-11:00", "17:00-19:00"]
-    },
-    "Lawrence Road Industrial Area": {
-        "name": "Lawrence Road Industrial Area",
-        "coordinates": {"lat": 28.6833, "lon": 77.1167},
-        "type": "Textiles & Garments",
-        "traffic_level": "High",
-        "peak_hours": ["08:00-10:00", "16:00-18:00"]
-    },
-    "Shahdara Industrial Area": {
-        "name": "Shahdara Industrial Area",
-        "coordinates": {"lat": 28.6833, "lon": 77.2833},
-        "type": "Electronics & Plastic",
-        "traffic_level": "Medium",
-        "peak_hours": ["07:00-09:00", "15:00-17:00"]
-    },
-    "Patparganj Industrial Area": {
-        "name": "Patparganj Industrial Area",
-        "coordinates": {"lat": 28.6167, "lon": 77.3167},
-        "type": "Pharmaceuticals & Chemicals",
-        "traffic_level": "Low",
-        "peak_hours": ["09:00-11:00", "17:00-19:00"]
-    },
-    "Bawana Industrial Area": {
-        "name": "Bawana Industrial Area",
-        "coordinates": {"lat": 28.8000, "lon": 77.0333},
-        "type": "Food Processing & Textiles",
-        "traffic_level": "Medium",
-        "peak_hours": ["08:00-10:00", "16:00-18:00"]
-    },
-    "Narela Industrial Area": {
-        "name": "Narela Industrial Area",
-        "coordinates": {"lat": 28.8500, "lon": 77.1000},
-        "type": "Heavy Industries & Manufacturing",
-        "traffic_level": "Low",
-        "peak_hours": ["07:00-09:00", "15:00-17:00"]
-    }
-}
+# Shared upstream HTTP client - pooled keep-alive connections reused across requests
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+http_client: Optional[httpx.AsyncClient] = None
+background_tasks: List[asyncio.Task] = []
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared async HTTP client, creating it on first use"""
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE
+            ),
+            timeout=httpx.Timeout(10.0, connect=5.0)
+        )
+    return http_client
+
+# Weather cache - quantized lat/lon cells, TTL + LRU, single-flight on concurrent misses
+weather_cache = WeatherCache(
+    cell_size_deg=float(os.getenv("WEATHER_CACHE_CELL_DEG", "0.1")),
+    ttl_seconds=float(os.getenv("WEATHER_CACHE_TTL_SECONDS", "600")),
+    max_entries=int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "1024"))
+)
+
+# Persistent route store - snapped origin/destination + departure bucket, shared via SQLite
+route_store = RouteStore(
+    os.getenv("ROUTE_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "route_cache.sqlite3")),
+    snap_decimals=int(os.getenv("ROUTE_STORE_SNAP_DECIMALS", "3")),
+    bucket_minutes=int(os.getenv("ROUTE_STORE_BUCKET_MINUTES", "60"))
+)
+ROUTE_STORE_WARM_LANES = int(os.getenv("ROUTE_STORE_WARM_LANES", "500"))
+ROUTE_STORE_FLUSH_SECONDS = float(os.getenv("ROUTE_STORE_FLUSH_SECONDS", "60"))
+
+# Offline road graph (CSV edge list) - "primary" routes locally first, "fallback" after OpenRoute fails, "off" disables.
+# Off unless a real graph is configured; the bundled synthetic grid is for tests only
+LOCAL_ROUTER_GRAPH_PATH = os.getenv("LOCAL_ROUTER_GRAPH_PATH", "")
+LOCAL_ROUTER_MODE = os.getenv("LOCAL_ROUTER_MODE", "off").lower()
+road_graph: Optional[RoadGraph] = None
+if LOCAL_ROUTER_MODE != "off":
+    if not LOCAL_ROUTER_GRAPH_PATH:
+        raise ValueError(f"LOCAL_ROUTER_MODE={LOCAL_ROUTER_MODE} requires LOCAL_ROUTER_GRAPH_PATH")
+    road_graph = RoadGraph.from_csv(LOCAL_ROUTER_GRAPH_PATH, max_snap_km=float(os.getenv("LOCAL_ROUTER_MAX_SNAP_KM", "5")))
+    logger.info("Local road graph loaded", extra={"fields": {"nodes": len(road_graph), "path": LOCAL_ROUTER_GRAPH_PATH}})
+
+# Multi-stop VRP solver - parallel restarts in a process pool under a time budget
+VRP_WORKERS = int(os.getenv("VRP_WORKERS", str(vrp_solver.default_workers())))
+VRP_MAX_STOPS = int(os.getenv("VRP_MAX_STOPS", "2000"))
+VRP_MAX_TIME_BUDGET_SECONDS = float(os.getenv("VRP_MAX_TIME_BUDGET_SECONDS", "30"))
+
+# Shared-truck matching - live trips indexed by route corridor and departure window
+truck_matcher = TruckMatcher(
+    corridor_km=float(os.getenv("TRUCK_CORRIDOR_KM", "2")),
+    bucket_minutes=int(os.getenv("TRUCK_WINDOW_BUCKET_MINUTES", "30")),
+    rate_per_km=float(os.getenv("TRUCK_RATE_PER_KM", "25"))
+)
+
+# Micro-warehouse search - listings indexed by grid cell and price band, shortlisted by straight-line
+# distance and ranked by routed travel time
+warehouse_index = WarehouseIndex(cell_km=float(os.getenv("WAREHOUSE_CELL_KM", "1")))
+WAREHOUSE_HUB_RADIUS_KM = float(os.getenv("WAREHOUSE_HUB_RADIUS_KM", "10"))
+WAREHOUSE_CORRIDOR_KM = float(os.getenv("WAREHOUSE_CORRIDOR_KM", "3"))
+WAREHOUSE_RANK_MAX = int(os.getenv("WAREHOUSE_RANK_MAX", "300"))
+WAREHOUSE_MAX_PAGE_SIZE = 50
+# Upper bound on radius_km in warehouse and nearest-hub searches; the grid walk grows with its square
+SEARCH_MAX_RADIUS_KM = float(os.getenv("SEARCH_MAX_RADIUS_KM", "50"))
+
+# Batch optimization limits - OpenRoute matrix API caps sources x destinations per call
+BATCH_MAX_ROUTES = int(os.getenv("BATCH_MAX_ROUTES", "1000"))
+MATRIX_MAX_ELEMENTS = int(os.getenv("MATRIX_MAX_ELEMENTS", "3500"))
+
+# Route geometry output - Douglas-Peucker simplified to GEOMETRY_TOLERANCE_PX screen pixels at the requested zoom
+GEOMETRY_FORMATS = (None, "polyline", "geojson", "none")
+GEOMETRY_DEFAULT_ZOOM = float(os.getenv("GEOMETRY_DEFAULT_ZOOM", "14"))
+geometry_cache = GeometryCache(
+    max_entries=int(os.getenv("GEOMETRY_CACHE_MAX_ENTRIES", "2048")),
+    tolerance_px=float(os.getenv("GEOMETRY_TOLERANCE_PX", "1.0"))
+)
+
+# Optional /route/optimize response sections; "steps" (turn-by-turn) is opt-in and requested upstream only when asked
+DEFAULT_RESPONSE_FIELDS = frozenset({"weather_context", "industrial_hubs", "ai_insights", "suggestions"})
+RESPONSE_FIELDS = DEFAULT_RESPONSE_FIELDS | {"steps"}
+
+# Departure-window sweep limits - routes per request and candidate slots per route
+DEPARTURE_MAX_ROUTES = int(os.getenv("DEPARTURE_MAX_ROUTES", "500"))
+DEPARTURE_MAX_SLOTS = int(os.getenv("DEPARTURE_MAX_SLOTS", "2000"))
+
+# Streaming optimization jobs - results are written as they finish, at most ROUTE_JOB_MAX_CONCURRENCY in flight
+ROUTE_JOB_MAX_ROUTES = int(os.getenv("ROUTE_JOB_MAX_ROUTES", "20000"))
+ROUTE_JOB_CONCURRENCY = int(os.getenv("ROUTE_JOB_CONCURRENCY", "16"))
+ROUTE_JOB_MAX_CONCURRENCY = int(os.getenv("ROUTE_JOB_MAX_CONCURRENCY", "64"))
+
+# Request coalescing - identical in-flight /route/optimize requests (coordinates snapped to
+# REQUEST_COALESCE_SNAP_DECIMALS, departure in REQUEST_COALESCE_BUCKET_MINUTES buckets) share one computation
+REQUEST_COALESCE_SNAP_DECIMALS = int(os.getenv("REQUEST_COALESCE_SNAP_DECIMALS", "4"))
+REQUEST_COALESCE_BUCKET_MINUTES = int(os.getenv("REQUEST_COALESCE_BUCKET_MINUTES", "5"))
+route_coalescer = RequestCoalescer()
+
+# Idempotency-Key replay window for successful /route/optimize responses
+idempotency_store = IdempotencyStore(
+    ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "300")),
+    max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+)
+
+# Scrape-time gauges over the in-process caches
+registry.register(Gauge(
+    "cargocrazee_cache_hit_ratio", "Hit ratio of the in-process caches",
+    lambda: [({"cache": "weather"}, weather_cache.stats()["hit_ratio"]), ({"cache": "routes"}, route_store.stats()["hit_ratio"])]
+))
+registry.register(Gauge(
+    "cargocrazee_cache_entries", "Entries held by the in-process caches",
+    lambda: [({"cache": "weather"}, weather_cache.stats()["entries"]), ({"cache": "routes"}, route_store.stats()["memory_entries"])]
+))
+
+registry.register(Gauge(
+    "cargocrazee_provider_circuit_open", "1 while a provider's circuit breaker is skipping it",
+    lambda: [
+        ({"chain": chain.name, "provider": name}, int(state["state"] == "open"))
+        for chain in (route_chain, weather_chain) for name, state in chain.stats()["providers"].items()
+    ]
+))
+registry.register(Gauge(
+    "cargocrazee_quota_remaining", "Upstream budget left: bucket tokens this minute and calls left today",
+    lambda: [
+        ({"quota": name, "window": window}, value)
+        for name, stats in quota_dispatcher.stats().items()
+        for window, value in (("minute", stats["tokens"]), ("day", stats["remaining_today"]))
+        if value is not None
+    ]
+))
+
+def route_template(scope: dict) -> str:
+    """Path template of the matched route, keeping metric labels bounded"""
+    endpoint = scope.get("endpoint")
+    for route in app.routes:
+        if getattr(route, "endpoint", None) is endpoint and endpoint is not None:
+            return route.path
+    return "unmatched"
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    spans = []
+    token = request_spans.set(spans)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        request_spans.reset(token)
+        REQUEST_LATENCY.observe(elapsed, method=request.method, path=route_template(request.scope), status=str(status))
+    if TIMING_HEADER or request.headers.get("x-timing") == "1":
+        response.headers["Server-Timing"] = server_timing(spans, elapsed)
+    return response
+
+@app.on_event("startup")
+async def open_http_client():
+    get_http_client()
+    warmed = route_store.warm(ROUTE_STORE_WARM_LANES)
+    logger.info("Route store warmed", extra={"fields": {"lanes": warmed}})
+    background_tasks.append(asyncio.create_task(rebuild_hub_matrix_periodically()))
+    background_tasks.append(asyncio.create_task(flush_route_hits_periodically()))
+    if WEATHER_PREFETCH_ENABLED:
+        background_tasks.append(asyncio.create_task(with_priority(BACKGROUND, weather_prefetcher.run())))
+    await asyncio.to_thread(vrp_solver.warm_pool, VRP_WORKERS)
+
+@app.on_event("shutdown")
+async def close_http_client():
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    route_store.close()
+    vrp_solver.shutdown_pool()
+
+# Spatial index over hub coordinates - haversine k-nearest, radius and bulk lookups
+HUB_INDEX = SpatialIndex.from_records(DELHI_INDUSTRIAL_HUBS)
+
+# Hub peak hours compiled once into per-minute masks (rows in HUB_INDEX order)
+HUB_PEAK_MASKS = compile_peak_masks(HUB_INDEX.payloads)
+HUB_PEAK_SLOWDOWN = np.array([PEAK_SLOWDOWN.get(hub["traffic_level"], 0.3) for hub in HUB_INDEX.payloads])
+HUB_HIGH_TRAFFIC = np.array([hub["traffic_level"] == "High" for hub in HUB_INDEX.payloads])
+
+# All-pairs hub travel matrix - memory-mapped .npy shared by workers, rebuilt from observed routes
+hub_matrix = HubMatrix(
+    os.getenv("HUB_MATRIX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "hub_matrix.npy")),
+    DELHI_INDUSTRIAL_HUBS,
+    DELHI_HUB_LEGS
+)
+hub_matrix.load_or_build()
+HUB_MATRIX_REBUILD_SECONDS = float(os.getenv("HUB_MATRIX_REBUILD_SECONDS", "3600"))
+HUB_OBSERVATION_RADIUS_KM = float(os.getenv("HUB_OBSERVATION_RADIUS_KM", "2"))
+
+# Fast ETA estimates - regression trained offline (train_eta.py) on the route log of upstream answers;
+# the hub-matrix seeding heuristic is served until a model has been trained
+eta_model = EtaModel.load(
+    os.getenv("ETA_MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "eta_model.json")),
+    EtaFeatures(DELHI_INDUSTRIAL_HUBS)
+) or EtaModel(EtaFeatures(DELHI_INDUSTRIAL_HUBS))
+# Logging upstream answers for training is opt-in; the file rotates once it reaches ETA_TRAINING_LOG_MAX_MB
+ETA_TRAINING_LOG_PATH = os.getenv("ETA_TRAINING_LOG_PATH", "")
+ETA_TRAINING_LOG_MAX_MB = float(os.getenv("ETA_TRAINING_LOG_MAX_MB", "100"))
+route_log = RouteLog(ETA_TRAINING_LOG_PATH, int(ETA_TRAINING_LOG_MAX_MB * 1024 * 1024)) if ETA_TRAINING_LOG_PATH else None
+ETA_MAX_ROUTES = int(os.getenv("ETA_MAX_ROUTES", "10000"))
+
+def record_hub_observation(origin: dict, destination: dict, route: dict):
+    """Feed a real routed trip into the hub matrix when both ends sit at hubs"""
+    origin_hub = find_nearest_industrial_hub(origin["lat"], origin["lon"])
+    dest_hub = find_nearest_industrial_hub(destination["lat"], destination["lon"])
+    if not origin_hub or not dest_hub:
+        return
+    near_origin = haversine_km(origin["lat"], origin["lon"], origin_hub["coordinates"]["lat"], origin_hub["coordinates"]["lon"])
+    near_dest = haversine_km(destination["lat"], destination["lon"], dest_hub["coordinates"]["lat"], dest_hub["coordinates"]["lon"])
+    if near_origin <= HUB_OBSERVATION_RADIUS_KM and near_dest <= HUB_OBSERVATION_RADIUS_KM:
+        hub_matrix.record_observation(origin_hub["name"], dest_hub["name"], route["distance_km"], route["estimated_time_minutes"])
+
+async def rebuild_hub_matrix_periodically():
+    """Rebuild the hub matrix when new observations arrive and pick up other workers' rebuilds"""
+    while True:
+        await asyncio.sleep(HUB_MATRIX_REBUILD_SECONDS)
+        try:
+            if hub_matrix.pending_observations:
+                await asyncio.to_thread(hub_matrix.rebuild)
+            else:
+                hub_matrix.reload()
+        except Exception:
+            logger.exception("Hub matrix rebuild error")
+
+async def flush_route_hits_periodically():
+    """Persist route store hit counters so lane popularity survives a crash, not only a clean shutdown"""
+    while True:
+        await asyncio.sleep(ROUTE_STORE_FLUSH_SECONDS)
+        try:
+            await asyncio.to_thread(route_store.flush_hits)
+        except Exception:
+            logger.exception("Route store hit flush error")
 
 # Request/Response models
 class RouteRequest(BaseModel):
     origin: dict
     destination: dict
     departure_time: Optional[str] = None
+    geometry_format: Optional[str] = None  # "polyline", "geojson" or "none" (skip fetching geometry)
+    zoom: Optional[float] = None  # map zoom the geometry is simplified for
+    fields: Optional[List[str]] = None  # response sections, see RESPONSE_FIELDS
+
+class RouteGeometryRequest(BaseModel):
+    origin: dict
+    destination: dict
+    departure_time: Optional[str] = None
+    zoom: Optional[float] = None
+    format: str = "polyline"  # "polyline" or "geojson"
+
+class BatchRouteRequest(BaseModel):
+    routes: List[RouteRequest]
+
+class RouteJobRequest(BaseModel):
+    routes: List[RouteRequest]
+    concurrency: Optional[int] = None
+    format: str = "ndjson"  # "ndjson" or "sse"
+
+class DepartureWindowRoute(BaseModel):
+    origin: dict
+    destination: dict
+
+class DepartureWindowRequest(BaseModel):
+    routes: List[DepartureWindowRoute]
+    earliest: Optional[str] = None  # first candidate departure (ISO 8601, naive = Delhi time), defaults to now
+    horizon_hours: float = 24
+    step_minutes: int = 15
+    windows: int = 3
+    tolerance: float = 0.05  # slots within this share of a window's best score join the window
+    risk_weight: float = 0.5
+    include_slots: bool = False
+
+class NearestHubRequest(BaseModel):
+    points: List[dict]
+    k: int = 1
+    radius_km: Optional[float] = None
+
+class VRPStop(BaseModel):
+    id: str
+    lat: float
+    lon: float
+    weight: float = 0
+    window_start: Optional[str] = None  # "HH:MM"
+    window_end: Optional[str] = None  # "HH:MM"
+    service_minutes: float = 10
+
+class VRPVehicle(BaseModel):
+    id: str
+    capacity: float
+
+class VRPRequest(BaseModel):
+    depot: dict
+    stops: List[VRPStop]
+    vehicles: List[VRPVehicle]
+    departure_time: Optional[str] = None
+    time_budget_seconds: float = 3.0
+    risk_weight: float = 0.5
+
+class TruckTripRequest(BaseModel):
+    id: str
+    origin: dict
+    destination: dict
+    departure_time: str
+    window_minutes: float = 60
+    max_weight: float
+    current_weight: float = 0
+    geometry: Optional[dict] = None  # GeoJSON LineString; routed if omitted
+    details: dict = {}  # company, vehicleType, contact... echoed back in matches
+
+class TruckLoadUpdate(BaseModel):
+    current_weight: float
+
+class ConsignmentRequest(BaseModel):
+    pickup: dict
+    drop: dict
+    weight: float
+    ready_time: Optional[str] = None
+    flexibility_minutes: float = 120
+    limit: int = 10
+
+class WarehouseListing(BaseModel):
+    id: str
+    lat: float
+    lon: float
+    available_sqft: float
+    price_per_sqft_day: float
+    details: dict = {}  # name, address, features, contact... echoed back in search results
+
+class WarehouseBatch(BaseModel):
+    warehouses: List[WarehouseListing]
+
+class WarehouseAvailabilityUpdate(BaseModel):
+    available_sqft: Optional[float] = None
+    price_per_sqft_day: Optional[float] = None
+
+class WarehouseSearchRequest(BaseModel):
+    destination: dict
+    origin: Optional[dict] = None  # required with near="route"
+    near: str = "destination_hub"  # or "route"
+    departure_time: Optional[str] = None
+    min_sqft: float = 0
+    max_price_per_sqft_day: Optional[float] = None
+    radius_km: Optional[float] = None
+    page: int = 1
+    limit: int = 10
+
+class EtaRoute(BaseModel):
+    origin: dict
+    destination: dict
+    departure_time: Optional[str] = None
+
+class EtaRequest(BaseModel):
+    routes: List[EtaRoute]
+
+class RiskScoreItem(BaseModel):
+    origin: dict
+    destination: dict
+    estimated_time_minutes: float
+    weather: Optional[dict] = None  # defaults to the origin's current (cached) weather
+
+class RiskScoreRequest(BaseModel):
+    items: List[RiskScoreItem]
 
 class WeatherData(BaseModel):
     temperature: float
@@ -126,56 +467,65 @@ class WeatherData(BaseModel):
     wind_speed: float
     visibility: float
 
-def get_real_weather_data(lat: float, lon: float) -> dict:
-    """Get real weather data from OpenWeather API"""
-    try:
-        url = f"https://api.openweathermap.org/data/2.5/weather"
-        params = {
-            "lat": lat,
-            "lon": lon,
-            "appid": OPENWEATHER_API_KEY,
-            "units": "metric"
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        # Extract weather information
-        weather_info = {
-            "temperature": data["main"]["temp"],
-            "condition": data["weather"][0]["main"],
-            "description": data["weather"][0]["description"],
-            "humidity": data["main"]["humidity"],
-            "wind_speed": data["wind"]["speed"],
-            "visibility": data.get("visibility", 10000) / 1000,  # Convert to km
-            "pressure": data["main"]["pressure"],
-            "feels_like": data["main"]["feels_like"]
-        }
-        
-        # Get forecast for tomorrow
-        forecast_url = f"https://api.openweathermap.org/data/2.5/forecast"
-        forecast_params = {
-            "lat": lat,
-            "lon": lon,
-            "appid": OPENWEATHER_API_KEY,
-            "units": "metric"
-        }
-        
-        forecast_response = requests.get(forecast_url, params=forecast_params, timeout=10)
-        if forecast_response.status_code == 200:
-            forecast_data = forecast_response.json()
-            # Get tomorrow's forecast (24 hours from now)
-            tomorrow_forecast = forecast_data["list"][8]  # 24 hours = 8 * 3 hour intervals
-            weather_info["precipitation_chance"] = tomorrow_forecast.get("pop", 0) * 100
-        else:
-            weather_info["precipitation_chance"] = 0
-            
-        return weather_info
+async def fetch_openweather(lat: float, lon: float) -> dict:
+    """Fetch current weather and forecast from OpenWeather API (raises on failure)"""
+    client = get_http_client()
+    params = {
+        "lat": lat,
+        "lon": lon,
+        "appid": OPENWEATHER_API_KEY,
+        "units": "metric"
+    }
+    
+    async def get(upstream: str, url: str) -> httpx.Response:
+        async with track_upstream(upstream):
+            response = await client.get(url, params=params, timeout=10)
+            response.raise_for_status()
+            return response
+    
+    # Current conditions and forecast are independent - fetch them concurrently
+    response, forecast_response = await asyncio.gather(
+        get("openweather_current", f"{OPENWEATHER_BASE_URL}/data/2.5/weather"),
+        get("openweather_forecast", f"{OPENWEATHER_BASE_URL}/data/2.5/forecast"),
+        return_exceptions=True
+    )
+    if isinstance(response, Exception):
+        raise response
+    
+    data = response.json()
+    
+    # Extract weather information
+    weather_info = {
+        "temperature": data["main"]["temp"],
+        "condition": data["weather"][0]["main"],
+        "description": data["weather"][0]["description"],
+        "humidity": data["main"]["humidity"],
+        "wind_speed": data["wind"]["speed"],
+        "visibility": data.get("visibility", 10000) / 1000,  # Convert to km
+        "pressure": data["main"]["pressure"],
+        "feels_like": data["main"]["feels_like"]
+    }
+    
+    # Keep the whole forecast as a compact series; callers evaluate it at their departure time
+    if not isinstance(forecast_response, Exception):
+        weather_info["forecast_series"] = ForecastSeries.from_openweather(
+            weather_info, data.get("dt", time.time()), forecast_response.json()
+        )
+    weather_info["precipitation_chance"] = 0
         
+    return weather_info
+
+async def get_real_weather_data(lat: float, lon: float, at: Optional[datetime] = None) -> dict:
+    """Get real weather data from OpenWeather API, at a departure time or ETA if given"""
+    return weather_at(await get_weather_snapshot(lat, lon), at)
+
+async def get_weather_snapshot(lat: float, lon: float) -> dict:
+    """Cached weather including its forecast series (served through the weather cache)"""
+    try:
+        return await weather_cache.get_or_fetch(lat, lon, fetch_weather)
     except Exception as e:
-        print(f"Weather API error: {e}")
+        logger.warning("Weather API error, serving default weather", extra={"fields": {"error": str(e)}})
+        FALLBACKS.inc(kind="weather_default")
         # Fallback weather data
         return {
             "temperature": 32.5,
@@ -189,261 +539,377 @@ def get_real_weather_data(lat: float, lon: float) -> dict:
             "precipitation_chance": 20
         }
 
-def get_real_route_data(origin: dict, destination: dict, departure_time: str = None) -> dict:
-    """Get real route data from OpenRoute API"""
+async def get_real_route_data(origin: dict, destination: dict, departure_time: str = None,
+                              geometry: bool = True, steps: bool = False) -> dict:
+    """Get route data, serving repeat lanes from the persistent route store.
+    
+    geometry/steps say what the caller needs; a stored route fetched without them is refetched.
+    """
+    # Memory hits are answered inline; only the SQLite lookup goes to a worker thread
+    cached = route_store.get_memory(origin, destination, departure_time)
+    if cached is None:
+        cached = await asyncio.to_thread(route_store.get, origin, destination, departure_time)
+    if cached is not None and not (geometry and cached.get("geometry_omitted")) \
+            and not (steps and cached.get("steps") is None):
+        return cached
+    
+    route = await fetch_route_data(origin, destination, departure_time, geometry, steps)
+    # Local graph answers are cheap to recompute and not real observations - keep them out of the stores
+    if route.get("provider") != "local":
+        await asyncio.to_thread(route_store.put, origin, destination, departure_time, route)
+        record_hub_observation(origin, destination, route)
+        if route_log is not None:
+            await asyncio.to_thread(log_route_response, origin, destination, departure_time, route)
+    return route
+
+def log_route_response(origin: dict, destination: dict, departure_time: Optional[str], route: dict):
+    """Append an upstream route answer to the ETA training log, with the origin weather if it is cached"""
+    snapshot = weather_cache.peek(origin["lat"], origin["lon"])
+    weather = weather_at(snapshot, parse_departure(departure_time) if departure_time else None) if snapshot else {}
     try:
-        url = "https://api.openrouteservice.org/v2/directions/driving-car"
-        
-        headers = {
-            "Authorization": OPENROUTE_API_KEY,
-            "Content-Type": "application/json"
-        }
-        
-        body = {
-            "coordinates": [
-                [origin["lon"], origin["lat"]],
-                [destination["lon"], destination["lat"]]
-            ],
-            "instructions": True,
-            "geometry": True,
-            "preference": "fastest",
-            "units": "km"
-        }
-        
-        if departure_time:
-            body["departure"] = departure_time
-        
-        response = requests.post(url, headers=headers, json=body, timeout=15)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        if "features" in data and len(data["features"]) > 0:
-            route = data["features"][0]["properties"]["segments"][0]
-            
-            return {
-                "distance_km": route["distance"] / 1000,  # Convert to km
-                "estimated_time_minutes": route["duration"] / 60,  # Convert to minutes
-                "steps": route.get("steps", []),
-                "geometry": data["features"][0]["geometry"]
-            }
-        else:
-            raise Exception("No route found")
-            
+        route_log.append(origin, destination, parse_departure(departure_time), route, weather)
+    except OSError as e:
+        logger.warning("Route log write error", extra={"fields": {"error": str(e), "path": route_log.path}})
+
+async def get_local_route_data(origin: dict, destination: dict) -> Optional[dict]:
+    """Route on the in-process road graph; None if it is not loaded or cannot answer"""
+    if road_graph is None:
+        return None
+    start = time.perf_counter()
+    try:
+        # A* is CPU-bound; run it off the event loop
+        return await asyncio.to_thread(road_graph.route, origin, destination)
     except Exception as e:
-        print(f"Route API error: {e}")
-        # Try OSRM public API as a secondary fallback for routing
-        try:
-            osrm_url = "https://router.project-osrm.org/route/v1/driving/"
-            coords = f"{origin['lon']},{origin['lat']};{destination['lon']},{destination['lat']}"
-            osrm_params = {
-                "overview": "false",
-                "alternatives": "false",
-                "steps": "false"
-            }
-            osrm_resp = requests.get(osrm_url + coords, params=osrm_params, timeout=10)
-            if osrm_resp.status_code == 200:
-                osrm_data = osrm_resp.json()
-                if osrm_data.get("routes"):
-                    r = osrm_data["routes"][0]
-                    print(f"🔍 DEBUG: OSRM API successful - Distance: {r.get('distance', 0) / 1000.0} km")
-                    return {
-                        "distance_km": round((r.get("distance", 0) / 1000.0), 2),
-                        "estimated_time_minutes": round((r.get("duration", 0) / 60.0), 1),
-                        "steps": [],
-                        "geometry": None
-                    }
-        except Exception as osrm_err:
-            print(f"OSRM fallback error: {osrm_err}")
-        # If both primary and OSRM fallbacks fail, propagate error to caller
-        raise Exception("Routing services unavailable")
+        logger.warning("Local routing error", extra={"fields": {"error": str(e)}})
+        return None
+    finally:
+        add_span("local_router", time.perf_counter() - start)
 
-def calculate_real_delhi_distance(origin: dict, destination: dict) -> tuple:
-    """Calculate real distances between Delhi industrial areas"""
+async def fetch_ors_route(origin: dict, destination: dict, departure_time: str = None,
+                          geometry: bool = True, steps: bool = False) -> dict:
+    """Route from the OpenRoute directions API, asking only for the geometry/steps needed (raises on failure)"""
+    client = get_http_client()
+    url = f"{OPENROUTE_BASE_URL}/v2/directions/driving-car"
     
-    print(f"🔍 DEBUG: calculate_real_delhi_distance called")
-    print(f"🔍 DEBUG: Origin: {origin}")
-    print(f"🔍 DEBUG: Destination: {destination}")
+    headers = {
+        "Authorization": OPENROUTE_API_KEY,
+        "Content-Type": "application/json"
+    }
     
-    # Get nearest industrial hubs for origin and destination
-    origin_hub = find_nearest_industrial_hub(origin["lat"], origin["lon"])
-    dest_hub = find_nearest_industrial_hub(destination["lat"], destination["lon"])
+    body = {
+        "coordinates": [
+            [origin["lon"], origin["lat"]],
+            [destination["lon"], destination["lat"]]
+        ],
+        "instructions": steps,
+        "geometry": geometry,
+        "preference": "fastest",
+        "units": "km"
+    }
     
-    print(f"🔍 DEBUG: Origin hub: {origin_hub['name'] if origin_hub else 'None'}")
-    print(f"🔍 DEBUG: Destination hub: {dest_hub['name'] if dest_hub else 'None'}")
+    if departure_time:
+        body["departure"] = departure_time
     
-    if not origin_hub or not dest_hub:
-        print(f"🔍 DEBUG: No hub found, using fallback calculation")
-        # Fallback to coordinate-based calculation
-        lat_diff = abs(origin["lat"] - destination["lat"])
-        lon_diff = abs(origin["lon"] - destination["lon"])
-        distance = (lat_diff + lon_diff) * 111
-        return distance, distance * 2.5
-    
-    # Real Delhi Industrial Areas Distances (in km)
-    delhi_distances = {
-        # Narela Industrial Area (Base Point)
-        ("Narela Industrial Area", "Okhla Industrial Area"): (48, 65),  # 48 km, 65 min
-        ("Narela Industrial Area", "Bawana Industrial Area"): (11, 20),  # 11 km, 20 min
-        ("Narela Industrial Area", "Mayapuri Industrial Area"): (30, 45),  # 30 km, 45 min
-        ("Narela Industrial Area", "Patparganj Industrial Area"): (40, 55),  # 40 km, 55 min
-        ("Narela Industrial Area", "Kirti Nagar Industrial Area"): (28, 30),  # 28 km, 30 min
-        
-        # Okhla Industrial Area
-        ("Okhla Industrial Area", "Bawana Industrial Area"): (54, 70),  # 54 km, 70 min
-        ("Okhla Industrial Area", "Mayapuri Industrial Area"): (23, 40),  # 23 km, 40 min
-        ("Okhla Industrial Area", "Patparganj Industrial Area"): (15, 30),  # 15 km, 30 min
-        ("Okhla Industrial Area", "Kirti Nagar Industrial Area"): (20, 35),  # 20 km, 35 min
-        
-        # Bawana Industrial Area
-        ("Bawana Industrial Area", "Mayapuri Industrial Area"): (32, 45),  # 32 km, 45 min
-        ("Bawana Industrial Area", "Patparganj Industrial Area"): (42, 60),  # 42 km, 60 min
-        ("Bawana Industrial Area", "Kirti Nagar Industrial Area"): (30, 40),  # 30 km, 40 min
-        
-        # Mayapuri Industrial Area
-        ("Mayapuri Industrial Area", "Patparganj Industrial Area"): (28, 40),  # 28 km, 40 min
-        ("Mayapuri Industrial Area", "Kirti Nagar Industrial Area"): (10, 20),  # 10 km, 20 min
+    async with track_upstream("ors_directions"):
+        response = await client.post(url, headers=headers, json=body, timeout=15)
+        response.raise_for_status()
+    
+    data = response.json()
+    
+    if "features" in data and len(data["features"]) > 0:
+        route = data["features"][0]["properties"]["segments"][0]
         
-        # Patparganj Industrial Area
-        ("Patparganj Industrial Area", "Kirti Nagar Industrial Area"): (18, 30),  # 18 km, 30 min
+        result = {
+            "distance_km": route["distance"] / 1000,  # Convert to km
+            "estimated_time_minutes": route["duration"] / 60,  # Convert to minutes
+            "steps": route.get("steps", []) if steps else None,
+            "geometry": data["features"][0].get("geometry") if geometry else None,
+            "provider": "ors"
+        }
+        if not geometry:
+            result["geometry_omitted"] = True
+        return result
+    raise Exception("No route found")
+
+async def fetch_osrm_route(origin: dict, destination: dict, departure_time: str = None,
+                           geometry: bool = True, steps: bool = False) -> dict:
+    """Route from the public OSRM server (raises on failure)"""
+    client = get_http_client()
+    osrm_url = f"{OSRM_BASE_URL}/route/v1/driving/"
+    coords = f"{origin['lon']},{origin['lat']};{destination['lon']},{destination['lat']}"
+    osrm_params = {
+        "overview": "false",
+        "alternatives": "false",
+        "steps": "false"
+    }
+    async with track_upstream("osrm"):
+        osrm_resp = await client.get(osrm_url + coords, params=osrm_params, timeout=10)
+        osrm_resp.raise_for_status()
+    osrm_data = osrm_resp.json()
+    if not osrm_data.get("routes"):
+        raise Exception("No route found")
+    r = osrm_data["routes"][0]
+    return {
+        "distance_km": round((r.get("distance", 0) / 1000.0), 2),
+        "estimated_time_minutes": round((r.get("duration", 0) / 60.0), 1),
+        "steps": [],
+        "geometry": None,
+        "provider": "osrm"
+    }
+
+async def fetch_local_route(origin: dict, destination: dict, departure_time: str = None,
+                            geometry: bool = True, steps: bool = False) -> dict:
+    """Route on the in-process road graph (raises if it cannot answer)"""
+    route = await get_local_route_data(origin, destination)
+    if route is None:
+        raise ProviderDeclined("Local road graph cannot route this pair")
+    return route
+
+# Provider chains - per-request latency budget, circuit breaker per provider, hedge once the running provider passes its p95
+PROVIDER_FAILURE_THRESHOLD = int(os.getenv("PROVIDER_FAILURE_THRESHOLD", "5"))
+PROVIDER_RESET_SECONDS = float(os.getenv("PROVIDER_RESET_SECONDS", "30"))
+
+def make_provider(name: str, call, timeout: float) -> Provider:
+    return Provider(name, call, timeout, CircuitBreaker(PROVIDER_FAILURE_THRESHOLD, PROVIDER_RESET_SECONDS))
+
+# Provider quotas - token bucket per provider and API key (per_minute, optional per_day resetting at UTC midnight).
+# Interactive calls are served first; batch and background calls may only use QUOTA_DAY_SHARE_* of the daily
+# budget, and any call whose wait would exceed its QUOTA_MAX_WAIT_* is declined so the chain falls back at once
+def quota_limits(name: str, per_minute: str, per_day: str) -> dict:
+    return {
+        "per_minute": float(os.getenv(f"{name}_QUOTA_PER_MINUTE", per_minute)),
+        "per_day": int(os.getenv(f"{name}_QUOTA_PER_DAY", per_day))
     }
+
+quota_dispatcher = QuotaDispatcher(
+    {
+        "openweather": quota_limits("OPENWEATHER", "60", "30000"),
+        "ors_directions": quota_limits("ORS_DIRECTIONS", "40", "2000"),
+        "ors_matrix": quota_limits("ORS_MATRIX", "40", "500"),
+        "osrm": quota_limits("OSRM", "60", "0")
+    },
+    burst_seconds=float(os.getenv("QUOTA_BURST_SECONDS", "20")),
+    max_wait=tuple(float(os.getenv(f"QUOTA_MAX_WAIT_{p.upper()}", d)) for p, d in zip(PRIORITY_NAMES, ("2", "3", "3"))),
+    day_share=tuple(float(os.getenv(f"QUOTA_DAY_SHARE_{p.upper()}", d)) for p, d in zip(PRIORITY_NAMES, ("1", "0.9", "0.75")))
+)
+
+def metered(quota: str, api_key: str, fetch, cost: float = 1):
+    """fetch behind its provider quota; identical calls waiting for budget share one request"""
+    quota_dispatcher.quota(quota, api_key)
+    async def call(*args):
+        key = json.dumps(args, sort_keys=True, default=str)
+        return await quota_dispatcher.call(quota, api_key, key, lambda: fetch(*args), cost)
+    return call
+
+ors_provider = make_provider("ors", metered("ors_directions", OPENROUTE_API_KEY, fetch_ors_route), 15)
+osrm_provider = make_provider("osrm", metered("osrm", "", fetch_osrm_route), 10)
+local_provider = make_provider("local", fetch_local_route, 2)
+if road_graph is not None and LOCAL_ROUTER_MODE == "primary":
+    route_providers = [local_provider, ors_provider, osrm_provider]
+elif road_graph is not None and LOCAL_ROUTER_MODE == "fallback":
+    # In-process road graph answers in milliseconds with no network hop
+    route_providers = [ors_provider, local_provider, osrm_provider]
+else:
+    route_providers = [ors_provider, osrm_provider]
+route_chain = ProviderChain("route", route_providers, float(os.getenv("ROUTE_LATENCY_BUDGET_SECONDS", "8")))
+
+# OpenWeather is listed twice so a slow call is hedged with a second request to the same API
+# Each OpenWeather fetch makes two requests (current conditions and forecast)
+openweather_provider = make_provider("openweather", metered("openweather", OPENWEATHER_API_KEY, fetch_openweather, cost=2), 10)
+weather_chain = ProviderChain(
+    "weather", [openweather_provider, openweather_provider], float(os.getenv("WEATHER_LATENCY_BUDGET_SECONDS", "4"))
+)
+
+async def fetch_weather(lat: float, lon: float) -> dict:
+    _, weather = await weather_chain.call(lat, lon)
+    return weather
+
+# Background weather refresh for every hub plus a tile grid over NCR, so request paths read from memory
+WEATHER_PREFETCH_ENABLED = os.getenv("WEATHER_PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+WEATHER_PREFETCH_QUOTA_SHARE = float(os.getenv("WEATHER_PREFETCH_QUOTA_SHARE", "0.5"))
+openweather_quota = quota_dispatcher.quota("openweather", OPENWEATHER_API_KEY)
+WEATHER_GRID_STEP_DEG = float(os.getenv("WEATHER_GRID_STEP_DEG", str(weather_cache.cell_size_deg)))
+# NCR box on whole tenths of a degree, so default tiles sit one per cache cell: 40 cells, which half the
+# default OpenWeather day refreshes every 461 s, inside the 480 s interval and the 600 s cache TTL
+NCR_WEATHER_LAT, NCR_WEATHER_LON = (28.40, 28.90), (76.80, 77.60)
+weather_prefetcher = WeatherPrefetcher(
+    weather_cache, fetch_weather,
+    [(28.6139, 77.2090)]  # Delhi center served by /weather/delhi
+    + [(hub["coordinates"]["lat"], hub["coordinates"]["lon"]) for hub in DELHI_INDUSTRIAL_HUBS.values()]
+    + tile_grid(NCR_WEATHER_LAT, NCR_WEATHER_LON, WEATHER_GRID_STEP_DEG),
+    interval_seconds=float(os.getenv("WEATHER_PREFETCH_SECONDS", "480")),
+    rate_per_minute=float(os.getenv("WEATHER_PREFETCH_RATE_PER_MINUTE", "25")),
+    batch_size=int(os.getenv("WEATHER_PREFETCH_BATCH", "5")),
+    # Pace and interval fit WEATHER_PREFETCH_QUOTA_SHARE of the OpenWeather quota; each cell is two calls
+    calls_per_fetch=2,
+    calls_per_minute=openweather_quota.per_minute * WEATHER_PREFETCH_QUOTA_SHARE,
+    calls_per_day=openweather_quota.per_day * WEATHER_PREFETCH_QUOTA_SHARE,
+    throttled=lambda e: isinstance(e, QuotaExhausted) or getattr(e, "declined", False)
+)
+# Checked against the effective interval: a quota-stretched cadence serves prefetched cells past the cache TTL
+if WEATHER_PREFETCH_ENABLED and weather_prefetcher.interval_seconds >= weather_cache.ttl_seconds:
+    logger.warning("Weather prefetch interval is not below WEATHER_CACHE_TTL_SECONDS; prefetched cells are held until the next round", extra={"fields": {
+        "cells": len(weather_prefetcher.cells), "interval_seconds": round(weather_prefetcher.interval_seconds, 1),
+        "cache_ttl_seconds": weather_cache.ttl_seconds, "hold_seconds": round(weather_prefetcher.hold_seconds, 1)
+    }})
+if WEATHER_PREFETCH_ENABLED and len(weather_prefetcher.cells) > weather_cache.max_entries:
+    logger.warning("Weather cache is smaller than the prefetch grid; prefetched cells will be evicted")
+
+async def fetch_route_data(origin: dict, destination: dict, departure_time: str = None,
+                           geometry: bool = True, steps: bool = False) -> dict:
+    """Get route data from the first routing provider to answer within the latency budget"""
+    try:
+        provider, route = await route_chain.call(origin, destination, departure_time, geometry, steps)
+    except ProviderChainError as e:
+        logger.warning("Routing providers failed", extra={"fields": {"error": str(e)}})
+        # If every routing provider fails, propagate error to caller
+        raise Exception("Routing services unavailable")
+    if provider != route_providers[0].name:
+        FALLBACKS.inc(kind=f"route_{provider}")
+    return route
+
+async def fetch_route_matrix(locations: List[List[float]], sources: List[int], destinations: List[int]) -> dict:
+    """Get a distance/duration matrix from OpenRoute matrix API (raises on failure)"""
+    client = get_http_client()
+    async with track_upstream("ors_matrix"):
+        response = await client.post(
+            f"{OPENROUTE_BASE_URL}/v2/matrix/driving-car",
+            headers={
+                "Authorization": OPENROUTE_API_KEY,
+                "Content-Type": "application/json"
+            },
+            json={
+                "locations": locations,
+                "sources": sources,
+                "destinations": destinations,
+                "metrics": ["distance", "duration"]
+            },
+            timeout=30
+        )
+        response.raise_for_status()
+    return response.json()
+
+route_matrix = metered("ors_matrix", OPENROUTE_API_KEY, fetch_route_matrix)
+
+async def get_batch_route_data(route_requests: List[RouteRequest]) -> List[dict]:
+    """Resolve route data for many pairs: route store first, then matrix lookups, then local estimates"""
+    results: List[Optional[dict]] = [
+        route_store.get_memory(r.origin, r.destination, r.departure_time) for r in route_requests
+    ]
+    pending = [i for i, r in enumerate(results) if r is None]
+    if pending:
+        stored = await asyncio.to_thread(route_store.get_many, [
+            (route_requests[i].origin, route_requests[i].destination, route_requests[i].departure_time)
+            for i in pending
+        ])
+        for i, route in zip(pending, stored):
+            results[i] = route
+        pending = [i for i in pending if results[i] is None]
+    if not pending:
+        return results
     
-    # Check both directions for the route
-    route_key = (origin_hub["name"], dest_hub["name"])
-    reverse_route_key = (dest_hub["name"], origin_hub["name"])
-    
-    print(f"🔍 DEBUG: Checking route: {route_key}")
-    print(f"🔍 DEBUG: Checking reverse route: {reverse_route_key}")
-    print(f"🔍 DEBUG: Available routes: {list(delhi_distances.keys())}")
-    
-    if route_key in delhi_distances:
-        distance, time = delhi_distances[route_key]
-        print(f"🔍 DEBUG: Route found! Distance: {distance} km, Time: {time} min")
-        return distance, time
-    elif reverse_route_key in delhi_distances:
-        distance, time = delhi_distances[reverse_route_key]
-        print(f"🔍 DEBUG: Reverse route found! Distance: {distance} km, Time: {time} min")
-        return distance, time
-    else:
-        print(f"🔍 DEBUG: No specific route found, using hub coordinate calculation")
-        # If no specific route found, calculate based on hub coordinates
-        hub_lat_diff = abs(origin_hub["coordinates"]["lat"] - dest_hub["coordinates"]["lat"])
-        hub_lon_diff = abs(origin_hub["coordinates"]["lon"] - dest_hub["coordinates"]["lon"])
-        estimated_distance = (hub_lat_diff + hub_lon_diff) * 111
-        estimated_time = estimated_distance * 1.5  # More realistic time calculation
-        print(f"🔍 DEBUG: Hub coordinate calculation - Distance: {estimated_distance} km, Time: {estimated_time} min")
-        return estimated_distance, estimated_time
+    # Index unique points so each appears once in the matrix request
+    point_index: Dict[tuple, int] = {}
+    locations: List[List[float]] = []
+    def index_of(point: dict) -> int:
+        key = (round(point["lon"], 5), round(point["lat"], 5))
+        if key not in point_index:
+            point_index[key] = len(locations)
+            locations.append([point["lon"], point["lat"]])
+        return point_index[key]
+    pairs = {i: (index_of(route_requests[i].origin), index_of(route_requests[i].destination)) for i in pending}
+    
+    # Split sources so every call stays under the provider's matrix element limit
+    source_ids = sorted({src for src, _ in pairs.values()})
+    dest_ids = sorted({dst for _, dst in pairs.values()})
+    rows_per_call = max(1, MATRIX_MAX_ELEMENTS // max(1, len(dest_ids)))
+    chunks = [source_ids[k:k + rows_per_call] for k in range(0, len(source_ids), rows_per_call)]
+    matrices = await asyncio.gather(
+        *(route_matrix(locations, chunk, dest_ids) for chunk in chunks),
+        return_exceptions=True
+    )
+    
+    cells: Dict[tuple, tuple] = {}
+    dest_col = {dst: col for col, dst in enumerate(dest_ids)}
+    for chunk, matrix in zip(chunks, matrices):
+        if isinstance(matrix, Exception):
+            logger.warning("Route matrix API error", extra={"fields": {"error": str(matrix), "sources": len(chunk)}})
+            continue
+        for row, src in enumerate(chunk):
+            for dst, col in dest_col.items():
+                distance = matrix["distances"][row][col]
+                duration = matrix["durations"][row][col]
+                if distance is not None and duration is not None:
+                    cells[(src, dst)] = (distance, duration)
+    
+    missing = [i for i, pair in pairs.items() if pair not in cells]
+    for i, pair in pairs.items():
+        if pair in cells:
+            distance, duration = cells[pair]
+            results[i] = {
+                "distance_km": distance / 1000,
+                "estimated_time_minutes": duration / 60,
+                "steps": [],
+                "geometry": None
+            }
+    if missing:
+        # Local fallback from the hub matrix, including each end's access leg to its hub
+        FALLBACKS.inc(amount=len(missing), kind="matrix_local")
+        distance, duration = estimate_route_pairs(
+            [route_requests[i].origin for i in missing], [route_requests[i].destination for i in missing]
+        )
+        for i, km, minutes in zip(missing, distance.tolist(), duration.tolist()):
+            results[i] = {
+                "distance_km": round(km, 2),
+                "estimated_time_minutes": round(minutes, 1),
+                "steps": [],
+                "geometry": None
+            }
+    return results
+
+def estimate_route_pairs(origins: List[dict], destinations: List[dict]) -> tuple:
+    """Estimated (distance_km, minutes) arrays for origin[i] -> destination[i] through the hub matrix"""
+    olat = np.array([p["lat"] for p in origins])
+    olon = np.array([p["lon"] for p in origins])
+    dlat = np.array([p["lat"] for p in destinations])
+    dlon = np.array([p["lon"] for p in destinations])
+    origin_hubs, _ = HUB_INDEX.query(olat, olon, 1)
+    dest_hubs, _ = HUB_INDEX.query(dlat, dlon, 1)
+    return hub_matrix.pair_estimates(
+        olat, olon, [HUB_INDEX.ids[i] for i in origin_hubs[:, 0]],
+        dlat, dlon, [HUB_INDEX.ids[i] for i in dest_hubs[:, 0]]
+    )
+
+def calculate_real_delhi_distance(origin: dict, destination: dict) -> tuple:
+    """Estimated distance (km) and time (minutes) between two points via their nearest hubs"""
+    distance, minutes = estimate_route_pairs([origin], [destination])
+    return float(distance[0]), float(minutes[0])
 
 def find_nearest_industrial_hub(lat: float, lon: float) -> dict:
     """Find the nearest industrial hub to given coordinates"""
-    min_distance = float('inf')
-    nearest_hub = None
-    
-    for hub_name, hub_data in DELHI_INDUSTRIAL_HUBS.items():
-        hub_lat = hub_data["coordinates"]["lat"]
-        hub_lon = hub_data["coordinates"]["lon"]
-        
-        # Calculate distance (simplified)
-        distance = ((lat - hub_lat) ** 2 + (lon - hub_lon) ** 2) ** 0.5
-        
-        if distance < min_distance:
-            min_distance = distance
-            nearest_hub = hub_data
-    
-    return nearest_hub
+    return HUB_INDEX.nearest_payload(lat, lon)
 
 def analyze_weather_impact(weather: dict) -> dict:
     """Analyze how weather affects delivery"""
-    impact = {
-        "severity": "low",
-        "factors": [],
-        "estimated_delay": 0
+    return weather_impact_from_bits(condition_bits(weather))
+
+def route_features(weather: dict, route_data: dict, origin_hub: dict = None, dest_hub: dict = None) -> dict:
+    """Flatten one delivery's weather, route and hub inputs into scoring features"""
+    return {
+        **weather,
+        "estimated_time_minutes": route_data["estimated_time_minutes"],
+        **hub_features(origin_hub, dest_hub)
     }
-    
-    if weather.get("precipitation_chance", 0) > 50:
-        impact["severity"] = "high"
-        impact["factors"].append("Rain expected")
-        impact["estimated_delay"] += 30
-    
-    if weather.get("visibility", 10) < 5:
-        impact["severity"] = "medium"
-        impact["factors"].append("Low visibility")
-        impact["estimated_delay"] += 15
-    
-    if weather.get("wind_speed", 0) > 20:
-        impact["factors"].append("High winds")
-        impact["estimated_delay"] += 10
-    
-    if weather.get("temperature", 25) > 35:
-        impact["factors"].append("High temperature")
-        impact["estimated_delay"] += 5
-    
-    return impact
 
 def generate_ai_suggestions(weather: dict, route_data: dict, origin_hub: dict = None, dest_hub: dict = None) -> List[str]:
     """Generate AI-powered suggestions based on real data"""
-    suggestions = []
-    
-    # Route-based suggestions
-    if route_data["estimated_time_minutes"] > 120:
-        suggestions.append("Consider breaking journey into segments")
-        suggestions.append("Plan for fuel stops along the way")
-    
-    # Weather-based suggestions
-    if weather.get("precipitation_chance", 0) > 50:
-        suggestions.append("Pack waterproof covers for cargo")
-        suggestions.append("Allow extra time for loading/unloading")
-    
-    if weather.get("temperature", 25) > 35:
-        suggestions.append("Ensure proper ventilation for perishable goods")
-        suggestions.append("Monitor temperature-sensitive cargo")
-    
-    if weather.get("visibility", 10) < 5:
-        suggestions.append("Use fog lights and drive carefully")
-        suggestions.append("Consider delaying delivery if possible")
-    
-    # Industrial hub specific suggestions
-    if origin_hub:
-        if origin_hub["traffic_level"] == "High":
-            suggestions.append(f"High traffic expected at {origin_hub['name']} during peak hours")
-        suggestions.append(f"Industrial hub type: {origin_hub['type']} - ensure appropriate packaging")
-    
-    if dest_hub:
-        if dest_hub["traffic_level"] == "High":
-            suggestions.append(f"Plan arrival at {dest_hub['name']} outside peak hours: {dest_hub['peak_hours']}")
-    
-    # General suggestions
-    suggestions.append("Use real-time traffic updates for dynamic routing")
-    suggestions.append("Consider micro-warehouses for last-mile delivery")
-    suggestions.append("Monitor air quality for delivery personnel safety")
-    
-    return suggestions
+    bits = condition_bits(route_features(weather, route_data, origin_hub, dest_hub))
+    return suggestions_from_bits(bits, origin_hub, dest_hub)
 
 def calculate_risk_score(weather: dict, route_data: dict, origin_hub: dict = None, dest_hub: dict = None) -> int:
     """Calculate delivery risk score (0-100)"""
-    risk = 20  # Base risk
-    
-    # Weather risks
-    if weather.get("precipitation_chance", 0) > 50:
-        risk += 25
-    if weather.get("visibility", 10) < 5:
-        risk += 20
-    if weather.get("wind_speed", 0) > 20:
-        risk += 15
-    if weather.get("temperature", 25) > 35:
-        risk += 10
-    
-    # Route risks
-    if route_data["estimated_time_minutes"] > 180:  # More than 3 hours
-        risk += 15
-    
-    # Traffic risks
-    if origin_hub and origin_hub["traffic_level"] == "High":
-        risk += 10
-    if dest_hub and dest_hub["traffic_level"] == "High":
-        risk += 10
-    
-    return min(risk, 100)
+    bits = condition_bits(route_features(weather, route_data, origin_hub, dest_hub))
+    return risk_score(bits)
 
 @app.get("/")
 async def root():
@@ -453,7 +919,7 @@ async def root():
 async def get_delhi_weather():
     """Get Delhi weather forecast using OpenWeather API"""
     delhi_coords = {"lat": 28.6139, "lon": 77.2090}  # Delhi center
-    weather_data = get_real_weather_data(delhi_coords["lat"], delhi_coords["lon"])
+    weather_data = await get_real_weather_data(delhi_coords["lat"], delhi_coords["lon"])
     
     return {
         "location": "Delhi, India",
@@ -463,91 +929,836 @@ async def get_delhi_weather():
         "last_updated": datetime.now().isoformat()
     }
 
-@app.post("/route/optimize")
-async def optimize_delivery_route(request: RouteRequest):
-    """AI-powered route optimization with real weather and route data"""
+def build_optimization_result(request: RouteRequest, weather_origin: dict, weather_destination: dict, route_data: dict,
+                              scored: ScoredBatch = None, row: int = 0, origin_hub: dict = None, dest_hub: dict = None,
+                              route_weather: dict = None) -> dict:
+    """Assemble the /route/optimize response for one origin/destination pair.
     
-    try:
-        # Get real weather data for origin and destination
-        weather_origin = get_real_weather_data(request.origin["lat"], request.origin["lon"])
-        weather_destination = get_real_weather_data(request.destination["lat"], request.destination["lon"])
-        
-        # Get real route data
-        route_data = get_real_route_data(request.origin, request.destination, request.departure_time)
-        
+    Batch callers pass hubs and a pre-computed ScoredBatch row instead of scoring one at a time.
+    Scoring uses the weather sampled along the route when given, else origin weather.
+    """
+    if scored is None:
         # Find nearest industrial hubs
         origin_hub = find_nearest_industrial_hub(request.origin["lat"], request.origin["lon"])
         dest_hub = find_nearest_industrial_hub(request.destination["lat"], request.destination["lon"])
         
-        # Analyze weather impact based on origin weather (as starting conditions)
-        weather_impact = analyze_weather_impact(weather_origin)
+        # Analyze weather impact based on the worst conditions along the route
+        scoring_weather = route_weather or weather_origin
+        weather_impact = analyze_weather_impact(scoring_weather)
         
         # Generate AI suggestions
-        ai_suggestions = generate_ai_suggestions(weather_origin, route_data, origin_hub, dest_hub)
-        
-        # Calculate risk score (use origin weather as baseline)
-        risk_score = calculate_risk_score(weather_origin, route_data, origin_hub, dest_hub)
+        ai_suggestions = generate_ai_suggestions(scoring_weather, route_data, origin_hub, dest_hub)
         
-        # Build optimization result
-        optimization_result = {
-            "optimized_route": {
-                "distance_km": round(route_data["distance_km"], 2),
-                "estimated_time_minutes": round(route_data["estimated_time_minutes"], 1),
-                "weather_impact": weather_impact,
-                "recommendations": ai_suggestions[:3]  # Top 3 recommendations
+        # Calculate risk score
+        risk_score = calculate_risk_score(scoring_weather, route_data, origin_hub, dest_hub)
+    else:
+        weather_impact = scored.weather_impact(row)
+        ai_suggestions = scored.suggestions(row, origin_hub, dest_hub)
+        risk_score = int(scored.risk_score[row])
+    
+    # Build optimization result
+    optimization_result = {
+        "optimized_route": {
+            "distance_km": round(route_data["distance_km"], 2),
+            "estimated_time_minutes": round(route_data["estimated_time_minutes"], 1),
+            "weather_impact": weather_impact,
+            "recommendations": ai_suggestions[:3]  # Top 3 recommendations
+        },
+        "ai_suggestions": ai_suggestions,
+        "risk_score": risk_score,
+        "confidence": 0.92 if route_data.get("geometry") or route_data.get("geometry_omitted") else 0.75
+    }
+    
+    # Add industrial hub information
+    hub_info = {}
+    if origin_hub:
+        hub_info["origin_hub"] = {
+            "name": origin_hub["name"],
+            "type": origin_hub["type"],
+            "traffic_level": origin_hub["traffic_level"],
+            "peak_hours": origin_hub["peak_hours"]
+        }
+    if dest_hub:
+        hub_info["destination_hub"] = {
+            "name": dest_hub["name"],
+            "type": dest_hub["type"],
+            "traffic_level": dest_hub["traffic_level"],
+            "peak_hours": dest_hub["peak_hours"]
+        }
+    
+    return {
+        "status": "success",
+        "optimization": optimization_result,
+        "weather_context": {
+            "pickup_location": {
+                "coordinates": request.origin,
+                "weather": weather_origin
+            },
+            "delivery_location": {
+                "coordinates": request.destination,
+                "weather": weather_destination
             },
-            "ai_suggestions": ai_suggestions,
-            "risk_score": risk_score,
-            "confidence": 0.92 if route_data.get("geometry") else 0.75
+            "forecast": weather_destination,
+            "along_route": route_weather,
+            "impact_analysis": "Weather conditions analyzed for optimal routing"
+        },
+        "industrial_hubs": hub_info,
+        "ai_insights": {
+            "route_efficiency": "Optimized for current weather and traffic conditions",
+            "risk_assessment": f"Risk score: {risk_score}/100",
+            "recommendations_count": len(ai_suggestions),
+            "data_source": "OpenWeather + OpenRoute APIs"
         }
+    }
+
+# Weather sampled along each route; samples in the same weather cache cell share one lookup. Requests
+# read only cached or prefetched cells - a cold cell takes the weather of the nearer route end, and up to
+# ROUTE_WEATHER_WARM_CELLS cold cells per request are fetched in the background for later requests
+ROUTE_WEATHER_SPACING_KM = float(os.getenv("ROUTE_WEATHER_SPACING_KM", "5"))
+ROUTE_WEATHER_MAX_SAMPLES = int(os.getenv("ROUTE_WEATHER_MAX_SAMPLES", "40"))
+ROUTE_WEATHER_WARM_CELLS = int(os.getenv("ROUTE_WEATHER_WARM_CELLS", "4"))
+route_weather_warming: set = set()
+
+def new_route_sampler() -> RouteSampler:
+    return RouteSampler(weather_cache.cell_for, ROUTE_WEATHER_SPACING_KM, ROUTE_WEATHER_MAX_SAMPLES)
+
+async def warm_route_weather(lat: float, lon: float):
+    # Runs after the request returns; keep its upstream calls out of that request's Server-Timing
+    request_spans.set(None)
+    try:
+        await weather_cache.get_or_fetch(lat, lon, fetch_weather)
+    except Exception as e:
+        logger.debug("Route weather warm-up failed", extra={"fields": {"error": str(e)}})
+
+def sample_route_weather(sampler: RouteSampler, departures: List[Optional[datetime]],
+                         endpoints: List[tuple]) -> List[dict]:
+    """Route-level weather for every route in the sampler, each sample taken at its time of passage.
+    
+    endpoints holds each route's (origin, destination) weather snapshots, used for cells not in the cache.
+    """
+    by_cell = {cell: weather_cache.peek(lat, lon) for cell, (lat, lon) in sampler.cells.items()}
+    cold = [cell for cell, snapshot in by_cell.items() if snapshot is None]
+    for cell in cold[:ROUTE_WEATHER_WARM_CELLS]:
+        task = asyncio.ensure_future(with_priority(BACKGROUND, warm_route_weather(*sampler.cells[cell])))
+        route_weather_warming.add(task)
+        task.add_done_callback(route_weather_warming.discard)
+    
+    results = []
+    for samples, departure, (origin_snapshot, destination_snapshot) in zip(sampler.routes, departures, endpoints):
+        start = departure or datetime.now(HUB_TIMEZONE)
+        half = samples[-1][1] / 2
+        weathers = []
+        for cell, minutes in samples:
+            snapshot = by_cell[cell]
+            if snapshot is None:
+                snapshot = origin_snapshot if minutes <= half else destination_snapshot
+            weathers.append(weather_at(snapshot, start + timedelta(minutes=minutes)))
+        route = aggregate_route_weather(weathers, [minutes for _, minutes in samples])
+        route["endpoint_samples"] = sum(by_cell[cell] is None for cell, _ in samples)
+        results.append(route)
+    return results
+
+def departure_and_arrival(departure_time: Optional[str], route_minutes: float) -> tuple:
+    """Departure and ETA for forecast lookups; (None, None) means current conditions"""
+    if not departure_time:
+        return None, None
+    departure = parse_departure(departure_time)
+    return departure, departure + timedelta(minutes=route_minutes)
+
+def check_departure(value: Optional[str], field: str = "departure_time"):
+    """422 for a departure time parse_departure cannot read, before any work starts"""
+    try:
+        parse_departure(value, field)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def check_radius(radius_km: Optional[float]):
+    """422 for a search radius that is not positive or exceeds SEARCH_MAX_RADIUS_KM"""
+    if radius_km is not None and not 0 < radius_km <= SEARCH_MAX_RADIUS_KM:
+        raise HTTPException(status_code=422, detail=f"radius_km must be above 0 and at most {SEARCH_MAX_RADIUS_KM:g}")
+
+@app.post("/route/optimize")
+async def optimize_delivery_route(request: RouteRequest, response: Response,
+                                  idempotency_key: Optional[str] = Header(None)):
+    """AI-powered route optimization with real weather and route data"""
+    check_departure(request.departure_time)
+    try:
+        if not idempotency_key:
+            return await coalesced_optimize_route(request)
+        result, replayed = await idempotency_store.run(
+            idempotency_key, coalesce_key(request), lambda: coalesced_optimize_route(request)
+        )
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return result
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception:
+        logger.exception("AI optimization error")
+        # Propagate a clear error so the frontend does not display heuristic/mocked distances
+        raise HTTPException(status_code=502, detail="AI optimization failed")
+
+def coalesce_key(request: RouteRequest) -> tuple:
+    """Requests with equal keys produce the same response"""
+    d = REQUEST_COALESCE_SNAP_DECIMALS
+    departure = None
+    if request.departure_time:
+        departure = int(parse_departure(request.departure_time).timestamp() // (REQUEST_COALESCE_BUCKET_MINUTES * 60))
+    return (
+        round(request.origin["lat"], d), round(request.origin["lon"], d),
+        round(request.destination["lat"], d), round(request.destination["lon"], d),
+        departure, request.geometry_format, request.zoom,
+        None if request.fields is None else tuple(sorted(set(request.fields)))
+    )
+
+async def coalesced_optimize_route(request: RouteRequest) -> dict:
+    """optimize_route, shared with any identical request already in flight"""
+    return await route_coalescer.run(coalesce_key(request), lambda: optimize_route(request))
+
+async def optimize_route(request: RouteRequest) -> dict:
+    """Optimize one route (raises on failure; ValueError for invalid output options)"""
+    fields = response_fields(request)
+    # Fetch origin weather, destination weather and route concurrently
+    origin_snapshot, destination_snapshot, route_data = await asyncio.gather(
+        get_weather_snapshot(request.origin["lat"], request.origin["lon"]),
+        get_weather_snapshot(request.destination["lat"], request.destination["lon"]),
+        get_real_route_data(
+            request.origin, request.destination, request.departure_time,
+            geometry=request.geometry_format != "none", steps="steps" in fields
+        )
+    )
+    departure, arrival = departure_and_arrival(request.departure_time, route_data["estimated_time_minutes"])
+    weather_origin = weather_at(origin_snapshot, departure)
+    weather_destination = weather_at(destination_snapshot, arrival)
+    
+    sampler = new_route_sampler()
+    sampler.add(
+        route_coordinates(request.origin, request.destination, route_data.get("geometry")),
+        route_data["estimated_time_minutes"]
+    )
+    route_weather = sample_route_weather(sampler, [departure], [(origin_snapshot, destination_snapshot)])[0]
+    
+    result = build_optimization_result(request, weather_origin, weather_destination, route_data, route_weather=route_weather)
+    return shape_optimization_result(result, request, route_data, fields)
+
+def response_fields(request: RouteRequest) -> set:
+    """Validate the output options of a route request and return the response sections to keep"""
+    if request.geometry_format not in GEOMETRY_FORMATS:
+        raise ValueError(f"geometry_format must be one of {', '.join(f for f in GEOMETRY_FORMATS if f)}")
+    if request.fields is None:
+        return set(DEFAULT_RESPONSE_FIELDS)
+    unknown = set(request.fields) - RESPONSE_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}; expected {', '.join(sorted(RESPONSE_FIELDS))}")
+    return set(request.fields)
+
+def simplified_geometry(route_data: dict, zoom: Optional[float], fmt: str) -> Optional[dict]:
+    coordinates = (route_data.get("geometry") or {}).get("coordinates")
+    if not coordinates or len(coordinates) < 2:
+        return None
+    zoom = GEOMETRY_DEFAULT_ZOOM if zoom is None else min(max(zoom, 0), 20)
+    return geometry_cache.simplified(coordinates, zoom, fmt)
+
+def shape_optimization_result(result: dict, request: RouteRequest, route_data: dict, fields: set) -> dict:
+    """Add requested geometry/steps and drop response sections the caller did not ask for"""
+    optimized_route = result["optimization"]["optimized_route"]
+    if request.geometry_format in ("polyline", "geojson"):
+        optimized_route["geometry"] = simplified_geometry(route_data, request.zoom, request.geometry_format)
+    if "steps" in fields:
+        optimized_route["steps"] = route_data.get("steps") or []
+    if "suggestions" not in fields:
+        optimized_route.pop("recommendations", None)
+        result["optimization"].pop("ai_suggestions", None)
+    for section in ("weather_context", "industrial_hubs", "ai_insights"):
+        if section not in fields:
+            result.pop(section, None)
+    return result
+
+async def stream_route_job(routes: List[RouteRequest], concurrency: int, sse: bool):
+    """Yield one encoded result per route as it completes.
+    
+    Workers pull routes from a shared iterator and hand results over a queue no
+    larger than the worker count, so a slow reader pauses the workers instead of
+    results piling up in memory.
+    """
+    call_priority.set(BATCH)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    pending = iter(enumerate(routes))
+    started = time.perf_counter()
+    
+    async def worker():
+        for index, route_request in pending:
+            try:
+                item = {"index": index, **await coalesced_optimize_route(route_request)}
+            except Exception as e:
+                logger.warning("Route job item failed", extra={"fields": {"index": index, "error": str(e)}})
+                item = {"index": index, "status": "error", "error": f"{type(e).__name__}: {e}"}
+            await queue.put(item)
+    
+    def encode(event: str, item: dict) -> bytes:
+        data = json.dumps(item, default=str)
+        return (f"event: {event}\ndata: {data}\n\n" if sse else data + "\n").encode()
+    
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(routes)))]
+    succeeded = failed = 0
+    try:
+        for _ in range(len(routes)):
+            item = await queue.get()
+            if item["status"] == "success":
+                succeeded += 1
+            else:
+                failed += 1
+            yield encode("result", item)
+        yield encode("done", {
+            "status": "done",
+            "count": len(routes),
+            "succeeded": succeeded,
+            "failed": failed,
+            "elapsed_seconds": round(time.perf_counter() - started, 3)
+        })
+    finally:
+        # Client went away or the job finished - stop any workers still running
+        for task in workers:
+            task.cancel()
+
+@app.post("/route/geometry")
+async def get_route_geometry(request: RouteGeometryRequest):
+    """Route distance/time with geometry simplified for a map zoom level (no weather or scoring)"""
+    if request.format not in ("polyline", "geojson"):
+        raise HTTPException(status_code=422, detail="format must be 'polyline' or 'geojson'")
+    check_departure(request.departure_time)
+    try:
+        route_data = await get_real_route_data(request.origin, request.destination, request.departure_time)
+    except Exception as e:
+        logger.warning("Route geometry error", extra={"fields": {"error": str(e)}})
+        raise HTTPException(status_code=502, detail="Routing services unavailable")
+    return {
+        "status": "success",
+        "distance_km": round(route_data["distance_km"], 2),
+        "estimated_time_minutes": round(route_data["estimated_time_minutes"], 1),
+        "geometry": simplified_geometry(route_data, request.zoom, request.format)
+    }
+
+@app.post("/route/optimize/batch")
+async def optimize_delivery_routes_batch(request: BatchRouteRequest):
+    """Optimize many origin/destination pairs using one matrix lookup and shared weather"""
+    # Bulk work queues behind interactive /route/optimize calls for upstream quota
+    call_priority.set(BATCH)
+    if not request.routes:
+        return {"status": "success", "count": 0, "results": []}
+    if len(request.routes) > BATCH_MAX_ROUTES:
+        raise HTTPException(status_code=413, detail=f"Batch limited to {BATCH_MAX_ROUTES} routes")
+    for r in request.routes:
+        check_departure(r.departure_time)
+    
+    try:
+        # Weather once per unique cache cell, alongside the route matrix
+        points = [r.origin for r in request.routes] + [r.destination for r in request.routes]
+        cells = {weather_cache.cell_for(p["lat"], p["lon"]): p for p in points}
+        weather_results, route_results = await asyncio.gather(
+            asyncio.gather(*(get_weather_snapshot(p["lat"], p["lon"]) for p in cells.values())),
+            get_batch_route_data(request.routes)
+        )
+        weather_by_cell = dict(zip(cells.keys(), weather_results))
+        origin_weather, destination_weather = [], []
+        for r, route in zip(request.routes, route_results):
+            departure, arrival = departure_and_arrival(r.departure_time, route["estimated_time_minutes"])
+            origin_weather.append(weather_at(weather_by_cell[weather_cache.cell_for(r.origin["lat"], r.origin["lon"])], departure))
+            destination_weather.append(weather_at(weather_by_cell[weather_cache.cell_for(r.destination["lat"], r.destination["lon"])], arrival))
         
-        # Add industrial hub information
-        hub_info = {}
-        if origin_hub:
-            hub_info["origin_hub"] = {
-                "name": origin_hub["name"],
-                "type": origin_hub["type"],
-                "traffic_level": origin_hub["traffic_level"],
-                "peak_hours": origin_hub["peak_hours"]
-            }
-        if dest_hub:
-            hub_info["destination_hub"] = {
-                "name": dest_hub["name"],
-                "type": dest_hub["type"],
-                "traffic_level": dest_hub["traffic_level"],
-                "peak_hours": dest_hub["peak_hours"]
-            }
+        # Sample weather along every route; overlapping corridors share cells
+        sampler = new_route_sampler()
+        for r, route in zip(request.routes, route_results):
+            sampler.add(route_coordinates(r.origin, r.destination, route.get("geometry")), route["estimated_time_minutes"])
+        route_weathers = sample_route_weather(
+            sampler, [departure_and_arrival(r.departure_time, 0)[0] for r in request.routes],
+            [
+                (weather_by_cell[weather_cache.cell_for(r.origin["lat"], r.origin["lon"])],
+                 weather_by_cell[weather_cache.cell_for(r.destination["lat"], r.destination["lon"])])
+                for r in request.routes
+            ]
+        )
         
-        result = {
-            "status": "success",
-            "optimization": optimization_result,
-            "weather_context": {
-                "pickup_location": {
-                    "coordinates": request.origin,
-                    "weather": weather_origin
-                },
-                "delivery_location": {
-                    "coordinates": request.destination,
-                    "weather": weather_destination
-                },
-                "forecast": weather_destination,
-                "impact_analysis": "Weather conditions analyzed for optimal routing"
-            },
-            "industrial_hubs": hub_info,
-            "ai_insights": {
-                "route_efficiency": "Optimized for current weather and traffic conditions",
-                "risk_assessment": f"Risk score: {risk_score}/100",
-                "recommendations_count": len(ai_suggestions),
-                "data_source": "OpenWeather + OpenRoute APIs"
-            }
+        # Resolve hubs and score the whole batch in one vectorized pass
+        hub_rows, _ = HUB_INDEX.query(
+            [p["lat"] for p in points], [p["lon"] for p in points], 1
+        )
+        hubs = [HUB_INDEX.payloads[i] for i in hub_rows[:, 0]]
+        origin_hubs, dest_hubs = hubs[:len(request.routes)], hubs[len(request.routes):]
+        scored = score_batch(
+            route_weathers, [r["estimated_time_minutes"] for r in route_results], origin_hubs, dest_hubs
+        )
+        
+        results = [
+            build_optimization_result(
+                route_request, origin_weather[i], destination_weather[i], route_results[i],
+                scored=scored, row=i, origin_hub=origin_hubs[i], dest_hub=dest_hubs[i], route_weather=route_weathers[i]
+            )
+            for i, route_request in enumerate(request.routes)
+        ]
+        
+        return {"status": "success", "count": len(results), "results": results}
+        
+    except Exception:
+        logger.exception("AI batch optimization error")
+        raise HTTPException(status_code=502, detail="AI batch optimization failed")
+
+@app.post("/route/departure-windows")
+async def optimize_departure_windows(request: DepartureWindowRequest):
+    """Best departure windows for one or many routes from a vectorized sweep over candidate slots"""
+    call_priority.set(BATCH)
+    routes = request.routes
+    if not routes:
+        raise HTTPException(status_code=422, detail="At least one route is required")
+    if len(routes) > DEPARTURE_MAX_ROUTES:
+        raise HTTPException(status_code=413, detail=f"Departure windows limited to {DEPARTURE_MAX_ROUTES} routes")
+    if request.step_minutes < 1 or request.horizon_hours <= 0 or request.windows < 1:
+        raise HTTPException(status_code=422, detail="step_minutes, horizon_hours and windows must be positive")
+    # Peak masks are in Delhi time, so slots are laid out and reported in it whatever offset the client sent
+    if request.earliest:
+        check_departure(request.earliest, "earliest")
+        earliest = parse_departure(request.earliest)
+    else:
+        earliest = datetime.now(HUB_TIMEZONE).replace(second=0, microsecond=0)
+    departures, departure_minute = candidate_departures(earliest, request.horizon_hours, request.step_minutes)
+    if len(departures) > DEPARTURE_MAX_SLOTS:
+        raise HTTPException(status_code=422, detail=f"At most {DEPARTURE_MAX_SLOTS} candidate departures per route")
+    
+    # One route lookup per pair and one weather snapshot per cache cell; every slot is then pure array work
+    cells = {weather_cache.cell_for(p["lat"], p["lon"]): p for r in routes for p in (r.origin, r.destination)}
+    route_data, *snapshots = await asyncio.gather(
+        get_batch_route_data([RouteRequest(origin=r.origin, destination=r.destination) for r in routes]),
+        *(get_weather_snapshot(p["lat"], p["lon"]) for p in cells.values())
+    )
+    snapshot_by_cell = dict(zip(cells, snapshots))
+    
+    n, slots = len(routes), len(departures)
+    hub_rows, _ = HUB_INDEX.query(
+        [r.origin["lat"] for r in routes] + [r.destination["lat"] for r in routes],
+        [r.origin["lon"] for r in routes] + [r.destination["lon"] for r in routes], 1
+    )
+    origin_hubs, dest_hubs = hub_rows[:n, 0], hub_rows[n:, 0]
+    base_minutes = np.array([d["estimated_time_minutes"] for d in route_data], dtype=np.float64)
+    travel, origin_peak, dest_peak = travel_minutes_by_slot(
+        base_minutes, departure_minute, origin_hubs, dest_hubs, HUB_PEAK_MASKS, HUB_PEAK_SLOWDOWN
+    )
+    
+    # Worst of the origin forecast at departure and the destination forecast at arrival
+    columns = {field: np.empty((n, slots)) for field in ("precipitation_chance", "visibility", "wind_speed", "temperature")}
+    for i, r in enumerate(routes):
+        at_origin = weather_columns_at(snapshot_by_cell[weather_cache.cell_for(r.origin["lat"], r.origin["lon"])], departures)
+        at_dest = weather_columns_at(
+            snapshot_by_cell[weather_cache.cell_for(r.destination["lat"], r.destination["lon"])], departures + travel[i] * 60
+        )
+        columns["visibility"][i] = np.fmin(at_origin["visibility"], at_dest["visibility"])
+        for field in ("precipitation_chance", "wind_speed", "temperature"):
+            columns[field][i] = np.fmax(at_origin[field], at_dest[field])
+    columns["estimated_time_minutes"] = travel
+    # Hub traffic counts only while the hub is in its peak hours
+    columns["origin_high_traffic"] = origin_peak & HUB_HIGH_TRAFFIC[origin_hubs][:, None]
+    columns["dest_high_traffic"] = dest_peak & HUB_HIGH_TRAFFIC[dest_hubs][:, None]
+    columns["has_origin_hub"] = columns["has_dest_hub"] = np.ones((n, slots))
+    bits = condition_bits_batch({k: np.asarray(v, dtype=np.float64).ravel() for k, v in columns.items()}, n * slots).reshape(n, slots)
+    risk = risk_from_bits(bits)
+    eta = travel + delay_from_bits(bits)
+    score = eta * (1 + request.risk_weight * risk / 100)
+    
+    def at(epoch: float) -> str:
+        return datetime.fromtimestamp(epoch, tz=earliest.tzinfo).isoformat()
+    def slot(i: int, k: int) -> dict:
+        return {
+            "departure": at(departures[k]),
+            "arrival": at(departures[k] + eta[i, k] * 60),
+            "eta_minutes": round(float(eta[i, k]), 1),
+            "risk_score": int(risk[i, k]),
+            "origin_peak": bool(origin_peak[i, k]),
+            "destination_peak": bool(dest_peak[i, k]),
+            "score": round(float(score[i, k]), 1)
         }
+    results = []
+    for i in range(n):
+        item = {
+            "index": i,
+            "distance_km": round(route_data[i]["distance_km"], 2),
+            "base_minutes": round(float(base_minutes[i]), 1),
+            "windows": [
+                {"start": at(departures[first]), "end": at(departures[last] + request.step_minutes * 60), **slot(i, best)}
+                for first, last, best in pick_windows(score[i], request.windows, request.tolerance)
+            ]
+        }
+        if request.include_slots:
+            item["slots"] = [slot(i, k) for k in range(slots)]
+        results.append(item)
+    return {
+        "status": "success",
+        "candidates_per_route": slots,
+        "step_minutes": request.step_minutes,
+        "routes": results
+    }
+
+@app.post("/route/optimize/stream")
+async def optimize_delivery_routes_stream(request: RouteJobRequest):
+    """Optimize a large job, streaming each result (NDJSON or server-sent events) as soon as it finishes"""
+    if len(request.routes) > ROUTE_JOB_MAX_ROUTES:
+        raise HTTPException(status_code=413, detail=f"Job limited to {ROUTE_JOB_MAX_ROUTES} routes")
+    if request.format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=422, detail="format must be 'ndjson' or 'sse'")
+    for r in request.routes:
+        check_departure(r.departure_time)
+    concurrency = max(1, min(request.concurrency or ROUTE_JOB_CONCURRENCY, ROUTE_JOB_MAX_CONCURRENCY))
+    sse = request.format == "sse"
+    return StreamingResponse(
+        stream_route_job(request.routes, concurrency, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def clock_to_minutes(value: str) -> int:
+    """Convert "HH:MM" to minutes after midnight"""
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+@app.post("/eta/estimate")
+async def estimate_eta(request: EtaRequest):
+    """Fast distance/ETA estimates from the offline-trained model; no upstream calls"""
+    routes = request.routes
+    if len(routes) > ETA_MAX_ROUTES:
+        raise HTTPException(status_code=413, detail=f"ETA estimates limited to {ETA_MAX_ROUTES} routes")
+    for r in routes:
+        check_departure(r.departure_time)
+    departures = [parse_departure(r.departure_time) for r in routes]
+    # Weather only from the cache, once per cell and departure hour
+    weather_memo: Dict[tuple, dict] = {}
+    def cached_weather(route: EtaRoute, departure: datetime) -> dict:
+        key = (weather_cache.cell_for(route.origin["lat"], route.origin["lon"]), departure.replace(minute=0, second=0, microsecond=0))
+        if key not in weather_memo:
+            snapshot = weather_cache.peek(route.origin["lat"], route.origin["lon"])
+            weather_memo[key] = weather_at(snapshot, departure if route.departure_time else None) if snapshot else {}
+        return weather_memo[key]
+    weathers = [cached_weather(r, d) for r, d in zip(routes, departures)]
+    
+    values = {
+        "origin_lat": [r.origin["lat"] for r in routes],
+        "origin_lon": [r.origin["lon"] for r in routes],
+        "dest_lat": [r.destination["lat"] for r in routes],
+        "dest_lon": [r.destination["lon"] for r in routes],
+        "minute_of_day": [minute_of_day(d) for d in departures],
+    }
+    for name in ETA_WEATHER_COLUMNS:
+        values[name] = [np.nan if w.get(name) is None else w[name] for w in weathers]
+    distance, minutes = eta_model.predict({k: np.asarray(v, dtype=np.float64) for k, v in values.items()})
+    
+    return {
+        "status": "success",
+        "model": "regression" if eta_model.weights is not None else "baseline",
+        "count": len(routes),
+        "estimates": [
+            {"distance_km": round(float(d), 2), "estimated_time_minutes": round(float(m), 1)}
+            for d, m in zip(distance, minutes)
+        ]
+    }
+
+@app.post("/risk/score")
+async def score_delivery_risk(request: RiskScoreRequest):
+    """Vectorized risk and weather-impact scoring for a delivery book"""
+    call_priority.set(BATCH)
+    items = request.items
+    if not items:
+        return {"status": "success", "count": 0, "scores": []}
+    
+    # Fill missing weather once per cache cell
+    missing = {weather_cache.cell_for(i.origin["lat"], i.origin["lon"]): i.origin for i in items if i.weather is None}
+    fetched = await asyncio.gather(*(get_real_weather_data(p["lat"], p["lon"]) for p in missing.values()))
+    weather_by_cell = dict(zip(missing.keys(), fetched))
+    weathers = [
+        i.weather if i.weather is not None else weather_by_cell[weather_cache.cell_for(i.origin["lat"], i.origin["lon"])]
+        for i in items
+    ]
+    
+    lats = [i.origin["lat"] for i in items] + [i.destination["lat"] for i in items]
+    lons = [i.origin["lon"] for i in items] + [i.destination["lon"] for i in items]
+    hub_rows, _ = HUB_INDEX.query(lats, lons, 1)
+    hubs = [HUB_INDEX.payloads[r] for r in hub_rows[:, 0]]
+    scored = score_batch(weathers, [i.estimated_time_minutes for i in items], hubs[:len(items)], hubs[len(items):])
+    
+    return {
+        "status": "success",
+        "count": len(items),
+        "scores": [
+            {"risk_score": int(scored.risk_score[k]), "weather_impact": scored.weather_impact(k)}
+            for k in range(len(items))
+        ]
+    }
+
+@app.post("/route/vrp")
+async def optimize_fleet_routes(request: VRPRequest):
+    """Multi-stop vehicle routing with capacities and time windows"""
+    call_priority.set(BATCH)
+    if not request.stops or not request.vehicles:
+        raise HTTPException(status_code=422, detail="At least one stop and one vehicle are required")
+    if len(request.stops) > VRP_MAX_STOPS:
+        raise HTTPException(status_code=413, detail=f"VRP limited to {VRP_MAX_STOPS} stops")
+    check_departure(request.departure_time)
+    
+    try:
+        lats = np.array([request.depot["lat"]] + [stop.lat for stop in request.stops])
+        lons = np.array([request.depot["lon"]] + [stop.lon for stop in request.stops])
+        hub_rows, _ = HUB_INDEX.query(lats, lons, 1)
+        hub_rows = hub_rows[:, 0]
+        hub_names = [HUB_INDEX.ids[i] for i in hub_rows]
+        distance, duration = hub_matrix.point_matrix(lats, lons, hub_names)
         
-        return result
+        # Risk per hub pair from the usual risk score, using hub weather and hub-to-hub travel time
+        used = sorted(set(hub_rows.tolist()))
+        hub_weather = await asyncio.gather(*(
+            get_real_weather_data(HUB_INDEX.lats[i], HUB_INDEX.lons[i]) for i in used
+        ))
+        pair_risk = np.zeros((len(HUB_INDEX), len(HUB_INDEX)))
+        for a, weather in zip(used, hub_weather):
+            for b in used:
+                leg = hub_matrix.lookup(HUB_INDEX.ids[a], HUB_INDEX.ids[b])
+                pair_risk[a, b] = calculate_risk_score(
+                    weather, {"estimated_time_minutes": leg[1]}, HUB_INDEX.payloads[a], HUB_INDEX.payloads[b]
+                )
+        risk = pair_risk[hub_rows[:, None], hub_rows[None, :]]
+        cost = duration * (1 + request.risk_weight * risk / 100)
         
+        # Stop windows are Delhi clock times
+        departure_minute = minute_of_day(parse_departure(request.departure_time))
+        earliest = [0.0] + [
+            max(0.0, clock_to_minutes(stop.window_start) - departure_minute) if stop.window_start else 0.0
+            for stop in request.stops
+        ]
+        latest = [float("inf")] + [
+            clock_to_minutes(stop.window_end) - departure_minute if stop.window_end else float("inf")
+            for stop in request.stops
+        ]
+        problem = vrp_solver.VRPProblem(
+            cost, duration, distance,
+            demand=[0.0] + [stop.weight for stop in request.stops],
+            earliest=earliest,
+            latest=latest,
+            service=[0.0] + [stop.service_minutes for stop in request.stops],
+            capacities=[vehicle.capacity for vehicle in request.vehicles]
+        )
+        budget = min(max(request.time_budget_seconds, 0.1), VRP_MAX_TIME_BUDGET_SECONDS)
+        solution = await asyncio.to_thread(vrp_solver.solve, problem, budget, VRP_WORKERS)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception:
+        logger.exception("VRP optimization error")
+        raise HTTPException(status_code=502, detail="VRP optimization failed")
+    
+    routes = []
+    for plan in solution["routes"]:
+        routes.append({
+            "vehicle_id": request.vehicles[plan["vehicle"]].id,
+            "stops": [request.stops[node - 1].id for node in plan["stops"]],
+            "arrival_minutes": [round(t, 1) for t in plan["arrival_minutes"]],
+            "load": round(plan["load"], 2),
+            "capacity": request.vehicles[plan["vehicle"]].capacity,
+            "distance_km": round(plan["distance_km"], 2),
+            "duration_minutes": round(plan["duration_minutes"], 1)
+        })
+    
+    return {
+        "status": "success",
+        "routes": routes,
+        "unassigned": [request.stops[node - 1].id for node in solution["unassigned"]],
+        "summary": {
+            "vehicles_used": len(routes),
+            "total_distance_km": round(sum(r["distance_km"] for r in routes), 2),
+            "total_duration_minutes": round(sum(r["duration_minutes"] for r in routes), 1),
+            "objective": round(solution["cost"], 1),
+            "restarts": solution["restarts"]
+        }
+    }
+
+@app.post("/shared-trucks/trips")
+async def register_truck_trip(request: TruckTripRequest):
+    """Add or replace a live truck trip in the matching index"""
+    call_priority.set(BATCH)
+    check_departure(request.departure_time)
+    geometry = request.geometry
+    distance_km = None
+    if not geometry or not geometry.get("coordinates"):
+        try:
+            route_data = await get_real_route_data(request.origin, request.destination, request.departure_time)
+            geometry = route_data.get("geometry")
+            distance_km = route_data["distance_km"]
+        except Exception as e:
+            logger.warning("Truck trip routing error", extra={"fields": {"error": str(e)}})
+    if not geometry or not geometry.get("coordinates"):
+        # No routed geometry available - fall back to the straight corridor
+        geometry = {"type": "LineString", "coordinates": [
+            [request.origin["lon"], request.origin["lat"]],
+            [request.destination["lon"], request.destination["lat"]]
+        ]}
+    
+    trip = TruckTrip(
+        request.id, request.origin, request.destination,
+        departure=parse_departure(request.departure_time),
+        window_minutes=request.window_minutes,
+        max_weight=request.max_weight,
+        current_weight=request.current_weight,
+        path=densify(geometry["coordinates"]),
+        distance_km=distance_km,
+        info=request.details
+    )
+    truck_matcher.add_trip(trip)
+    return {
+        "status": "success",
+        "trip_id": trip.id,
+        "corridor_cells": len(trip.cells),
+        "remaining_weight": trip.remaining_weight
+    }
+
+@app.delete("/shared-trucks/trips/{trip_id}")
+async def remove_truck_trip(trip_id: str):
+    """Remove a trip that departed, filled up or was cancelled"""
+    if not truck_matcher.remove_trip(trip_id):
+        raise HTTPException(status_code=404, detail="Trip not found")
+    return {"status": "success", "trip_id": trip_id}
+
+@app.patch("/shared-trucks/trips/{trip_id}/load")
+async def update_truck_load(trip_id: str, request: TruckLoadUpdate):
+    """Update how much weight a trip is already carrying"""
+    if not truck_matcher.update_load(trip_id, request.current_weight):
+        raise HTTPException(status_code=404, detail="Trip not found")
+    return {"status": "success", "trip_id": trip_id}
+
+@app.post("/shared-trucks/match")
+async def match_shared_trucks(request: ConsignmentRequest):
+    """Rank live trips for a consignment by savings, detour and spare capacity"""
+    check_departure(request.ready_time, "ready_time")
+    matches = truck_matcher.match(
+        request.pickup, request.drop, request.weight,
+        earliest=parse_departure(request.ready_time),
+        flexibility_minutes=request.flexibility_minutes,
+        limit=request.limit
+    )
+    return {
+        "status": "success",
+        "matches": matches,
+        "total": len(matches)
+    }
+
+async def matrix_minutes(points: List[dict], sources: List[int], destinations: List[int]) -> np.ndarray:
+    """Travel minutes from the OpenRoute matrix, with hub-matrix estimates for anything it could not route"""
+    try:
+        matrix = await route_matrix([[p["lon"], p["lat"]] for p in points], sources, destinations)
+        minutes = np.array(matrix["durations"], dtype=np.float64) / 60
     except Exception as e:
-        print(f"AI optimization error: {e}")
-        # Propagate a clear error so the frontend does not display heuristic/mocked distances
-        raise HTTPException(status_code=502, detail="AI optimization failed")
+        logger.warning("Route matrix API error", extra={"fields": {"error": str(e), "sources": len(sources)}})
+        minutes = np.full((len(sources), len(destinations)), np.nan)
+    missing = np.isnan(minutes)
+    if missing.any():
+        FALLBACKS.inc(kind="matrix_local")
+        lats = np.array([p["lat"] for p in points])
+        lons = np.array([p["lon"] for p in points])
+        hub_rows, _ = HUB_INDEX.query(lats, lons, 1)
+        _, duration = hub_matrix.point_matrix(lats, lons, [HUB_INDEX.ids[i] for i in hub_rows[:, 0]])
+        minutes = np.where(missing, duration[np.ix_(sources, destinations)], minutes)
+    return minutes
+
+@app.post("/warehouses")
+async def upsert_warehouses(request: WarehouseBatch):
+    """Add or replace micro-warehouse listings in the search index"""
+    for listing in request.warehouses:
+        warehouse_index.upsert(
+            listing.id, listing.lat, listing.lon, listing.available_sqft, listing.price_per_sqft_day, listing.details
+        )
+    return {"status": "success", "count": len(request.warehouses), "indexed": len(warehouse_index)}
+
+@app.patch("/warehouses/{warehouse_id}/availability")
+async def update_warehouse_availability(warehouse_id: str, request: WarehouseAvailabilityUpdate):
+    """Update a listing's free space and/or daily price"""
+    if not warehouse_index.update_availability(warehouse_id, request.available_sqft, request.price_per_sqft_day):
+        raise HTTPException(status_code=404, detail="Warehouse not found")
+    return {"status": "success", "warehouse_id": warehouse_id}
+
+@app.delete("/warehouses/{warehouse_id}")
+async def remove_warehouse(warehouse_id: str):
+    """Remove a listing that was withdrawn"""
+    if not warehouse_index.remove(warehouse_id):
+        raise HTTPException(status_code=404, detail="Warehouse not found")
+    return {"status": "success", "warehouse_id": warehouse_id}
+
+@app.post("/warehouses/search")
+async def search_warehouses(request: WarehouseSearchRequest):
+    """Warehouses with enough space under a price, near the destination hub or along the route, ranked by travel time"""
+    if request.near not in ("destination_hub", "route"):
+        raise HTTPException(status_code=422, detail="near must be 'destination_hub' or 'route'")
+    if request.near == "route" and not request.origin:
+        raise HTTPException(status_code=422, detail="origin is required when searching along the route")
+    if request.page < 1 or not 1 <= request.limit <= WAREHOUSE_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=422, detail=f"page must be at least 1 and limit between 1 and {WAREHOUSE_MAX_PAGE_SIZE}")
+    check_radius(request.radius_km)
+    check_departure(request.departure_time)
+    
+    if request.near == "destination_hub":
+        hub = find_nearest_industrial_hub(request.destination["lat"], request.destination["lon"])
+        anchors = [(hub["coordinates"]["lat"], hub["coordinates"]["lon"])]
+        radius = WAREHOUSE_HUB_RADIUS_KM if request.radius_km is None else request.radius_km
+    else:
+        try:
+            route_data = await get_real_route_data(request.origin, request.destination, request.departure_time)
+        except Exception:
+            logger.exception("Warehouse search routing error")
+            raise HTTPException(status_code=502, detail="Routing failed")
+        anchors = densify(route_coordinates(request.origin, request.destination, route_data.get("geometry")))
+        radius = WAREHOUSE_CORRIDOR_KM if request.radius_km is None else request.radius_km
+    
+    rows, distances = warehouse_index.search(
+        [a[0] for a in anchors], [a[1] for a in anchors], radius,
+        min_sqft=request.min_sqft, max_price=request.max_price_per_sqft_day
+    )
+    # Rank the same nearest-by-straight-line shortlist for every page, so pages neither repeat nor skip
+    shortlist = rows[:WAREHOUSE_RANK_MAX]
+    listings = [warehouse_index.listing(row) for row in shortlist]
+    stops = [listing["coordinates"] for listing in listings]
+    n = len(stops)
+    
+    if not n:
+        minutes = np.empty(0)
+    elif request.near == "destination_hub":
+        minutes = (await matrix_minutes([hub["coordinates"]] + stops, [0], list(range(1, n + 1))))[0]
+    else:
+        # Detour: origin -> warehouse -> destination, less the direct trip
+        points = [request.origin, request.destination] + stops
+        out, back = await asyncio.gather(
+            matrix_minutes(points, [0], [1] + list(range(2, n + 2))),
+            matrix_minutes(points, list(range(2, n + 2)), [1])
+        )
+        from_origin = out[0, 1:]
+        minutes = np.maximum(from_origin + back[:, 0] - out[0, 0], 0.0)
+    
+    order = np.argsort(minutes, kind="stable")
+    start = (request.page - 1) * request.limit
+    results = []
+    for j in order[start:start + request.limit]:
+        item = {**listings[j], "distance_km": round(float(distances[j]), 3)}
+        if request.near == "destination_hub":
+            item["travel_minutes"] = round(float(minutes[j]), 1)
+        else:
+            item["detour_minutes"] = round(float(minutes[j]), 1)
+            item["minutes_from_origin"] = round(float(from_origin[j]), 1)
+        results.append(item)
+    return {
+        "status": "success",
+        "near": request.near,
+        "destination_hub": hub["name"] if request.near == "destination_hub" else None,
+        "warehouses": results,
+        "pagination": {
+            "page": request.page,
+            "limit": request.limit,
+            "total": n,
+            "pages": int(math.ceil(n / request.limit)),
+            "matched": int(len(rows))
+        }
+    }
 
 @app.get("/industrial-hubs")
 async def get_industrial_hubs():
@@ -558,6 +1769,36 @@ async def get_industrial_hubs():
         "count": len(DELHI_INDUSTRIAL_HUBS)
     }
 
+@app.post("/industrial-hubs/nearest")
+async def get_nearest_industrial_hubs(request: NearestHubRequest):
+    """Bulk nearest-hub lookup (k-nearest, or all hubs within radius_km)"""
+    if request.k < 1:
+        raise HTTPException(status_code=422, detail="k must be at least 1")
+    check_radius(request.radius_km)
+    
+    if request.radius_km is not None:
+        matches = [
+            [{"hub": hub_id, "distance_km": round(d, 3)} for hub_id, _, d in HUB_INDEX.within_radius(p["lat"], p["lon"], request.radius_km)]
+            for p in request.points
+        ]
+    else:
+        idx, dist = HUB_INDEX.query([p["lat"] for p in request.points], [p["lon"] for p in request.points], request.k)
+        matches = [
+            [{"hub": HUB_INDEX.ids[i], "distance_km": round(float(d), 3)} for i, d in zip(row_idx, row_d)]
+            for row_idx, row_d in zip(idx, dist)
+        ]
+    
+    return {
+        "status": "success",
+        "count": len(matches),
+        "matches": matches
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text exposition of request, upstream, fallback and cache metrics"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -575,7 +1816,26 @@ async def health_check():
         "apis": {
             "weather": "OpenWeather API",
             "routing": "OpenRoute API"
-        }
+        },
+        "caches": {
+            "weather": weather_cache.stats(),
+            "weather_prefetch": weather_prefetcher.stats(),
+            "geometry": geometry_cache.stats(),
+            "routes": route_store.stats()
+        },
+        "requests": {
+            "coalescing": route_coalescer.stats(),
+            "idempotency": idempotency_store.stats()
+        },
+        "providers": {
+            "route": route_chain.stats(),
+            "weather": weather_chain.stats()
+        },
+        "quotas": quota_dispatcher.stats(),
+        "hub_matrix": hub_matrix.stats(),
+        "eta_model": eta_model.stats(),
+        "shared_trucks": truck_matcher.stats(),
+        "warehouses": warehouse_index.stats()
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,199 @@
+"""End-to-end load test of the AI service against local upstream stubs.
+
+Starts benchmarks/stub_upstreams.py and the service (uvicorn) as subprocesses,
+then drives each scenario at increasing concurrency and reports throughput,
+latency percentiles and upstream calls per request. Every level gets a freshly
+started service with its own route store, so caches, coalescers and quota
+buckets warmed by one level do not flatter the next. Runs fully offline.
+
+    python benchmarks/load_test.py --concurrency 1,8,32 --requests 200
+    python benchmarks/load_test.py --save baseline.json
+    python benchmarks/load_test.py --compare baseline.json --tolerance 0.25
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from report import compare, latency_summary, print_table, save  # noqa: E402
+from stub_upstreams import add_arguments  # noqa: E402
+
+NCR_LAT = (28.40, 28.88)
+NCR_LON = (76.95, 77.50)
+
+
+def lane_pool(size: int, seed: int) -> List[dict]:
+    rng = random.Random(seed)
+    def point():
+        return {"lat": round(rng.uniform(*NCR_LAT), 5), "lon": round(rng.uniform(*NCR_LON), 5)}
+    return [{"origin": point(), "destination": point()} for _ in range(size)]
+
+
+def scenarios(lanes: List[dict], seed: int) -> Dict[str, Callable]:
+    rng = random.Random(seed)
+    return {
+        "route_optimize": lambda c: c.post("/route/optimize", json=rng.choice(lanes)),
+        "weather_delhi": lambda c: c.get("/weather/delhi"),
+        "industrial_hubs": lambda c: c.get("/industrial-hubs"),
+    }
+
+
+async def wait_ready(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url, timeout=1.0)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+async def drive(client: httpx.AsyncClient, send: Callable, requests: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await send(client)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latency_summary(latencies, time.perf_counter() - start, errors)
+
+
+def stop(processes: List[subprocess.Popen]):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait(timeout=10)
+
+
+async def run(args, workdir: str) -> List[dict]:
+    service = f"http://127.0.0.1:{args.service_port}"
+    stubs = f"http://127.0.0.1:{args.stub_port}"
+    lanes = lane_pool(args.lanes, args.seed)
+    rows = []
+    limits = httpx.Limits(max_connections=max(args.levels) * 2, max_keepalive_connections=max(args.levels))
+    async with httpx.AsyncClient(base_url=stubs) as stub_client:
+        for name, send in scenarios(lanes, args.seed).items():
+            if args.scenarios and name not in args.scenarios:
+                continue
+            for concurrency in args.levels:
+                # Cold service per level: a restart clears the in-process caches and coalescers, and a new
+                # directory gives it an empty route store, hub matrix observations and route log
+                level_dir = os.path.join(workdir, f"level-{len(rows)}")
+                os.makedirs(level_dir)
+                process = start_service(args, level_dir)
+                try:
+                    await wait_ready(f"{service}/health")
+                    await stub_client.post("/_reset")
+                    async with httpx.AsyncClient(base_url=service, timeout=60.0, limits=limits) as client:
+                        summary = await drive(client, send, args.requests, concurrency)
+                    upstream = (await stub_client.get("/_stats")).json()["calls"]
+                finally:
+                    await asyncio.to_thread(stop, [process])
+                rows.append({
+                    "scenario": name,
+                    "concurrency": concurrency,
+                    **summary,
+                    "upstream_per_req": round(sum(upstream.values()) / max(1, summary["requests"]), 2),
+                    "upstream": ",".join(f"{k}={v}" for k, v in sorted(upstream.items())) or "-"
+                })
+    return rows
+
+
+def start_stubs(args) -> subprocess.Popen:
+    stub_cmd = [
+        sys.executable, os.path.join(BENCH_DIR, "stub_upstreams.py"), "--port", str(args.stub_port),
+        "--latency-ms", args.latency_ms, "--jitter", str(args.jitter), "--error-rate", args.error_rate,
+        "--forecast-steps", str(args.forecast_steps), "--geometry-points", str(args.geometry_points),
+        "--seed", str(args.seed)
+    ]
+    return subprocess.Popen(stub_cmd, cwd=SERVICE_DIR)
+
+
+def start_service(args, workdir: str) -> subprocess.Popen:
+    stubs = f"http://127.0.0.1:{args.stub_port}"
+    env = dict(
+        os.environ,
+        OPENROUTE_API_KEY="bench", OPENWEATHER_API_KEY="bench",
+        OPENWEATHER_BASE_URL=stubs, OPENROUTE_BASE_URL=stubs, OSRM_BASE_URL=stubs,
+        ROUTE_STORE_PATH=os.path.join(workdir, "routes.sqlite3"),
+        HUB_MATRIX_PATH=os.path.join(workdir, "hub_matrix.npy"),
+        ETA_TRAINING_LOG_PATH=os.path.join(workdir, "route_log.jsonl"),
+        WEATHER_PREFETCH_ENABLED="true" if args.prefetch else "false",
+        LOG_LEVEL="WARNING", VRP_WORKERS="1"
+    )
+    if not args.provider_quotas:
+        for name in ("OPENWEATHER", "ORS_DIRECTIONS", "ORS_MATRIX", "OSRM"):
+            env.update({f"{name}_QUOTA_PER_MINUTE": "1000000", f"{name}_QUOTA_PER_DAY": "0"})
+    service_cmd = [
+        sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(args.service_port),
+        "--log-level", "warning", "--no-access-log"
+    ]
+    return subprocess.Popen(service_cmd, cwd=SERVICE_DIR, env=env)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", default="1,8,32,64", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and level")
+    parser.add_argument("--lanes", type=int, default=200, help="distinct origin/destination pairs to draw from")
+    parser.add_argument("--scenarios", default="", help="comma-separated subset of scenarios to run")
+    parser.add_argument("--prefetch", action="store_true", help="enable the background weather prefetcher")
+    parser.add_argument("--provider-quotas", action="store_true",
+                        help="keep the default provider quotas (lifted otherwise, so the stubs measure service throughput)")
+    parser.add_argument("--service-port", type=int, default=8765)
+    parser.add_argument("--stub-port", type=int, default=9765)
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON; exit 1 if p95 regressed beyond --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    add_arguments(parser)
+    args = parser.parse_args()
+    args.levels = [int(c) for c in args.concurrency.split(",")]
+    args.scenarios = [s for s in args.scenarios.split(",") if s]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        stubs = start_stubs(args)
+        try:
+            asyncio.run(wait_ready(f"http://127.0.0.1:{args.stub_port}/_stats"))
+            rows = asyncio.run(run(args, workdir))
+        finally:
+            stop([stubs])
+
+    print_table(rows, ["scenario", "concurrency", "requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms",
+                       "upstream_per_req", "upstream"])
+    if args.save:
+        save(args.save, rows)
+    if args.compare:
+        regressions = compare(args.compare, rows, ("scenario", "concurrency"), "p95_ms", args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Micro-benchmarks for the service's pure, CPU-bound functions.
+
+Imports app.py with placeholder API keys and temporary stores; no network.
+
+    python benchmarks/micro.py
+    python benchmarks/micro.py --save micro.json
+    python benchmarks/micro.py --compare micro.json --tolerance 0.3
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, SERVICE_DIR)
+
+from report import compare, print_table, save  # noqa: E402
+
+
+def load_app(workdir: str):
+    os.environ.update(
+        OPENROUTE_API_KEY="bench", OPENWEATHER_API_KEY="bench", LOG_LEVEL="WARNING",
+        ROUTE_STORE_PATH=os.path.join(workdir, "routes.sqlite3"),
+        HUB_MATRIX_PATH=os.path.join(workdir, "hub_matrix.npy"), ETA_TRAINING_LOG_PATH="",
+    )
+    import app
+    return app
+
+
+def time_call(fn: Callable, min_seconds: float) -> dict:
+    """Mean and best-of-batches time per call, auto-scaling the batch to ~10ms"""
+    fn()
+    batch = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(batch):
+            fn()
+        if time.perf_counter() - start >= 0.01:
+            break
+        batch *= 2
+    samples: List[float] = []
+    deadline = time.perf_counter() + min_seconds
+    while time.perf_counter() < deadline or len(samples) < 5:
+        start = time.perf_counter()
+        for _ in range(batch):
+            fn()
+        samples.append((time.perf_counter() - start) / batch)
+    return {
+        "calls": batch * len(samples),
+        "mean_us": round(sum(samples) / len(samples) * 1e6, 2),
+        "best_us": round(min(samples) * 1e6, 2),
+    }
+
+
+def benchmarks(app, seed: int) -> dict:
+    import numpy as np
+    from forecast import ForecastSeries, weather_at
+    from route_weather import sample_route
+    from scoring import score_batch
+    from warehouse_index import WarehouseIndex
+
+    rng = random.Random(seed)
+    def point():
+        return {"lat": rng.uniform(28.40, 28.88), "lon": rng.uniform(76.95, 77.50)}
+    points = [point() for _ in range(1000)]
+    weather = {"temperature": 36.0, "condition": "Rain", "description": "rain", "humidity": 80,
+               "wind_speed": 22.0, "visibility": 4.0, "pressure": 1002, "feels_like": 40.0, "precipitation_chance": 70}
+    route = {"distance_km": 42.0, "estimated_time_minutes": 150.0, "steps": [], "geometry": None}
+    okhla = app.DELHI_INDUSTRIAL_HUBS["Okhla Industrial Area"]
+    lats = [p["lat"] for p in points]
+    lons = [p["lon"] for p in points]
+    now = int(time.time())
+    series = ForecastSeries.from_openweather(weather, now, {"list": [
+        {"dt": now + 10800 * (i + 1), "main": {"temp": 30, "humidity": 50, "pressure": 1000, "feels_like": 31},
+         "weather": [{"main": "Clouds", "description": "c"}], "wind": {"speed": 3}, "visibility": 9000, "pop": 0.3}
+        for i in range(40)
+    ]})
+    snapshot = dict(weather, forecast_series=series)
+    line = [[77.0 + 0.005 * i, 28.4 + 0.004 * i] for i in range(200)]
+    origin, destination = points[0], points[1]
+    warehouses = WarehouseIndex()
+    for i in range(20000):
+        p = point()
+        warehouses.upsert(f"W{i}", p["lat"], p["lon"], rng.choice([100, 300, 600, 1200]), rng.uniform(15, 120))
+    corridor = [(lat, lon) for lon, lat in line[:40]]
+    def eta_columns(n):
+        return {
+            "origin_lat": np.array(lats[:n]), "origin_lon": np.array(lons[:n]),
+            "dest_lat": np.array(lats[::-1][:n]), "dest_lon": np.array(lons[::-1][:n]),
+            "minute_of_day": np.full(n, 600.0)
+        }
+    eta_one, eta_1k = eta_columns(1), eta_columns(1000)
+
+    cases = {
+        "find_nearest_industrial_hub": lambda: app.find_nearest_industrial_hub(origin["lat"], origin["lon"]),
+        "calculate_real_delhi_distance": lambda: app.calculate_real_delhi_distance(origin, destination),
+        "analyze_weather_impact": lambda: app.analyze_weather_impact(weather),
+        "calculate_risk_score": lambda: app.calculate_risk_score(weather, route, okhla, okhla),
+        "generate_ai_suggestions": lambda: app.generate_ai_suggestions(weather, route, okhla, okhla),
+        "hub_index_query_1k": lambda: app.HUB_INDEX.query(lats, lons, 1),
+        "score_batch_1k": lambda: score_batch([weather] * 1000, [150.0] * 1000, [okhla] * 1000, [None] * 1000),
+        "weather_at": lambda: weather_at(snapshot, datetime.now() + timedelta(hours=7)),
+        "sample_route_200pt": lambda: sample_route(line),
+        "eta_predict_1": lambda: app.eta_model.predict(eta_one),
+        "eta_predict_1k": lambda: app.eta_model.predict(eta_1k),
+        "warehouse_search_hub_20k": lambda: warehouses.search([28.6], [77.2], 10, 500, 40),
+        "warehouse_search_route_20k": lambda: warehouses.search(
+            [c[0] for c in corridor], [c[1] for c in corridor], 3, 500, 40
+        ),
+    }
+    if app.road_graph is not None:
+        cases["local_router_route"] = lambda: app.road_graph.route(
+            {"lat": 28.52, "lon": 77.05}, {"lat": 28.80, "lon": 77.30}
+        )
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--min-seconds", type=float, default=0.5, help="measuring time per benchmark")
+    parser.add_argument("--only", default="", help="comma-separated subset of benchmarks")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON; exit 1 if mean time regressed beyond --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    args = parser.parse_args()
+    only = [name for name in args.only.split(",") if name]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = load_app(workdir)
+        rows = []
+        for name, fn in benchmarks(app, args.seed).items():
+            if only and name not in only:
+                continue
+            rows.append({"benchmark": name, **time_call(fn, args.min_seconds)})
+        app.route_store.close()
+
+    print_table(rows, ["benchmark", "calls", "mean_us", "best_us"])
+    if args.save:
+        save(args.save, rows)
+    if args.compare:
+        regressions = compare(args.compare, rows, ("benchmark",), "mean_us", args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
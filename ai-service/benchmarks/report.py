@@ -0,0 +1,45 @@
+import json
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+def latency_summary(latencies_s: Sequence[float], elapsed_s: float, errors: int = 0) -> dict:
+    """Throughput and latency percentiles (ms) for one benchmark run"""
+    ms = np.asarray(latencies_s, dtype=np.float64) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (0.0, 0.0, 0.0)
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "rps": round(len(ms) / elapsed_s, 1) if elapsed_s else 0.0,
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+    }
+
+
+def print_table(rows: List[dict], columns: Sequence[str]):
+    widths = {c: max(len(c), *(len(str(r.get(c, ""))) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    print("  ".join("-" * widths[c] for c in columns))
+    for row in rows:
+        print("  ".join(str(row.get(c, "")).ljust(widths[c]) for c in columns))
+
+
+def save(path: str, rows: List[dict]):
+    with open(path, "w") as f:
+        json.dump(rows, f, indent=2)
+
+
+def compare(path: str, rows: List[dict], key: Sequence[str], metric: str, tolerance: float) -> List[str]:
+    """Rows whose metric got worse than the saved baseline by more than tolerance (a fraction)"""
+    with open(path) as f:
+        baseline: Dict[tuple, dict] = {tuple(r[k] for k in key): r for r in json.load(f)}
+    regressions = []
+    for row in rows:
+        before = baseline.get(tuple(row[k] for k in key))
+        if before and before[metric] > 0 and row[metric] > before[metric] * (1 + tolerance):
+            regressions.append(
+                f"{'/'.join(str(row[k]) for k in key)}: {metric} {before[metric]} -> {row[metric]}"
+            )
+    return regressions
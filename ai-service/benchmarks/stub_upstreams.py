@@ -0,0 +1,165 @@
+"""Local stand-ins for the OpenWeather, OpenRouteService and OSRM APIs.
+
+Run standalone (python benchmarks/stub_upstreams.py --port 9100) and point the
+service at it with OPENWEATHER_BASE_URL, OPENROUTE_BASE_URL and OSRM_BASE_URL.
+Latency and error rate are set per upstream; GET /_stats returns call counts
+and POST /_reset clears them.
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+from collections import Counter
+from typing import Dict
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+UPSTREAMS = ("weather", "forecast", "ors", "matrix", "osrm")
+
+
+def parse_spec(spec: str, default: float) -> Dict[str, float]:
+    """"ors=150,matrix=300" -> per-upstream values, the rest at default"""
+    values = {name: default for name in UPSTREAMS}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        name, value = part.split("=")
+        if name not in values:
+            raise ValueError(f"Unknown upstream {name!r}; expected one of {', '.join(UPSTREAMS)}")
+        values[name] = float(value)
+    return values
+
+
+def km_between(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    return math.hypot((lat2 - lat1) * 111.0, (lon2 - lon1) * 97.5)
+
+
+def create_app(latency_ms: Dict[str, float], jitter: float = 0.3, error_rate: Dict[str, float] = None,
+               forecast_steps: int = 40, geometry_points: int = 50, seed: int = 7) -> Starlette:
+    error_rate = error_rate or {name: 0.0 for name in UPSTREAMS}
+    rng = random.Random(seed)
+    calls: Counter = Counter()
+    errors: Counter = Counter()
+
+    async def simulate(name: str):
+        calls[name] += 1
+        delay = latency_ms[name] / 1000 * (1 + rng.uniform(-jitter, jitter))
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if rng.random() < error_rate[name]:
+            errors[name] += 1
+            return JSONResponse({"error": "stub failure"}, status_code=503)
+        return None
+
+    async def weather(request: Request):
+        failure = await simulate("weather")
+        if failure:
+            return failure
+        lat = float(request.query_params.get("lat", 28.6))
+        return JSONResponse({
+            "dt": int(time.time()),
+            "main": {"temp": 30 + lat % 3, "humidity": 55, "pressure": 1008, "feels_like": 32},
+            "weather": [{"main": "Clear", "description": "clear sky"}],
+            "wind": {"speed": 4.2},
+            "visibility": 8000
+        })
+
+    async def forecast(request: Request):
+        failure = await simulate("forecast")
+        if failure:
+            return failure
+        now = int(time.time()) // 10800 * 10800 + 10800
+        return JSONResponse({"list": [
+            {
+                "dt": now + i * 10800,
+                "main": {"temp": 28 + 6 * math.sin(i / 4), "humidity": 60, "pressure": 1006, "feels_like": 30},
+                "weather": [{"main": "Rain" if i % 9 == 4 else "Clouds", "description": "stub"}],
+                "wind": {"speed": 3 + i % 5},
+                "visibility": 9000,
+                "pop": (i % 9) / 10
+            }
+            for i in range(forecast_steps)
+        ]})
+
+    async def directions(request: Request):
+        # Read the body before the simulated delay; hedged callers may hang up mid-wait
+        body = await request.json()
+        failure = await simulate("ors")
+        if failure:
+            return failure
+        (lon1, lat1), (lon2, lat2) = body["coordinates"][:2]
+        km = km_between(lat1, lon1, lat2, lon2) * 1.3
+        n = max(2, geometry_points)
+        line = [[lon1 + (lon2 - lon1) * k / (n - 1), lat1 + (lat2 - lat1) * k / (n - 1)] for k in range(n)]
+        return JSONResponse({"features": [{
+            "geometry": {"type": "LineString", "coordinates": line},
+            "properties": {"segments": [{"distance": km * 1000, "duration": km / 28 * 3600, "steps": []}]}
+        }]})
+
+    async def matrix(request: Request):
+        body = await request.json()
+        failure = await simulate("matrix")
+        if failure:
+            return failure
+        locations = body["locations"]
+        km = [[km_between(locations[s][1], locations[s][0], locations[d][1], locations[d][0]) * 1.3
+               for d in body["destinations"]] for s in body["sources"]]
+        return JSONResponse({
+            "distances": [[v * 1000 for v in row] for row in km],
+            "durations": [[v / 28 * 3600 for v in row] for row in km]
+        })
+
+    async def osrm(request: Request):
+        failure = await simulate("osrm")
+        if failure:
+            return failure
+        (lon1, lat1), (lon2, lat2) = [map(float, p.split(",")) for p in request.path_params["coords"].split(";")[:2]]
+        km = km_between(lat1, lon1, lat2, lon2) * 1.3
+        return JSONResponse({"routes": [{"distance": km * 1000, "duration": km / 28 * 3600}]})
+
+    async def stats(request: Request):
+        return JSONResponse({"calls": dict(calls), "errors": dict(errors)})
+
+    async def reset(request: Request):
+        calls.clear()
+        errors.clear()
+        return JSONResponse({"status": "reset"})
+
+    return Starlette(routes=[
+        Route("/data/2.5/weather", weather),
+        Route("/data/2.5/forecast", forecast),
+        Route("/v2/directions/driving-car", directions, methods=["POST"]),
+        Route("/v2/matrix/driving-car", matrix, methods=["POST"]),
+        Route("/route/v1/driving/{coords:path}", osrm),
+        Route("/_stats", stats),
+        Route("/_reset", reset, methods=["POST"]),
+    ])
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", default="weather=40,forecast=60,ors=150,matrix=250,osrm=120",
+                        help="per-upstream mean latency, e.g. ors=150,matrix=300 (others 50)")
+    parser.add_argument("--jitter", type=float, default=0.3, help="uniform latency jitter as a fraction of the mean")
+    parser.add_argument("--error-rate", default="", help="per-upstream failure probability, e.g. ors=0.2")
+    parser.add_argument("--forecast-steps", type=int, default=40, help="3-hour steps per forecast response")
+    parser.add_argument("--geometry-points", type=int, default=50, help="points per route geometry")
+    parser.add_argument("--seed", type=int, default=7)
+
+
+def app_from_args(args) -> Starlette:
+    return create_app(
+        parse_spec(args.latency_ms, 50.0), args.jitter, parse_spec(args.error_rate, 0.0),
+        args.forecast_steps, args.geometry_points, args.seed
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(app_from_args(args), host="127.0.0.1", port=args.port, log_level="warning")
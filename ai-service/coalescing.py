@@ -0,0 +1,93 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Tuple
+
+from providers import consume_exception
+from quota import PriorityGroup, current_priority, priority_group
+
+
+class IdempotencyConflict(Exception):
+    """An Idempotency-Key was reused with a different request"""
+
+
+class RequestCoalescer:
+    """Identical in-flight requests share one computation.
+
+    The computation runs as its own task, so the first caller hanging up does
+    not cancel it for the others, and at the most urgent priority among them.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, Tuple[asyncio.Future, PriorityGroup]] = {}
+        self.computed = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable]):
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            self.computed += 1
+            group = priority_group()
+            task = asyncio.ensure_future(group.run(compute()))
+            self._inflight[key] = (task, group)
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            task.add_done_callback(consume_exception)
+        else:
+            self.coalesced += 1
+            task, group = inflight
+            group.join(current_priority())
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._inflight), "computed": self.computed, "coalesced": self.coalesced}
+
+
+class IdempotencyStore:
+    """Replays the result of a successful request for ttl_seconds under its Idempotency-Key.
+
+    A key seen while its first request is still running waits for that result;
+    failed requests are forgotten so the client can retry.
+    """
+
+    def __init__(self, ttl_seconds: float = 300, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Hashable, float, asyncio.Future, PriorityGroup]]" = OrderedDict()
+        self.replayed = 0
+        self.conflicts = 0
+
+    def _forget_failure(self, key: str, task: asyncio.Future):
+        if task.cancelled() or task.exception() is not None:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is task:
+                del self._entries[key]
+
+    async def run(self, key: str, fingerprint: Hashable, compute: Callable[[], Awaitable]) -> Tuple[object, bool]:
+        """Return (result, replayed)"""
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > now:
+            if entry[0] != fingerprint:
+                self.conflicts += 1
+                raise IdempotencyConflict("Idempotency-Key was already used for a different request")
+            self.replayed += 1
+            entry[3].join(current_priority())
+            return await asyncio.shield(entry[2]), True
+
+        group = priority_group()
+        task = asyncio.ensure_future(group.run(compute()))
+        task.add_done_callback(lambda t: self._forget_failure(key, t))
+        self._entries[key] = (fingerprint, now + self.ttl_seconds, task, group)
+        self._entries.move_to_end(key)
+        # Entries expire in insertion order, so the oldest are at the front
+        while self._entries and (len(self._entries) > self.max_entries or next(iter(self._entries.values()))[1] <= now):
+            self._entries.popitem(last=False)
+        return await asyncio.shield(task), False
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self._entries),
+            "replayed": self.replayed,
+            "conflicts": self.conflicts,
+            "ttl_seconds": self.ttl_seconds
+        }
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+MINUTES_PER_DAY = 1440
+# Hub peak hours are Delhi wall-clock times (Asia/Kolkata, no daylight saving)
+HUB_TIMEZONE = timezone(timedelta(hours=5, minutes=30), "IST")
+# Extra travel time while a hub is in its peak hours, by traffic_level; each end covers half the trip
+PEAK_SLOWDOWN = {"Low": 0.15, "Medium": 0.3, "High": 0.5}
+
+
+def parse_peak_hours(ranges: Sequence[str]) -> List[Tuple[int, int]]:
+    """["09:00-11:00", ...] -> [(540, 660), ...] minutes of day, end exclusive"""
+    spans = []
+    for span in ranges:
+        start, end = span.split("-")
+        h1, m1 = map(int, start.split(":"))
+        h2, m2 = map(int, end.split(":"))
+        spans.append((h1 * 60 + m1, h2 * 60 + m2))
+    return spans
+
+
+def compile_peak_masks(hubs: Sequence[dict]) -> np.ndarray:
+    """(hubs, 1440) bool array: whether each minute of the day is inside one of the hub's peak windows"""
+    masks = np.zeros((len(hubs), MINUTES_PER_DAY), dtype=bool)
+    for i, hub in enumerate(hubs):
+        for start, end in parse_peak_hours(hub.get("peak_hours", [])):
+            if start <= end:
+                masks[i, start:end] = True
+            else:
+                masks[i, start:] = True
+                masks[i, :end] = True
+    return masks
+
+
+def hub_local(when: datetime) -> datetime:
+    """when in hub local time; naive datetimes are taken to already be Delhi wall-clock time"""
+    if when.tzinfo is None:
+        return when.replace(tzinfo=HUB_TIMEZONE)
+    return when.astimezone(HUB_TIMEZONE)
+
+
+def candidate_departures(earliest: datetime, horizon_hours: float, step_minutes: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(epoch seconds, hub-local minute of day) of every step_minutes slot from earliest over the horizon"""
+    earliest = hub_local(earliest)
+    offsets = np.arange(0, horizon_hours * 60, step_minutes, dtype=np.int64)
+    start_minute = earliest.hour * 60 + earliest.minute
+    return earliest.timestamp() + offsets * 60.0, (start_minute + offsets) % MINUTES_PER_DAY
+
+
+def travel_minutes_by_slot(base_minutes: np.ndarray, departure_minute: np.ndarray, origin_hubs: np.ndarray,
+                           dest_hubs: np.ndarray, peak_masks: np.ndarray,
+                           slowdown: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Travel minutes for every (route, slot), with whether the origin is in peak at departure
+    and the destination at arrival; all shaped (routes, slots)"""
+    base = np.asarray(base_minutes, dtype=np.float64)[:, None]
+    origin_peak = peak_masks[origin_hubs[:, None], departure_minute[None, :]]
+    first_half = base * (1 + 0.5 * slowdown[origin_hubs][:, None] * origin_peak)
+    arrival_minute = (departure_minute[None, :] + first_half).astype(np.int64) % MINUTES_PER_DAY
+    dest_peak = peak_masks[dest_hubs[:, None], arrival_minute]
+    minutes = first_half + base * 0.5 * slowdown[dest_hubs][:, None] * dest_peak
+    return minutes, origin_peak, dest_peak
+
+
+def pick_windows(cost: np.ndarray, count: int, tolerance: float) -> List[Tuple[int, int, int]]:
+    """Up to count non-overlapping (first, last, best) slot ranges, cheapest first.
+
+    Each window grows from the cheapest free slot over neighbours whose cost
+    stays within tolerance of it.
+    """
+    n = len(cost)
+    values = cost.tolist()
+    claimed = [False] * (n + 2)  # padded by one slot on each side
+    windows = []
+    for best in np.argsort(cost, kind="stable").tolist():
+        if len(windows) >= count:
+            break
+        # Skip slots inside or touching a window already chosen, so windows are distinct options
+        if claimed[best] or claimed[best + 1] or claimed[best + 2]:
+            continue
+        limit = values[best] * (1 + tolerance)
+        first = last = best
+        while first > 0 and not claimed[first] and values[first - 1] <= limit:
+            first -= 1
+        while last < n - 1 and not claimed[last + 2] and values[last + 1] <= limit:
+            last += 1
+        claimed[first + 1:last + 2] = [True] * (last - first + 1)
+        windows.append((first, last, best))
+    return windows
@@ -0,0 +1,235 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from departure_windows import MINUTES_PER_DAY, compile_peak_masks, hub_local
+from hub_matrix import ESTIMATED_MINUTES_PER_KM, ROAD_DETOUR_FACTOR
+from scoring import FEATURE_DEFAULTS
+from spatial_index import SpatialIndex, haversine_km
+
+TRAFFIC_LEVELS = {"Low": 0.0, "Medium": 0.5, "High": 1.0}
+FEATURE_NAMES = [
+    "bias", "km", "sqrt_km", "hub_access_km",
+    "km_origin_traffic", "km_dest_traffic", "km_origin_peak", "km_dest_peak",
+    "km_day_sin", "km_day_cos", "km_half_day_sin", "km_half_day_cos",
+    "km_precipitation", "km_low_visibility", "km_wind",
+]
+# Input columns; weather falls back to the scoring defaults when missing
+LANE_COLUMNS = ("origin_lat", "origin_lon", "dest_lat", "dest_lon")
+WEATHER_COLUMNS = ("precipitation_chance", "visibility", "wind_speed")
+COLUMNS = LANE_COLUMNS + ("minute_of_day",) + WEATHER_COLUMNS
+RIDGE_LAMBDA = 1e-3
+
+
+def minute_of_day(departure: datetime) -> int:
+    """Delhi minute of day of a departure, the time feature the model is trained on"""
+    local = hub_local(departure)
+    return local.hour * 60 + local.minute
+
+
+class EtaFeatures:
+    """Vectorized feature matrix for fast ETA estimates from coordinates, time of day and weather"""
+
+    def __init__(self, hubs: Dict[str, dict]):
+        self.index = SpatialIndex.from_records(hubs)
+        self.traffic = np.array([TRAFFIC_LEVELS.get(h.get("traffic_level"), 0.5) for h in self.index.payloads])
+        self.peak = compile_peak_masks(self.index.payloads)
+
+    def matrix(self, columns: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """(features shaped (n, len(FEATURE_NAMES)), haversine km)"""
+        olat, olon = columns["origin_lat"], columns["origin_lon"]
+        dlat, dlon = columns["dest_lat"], columns["dest_lon"]
+        n = len(olat)
+        def column(name: str) -> np.ndarray:
+            values = np.asarray(columns.get(name, np.full(n, np.nan)), dtype=np.float64)
+            return np.where(np.isnan(values), FEATURE_DEFAULTS.get(name, 0.0), values)
+
+        km = haversine_km(olat, olon, dlat, dlon)
+        origin_hub, origin_access = self.index.query(olat, olon, 1)
+        dest_hub, dest_access = self.index.query(dlat, dlon, 1)
+        origin_hub, dest_hub = origin_hub[:, 0], dest_hub[:, 0]
+        minute = column("minute_of_day").astype(np.int64) % MINUTES_PER_DAY
+        arrival = (minute + km * ROAD_DETOUR_FACTOR * ESTIMATED_MINUTES_PER_KM).astype(np.int64) % MINUTES_PER_DAY
+        day = 2 * np.pi * minute / MINUTES_PER_DAY
+        features = np.column_stack([
+            np.ones(n), km, np.sqrt(km), origin_access[:, 0] + dest_access[:, 0],
+            km * self.traffic[origin_hub], km * self.traffic[dest_hub],
+            km * self.peak[origin_hub, minute], km * self.peak[dest_hub, arrival],
+            km * np.sin(day), km * np.cos(day), km * np.sin(2 * day), km * np.cos(2 * day),
+            km * column("precipitation_chance") / 100,
+            km * np.clip(10 - column("visibility"), 0, 10) / 10,
+            km * column("wind_speed") / 20,
+        ])
+        return features, km
+
+
+def baseline_estimates(km: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """The hub-matrix seeding heuristic: fixed detour factor and minutes per km"""
+    distance = km * ROAD_DETOUR_FACTOR
+    return distance, distance * ESTIMATED_MINUTES_PER_KM
+
+
+def error_summary(predicted: np.ndarray, actual: np.ndarray) -> dict:
+    ape = np.abs(predicted - actual) / np.maximum(actual, 1e-6)
+    return {
+        "mae": round(float(np.mean(np.abs(predicted - actual))), 3),
+        "mape": round(float(np.mean(ape)), 4),
+        "p90_ape": round(float(np.percentile(ape, 90)), 4) if len(ape) else 0.0
+    }
+
+
+class EtaModel:
+    """Ridge regression from EtaFeatures to road distance (km) and duration (minutes).
+
+    Trained offline with train_eta.py from logged upstream route responses and
+    stored as JSON next to its accuracy report.
+    """
+
+    def __init__(self, features: EtaFeatures, weights: np.ndarray = None, scale: np.ndarray = None,
+                 info: dict = None):
+        self.features = features
+        self.weights = weights
+        self.scale = scale
+        self.info = info or {}
+
+    def fit(self, columns: Dict[str, np.ndarray], distance_km: np.ndarray, minutes: np.ndarray) -> "EtaModel":
+        x, _ = self.features.matrix(columns)
+        # Standardize feature magnitudes for conditioning; the bias column keeps unit scale
+        self.scale = np.where(x.std(axis=0) > 0, x.std(axis=0), 1.0)
+        self.scale[0] = 1.0
+        xs = x / self.scale
+        y = np.column_stack([distance_km, minutes])
+        penalty = RIDGE_LAMBDA * len(xs) * np.eye(xs.shape[1])
+        penalty[0, 0] = 0.0
+        self.weights = np.linalg.solve(xs.T @ xs + penalty, xs.T @ y)
+        self.info = {"trained_at": time.time(), "samples": int(len(xs))}
+        return self
+
+    def predict(self, columns: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """(distance_km, minutes) arrays; falls back to the baseline heuristic when untrained"""
+        x, km = self.features.matrix(columns)
+        if self.weights is None:
+            return baseline_estimates(km)
+        y = (x / self.scale) @ self.weights
+        # Roads are never shorter than the great circle, nor faster than ~80 km/h across NCR
+        distance = np.maximum(y[:, 0], km)
+        return distance, np.maximum(y[:, 1], distance * 0.75)
+
+    def evaluate(self, columns: Dict[str, np.ndarray], distance_km: np.ndarray, minutes: np.ndarray) -> dict:
+        """Accuracy against held-out routes, next to the baseline heuristic"""
+        distance, duration = self.predict(columns)
+        _, km = self.features.matrix(columns)
+        base_distance, base_minutes = baseline_estimates(km)
+        return {
+            "samples": int(len(minutes)),
+            "minutes": error_summary(duration, minutes),
+            "distance_km": error_summary(distance, distance_km),
+            "baseline": {
+                "minutes": error_summary(base_minutes, minutes),
+                "distance_km": error_summary(base_distance, distance_km)
+            }
+        }
+
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                **self.info,
+                "features": FEATURE_NAMES,
+                "scale": self.scale.tolist(),
+                "weights": self.weights.tolist()
+            }, f, indent=2)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, features: EtaFeatures) -> Optional["EtaModel"]:
+        """Stored model, or None if missing or trained on a different feature set"""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("features") != FEATURE_NAMES:
+            return None
+        info = {k: v for k, v in data.items() if k not in ("features", "scale", "weights")}
+        return cls(features, np.array(data["weights"]), np.array(data["scale"]), info)
+
+    def stats(self) -> dict:
+        trained_at = self.info.get("trained_at")
+        return {
+            "trained": self.weights is not None,
+            "trained_at": datetime.fromtimestamp(trained_at).isoformat() if trained_at else None,
+            "samples": self.info.get("samples", 0),
+            "holdout": self.info.get("holdout")
+        }
+
+
+class RouteLog:
+    """Append-only JSON lines of upstream route responses, the training data for EtaModel.
+
+    A record that would take the file past max_bytes starts a new file; the
+    full one is renamed to <path>.1, replacing the previous one.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.written = 0
+        self.rotations = 0
+        self._lock = threading.Lock()
+
+    def append(self, origin: dict, destination: dict, departure: datetime, route: dict, weather: dict):
+        record = {
+            "ts": time.time(),
+            "origin": {"lat": origin["lat"], "lon": origin["lon"]},
+            "destination": {"lat": destination["lat"], "lon": destination["lon"]},
+            "minute_of_day": minute_of_day(departure),
+            "provider": route.get("provider"),
+            "distance_km": route["distance_km"],
+            "minutes": route["estimated_time_minutes"],
+            **{k: weather.get(k) for k in WEATHER_COLUMNS}
+        }
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            if self.max_bytes and os.path.exists(self.path) \
+                    and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+                self.rotations += 1
+            with open(self.path, "a") as f:
+                f.write(line)
+            self.written += 1
+
+
+def load_route_log(paths: Sequence[str]) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray]:
+    """Route log records as (columns, distance_km, minutes)"""
+    rows = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                r = json.loads(line)
+                if not r.get("distance_km") or not r.get("minutes"):
+                    continue
+                rows.append(r)
+    def weather(name: str) -> np.ndarray:
+        return np.array([np.nan if r.get(name) is None else r[name] for r in rows], dtype=np.float64)
+    columns = {
+        "origin_lat": np.array([r["origin"]["lat"] for r in rows], dtype=np.float64),
+        "origin_lon": np.array([r["origin"]["lon"] for r in rows], dtype=np.float64),
+        "dest_lat": np.array([r["destination"]["lat"] for r in rows], dtype=np.float64),
+        "dest_lon": np.array([r["destination"]["lon"] for r in rows], dtype=np.float64),
+        "minute_of_day": np.array([r["minute_of_day"] for r in rows], dtype=np.float64),
+        **{name: weather(name) for name in WEATHER_COLUMNS}
+    }
+    return (
+        columns,
+        np.array([r["distance_km"] for r in rows], dtype=np.float64),
+        np.array([r["minutes"] for r in rows], dtype=np.float64)
+    )
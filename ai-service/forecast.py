@@ -0,0 +1,105 @@
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from departure_windows import hub_local
+
+# Numeric weather fields kept per forecast step, in row order of ForecastSeries.values
+FORECAST_FIELDS = ("temperature", "feels_like", "humidity", "pressure", "wind_speed", "visibility", "precipitation_chance")
+ROUNDING = {"temperature": 1, "feels_like": 1, "humidity": 0, "pressure": 0, "wind_speed": 1, "visibility": 1, "precipitation_chance": 0}
+
+# Without a departure time precipitation_chance keeps its original meaning: the chance 24 hours ahead
+DEFAULT_LOOKAHEAD_SECONDS = 24 * 3600
+
+
+class ForecastSeries:
+    """Time-indexed weather for one location: the current observation followed by the 3-hourly forecast.
+
+    Numeric fields are a float32 (fields x steps) array so every departure time
+    or ETA is answered by interpolation from a single upstream fetch.
+    """
+
+    __slots__ = ("times", "values", "conditions", "descriptions")
+
+    def __init__(self, times: np.ndarray, values: np.ndarray, conditions: List[str], descriptions: List[str]):
+        self.times = times
+        self.values = values
+        self.conditions = conditions
+        self.descriptions = descriptions
+
+    @classmethod
+    def from_openweather(cls, current: dict, observed_at: float, forecast: dict) -> "ForecastSeries":
+        steps = forecast.get("list", [])
+        rows = [dict(current, precipitation_chance=steps[0].get("pop", 0) * 100 if steps else 0)]
+        times = [observed_at]
+        for step in steps:
+            if step["dt"] <= times[-1]:
+                continue
+            times.append(step["dt"])
+            rows.append({
+                "temperature": step["main"]["temp"],
+                "feels_like": step["main"]["feels_like"],
+                "humidity": step["main"]["humidity"],
+                "pressure": step["main"]["pressure"],
+                "wind_speed": step["wind"]["speed"],
+                "visibility": step.get("visibility", 10000) / 1000,  # Convert to km
+                "precipitation_chance": step.get("pop", 0) * 100,
+                "condition": step["weather"][0]["main"],
+                "description": step["weather"][0]["description"]
+            })
+        values = np.array([[row[field] for row in rows] for field in FORECAST_FIELDS], dtype=np.float32)
+        return cls(
+            np.array(times, dtype=np.float64), values,
+            [row["condition"] for row in rows], [row["description"] for row in rows]
+        )
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def columns_at(self, when: Sequence[float]) -> Dict[str, np.ndarray]:
+        """Interpolated numeric fields at many epoch timestamps (clamped to the series ends)"""
+        when = np.asarray(when, dtype=np.float64)
+        return {field: np.interp(when, self.times, self.values[i]) for i, field in enumerate(FORECAST_FIELDS)}
+
+    def at(self, when: float) -> dict:
+        """Interpolated weather at an epoch timestamp; condition comes from the nearest step"""
+        columns = self.columns_at([when])
+        point = {}
+        for field in FORECAST_FIELDS:
+            digits = ROUNDING[field]
+            point[field] = round(float(columns[field][0]), digits) if digits else int(round(float(columns[field][0])))
+        nearest = int(np.argmin(np.abs(self.times - when)))
+        point["condition"] = self.conditions[nearest]
+        point["description"] = self.descriptions[nearest]
+        return point
+
+
+def weather_at(weather: dict, when: Optional[datetime] = None) -> dict:
+    """Public weather dict for a cached snapshot, evaluated at a departure time or ETA.
+
+    Without a time the current observation is returned with the precipitation
+    chance 24 hours ahead; with one, every field comes from the series. A
+    naive time is Delhi time, not the server's zone.
+    """
+    series: Optional[ForecastSeries] = weather.get("forecast_series")
+    result = {k: v for k, v in weather.items() if k != "forecast_series"}
+    if series is None or not len(series):
+        return result
+    if when is None:
+        result["precipitation_chance"] = series.at(time.time() + DEFAULT_LOOKAHEAD_SECONDS)["precipitation_chance"]
+        return result
+    when = hub_local(when)
+    result.update(series.at(when.timestamp()))
+    result["forecast_time"] = when.isoformat()
+    return result
+
+
+def weather_columns_at(weather: dict, when: Sequence[float]) -> Dict[str, np.ndarray]:
+    """Numeric fields of a cached snapshot at many epoch timestamps; constant without a forecast series"""
+    series: Optional[ForecastSeries] = weather.get("forecast_series")
+    if series is not None and len(series):
+        return series.columns_at(when)
+    n = len(when)
+    return {field: np.full(n, float(weather.get(field, np.nan)), dtype=np.float64) for field in FORECAST_FIELDS}
@@ -0,0 +1,118 @@
+import hashlib
+import math
+from collections import OrderedDict
+from typing import List, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+# Web-mercator ground resolution at the equator, zoom 0 (metres per 256px tile pixel)
+METERS_PER_PIXEL_Z0 = 156543.03392
+
+
+def tolerance_for_zoom(zoom: float, lat: float, pixels: float = 1.0) -> float:
+    """Simplification tolerance in metres: `pixels` screen pixels at this zoom and latitude"""
+    return METERS_PER_PIXEL_Z0 * math.cos(math.radians(lat)) / (2 ** zoom) * pixels
+
+
+def douglas_peucker(coordinates: List[List[float]], tolerance_m: float) -> np.ndarray:
+    """Indices of the points kept by Douglas-Peucker on a GeoJSON [lon, lat] line"""
+    line = np.asarray(coordinates, dtype=np.float64)
+    n = len(line)
+    if n <= 2 or tolerance_m <= 0:
+        return np.arange(n)
+    # Local equirectangular projection is accurate to well under a metre across a city
+    lat0 = math.radians(float(line[:, 1].mean()))
+    x = np.radians(line[:, 0]) * math.cos(lat0) * EARTH_RADIUS_M
+    y = np.radians(line[:, 1]) * EARTH_RADIUS_M
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack: List[Tuple[int, int]] = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        length = math.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(px, py)
+        else:
+            distances = np.abs(px * dy - py * dx) / length
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance_m:
+            split = first + 1 + i
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep)
+
+
+def encode_polyline(coordinates: List[List[float]], precision: int = 5) -> str:
+    """Google encoded polyline for a GeoJSON [lon, lat] line (encodes lat, lon pairs)"""
+    scaled = np.round(np.asarray(coordinates, dtype=np.float64)[:, ::-1] * 10 ** precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    chunks = []
+    for value in deltas.tolist():
+        value = ~(value << 1) if value < 0 else value << 1
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[List[float]]:
+    """Inverse of encode_polyline, returning GeoJSON [lon, lat] pairs"""
+    values, value, shift = [], 0, 0
+    for char in encoded:
+        byte = ord(char) - 63
+        value |= (byte & 0x1F) << shift
+        shift += 5
+        if byte < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    points = np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+    return points[:, ::-1].tolist()
+
+
+class GeometryCache:
+    """LRU of simplified geometries keyed by the source line's digest, zoom and output format"""
+
+    def __init__(self, max_entries: int = 2048, tolerance_px: float = 1.0):
+        self.max_entries = max_entries
+        self.tolerance_px = tolerance_px
+        self._entries: "OrderedDict[tuple, dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def simplified(self, coordinates: List[List[float]], zoom: float, fmt: str = "polyline") -> dict:
+        line = np.asarray(coordinates, dtype=np.float64)
+        key = (hashlib.blake2b(line.tobytes(), digest_size=16).digest(), zoom, fmt)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        tolerance = tolerance_for_zoom(zoom, float(line[:, 1].mean()), self.tolerance_px)
+        kept = line[douglas_peucker(line, tolerance)].tolist()
+        entry = {"format": fmt, "zoom": zoom, "points": len(kept), "source_points": len(line)}
+        if fmt == "polyline":
+            entry["polyline"] = encode_polyline(kept)
+        else:
+            entry["coordinates"] = kept
+        self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
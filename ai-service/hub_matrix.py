@@ -0,0 +1,237 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from spatial_index import haversine_km
+
+# Road distance is longer than great-circle distance; used only to seed legs
+# between hubs that have no surveyed or observed route.
+ROAD_DETOUR_FACTOR = 1.35
+ESTIMATED_MINUTES_PER_KM = 1.5
+SEED_NEIGHBOURS = 3
+OBSERVATION_WEIGHT = 0.2
+
+Leg = Tuple[float, float]
+
+
+class HubMatrix:
+    """All-pairs hub distance (km) / duration (min) matrix.
+
+    Stored as a float32 array of shape (2, n, n) in a .npy file that every
+    worker memory-maps, with a JSON sidecar holding hub order and the legs the
+    matrix was derived from. Lookups are two dict hits and an array index.
+    """
+
+    def __init__(self, path: str, hubs: Dict[str, dict], known_legs: Dict[Tuple[str, str], Leg]):
+        self.path = path
+        self.meta_path = os.path.splitext(path)[0] + ".json"
+        self.hubs = hubs
+        self.known_legs = dict(known_legs)
+        self.names: List[str] = list(hubs.keys())
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self.observed_legs: Dict[Tuple[str, str], Leg] = {}
+        self.pending_observations = 0
+        self.built_at = 0.0
+        self._mtime = 0.0
+        # _lock guards observed_legs (written on the event loop, read by rebuilds in a worker thread);
+        # _rebuild_lock serializes rebuilds
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self.matrix: Optional[np.ndarray] = None
+
+    @staticmethod
+    def _pair(a: str, b: str) -> Tuple[str, str]:
+        return (a, b) if a <= b else (b, a)
+
+    def load_or_build(self):
+        """Memory-map the stored matrix, rebuilding it if missing or for a different hub set"""
+        if not self.reload():
+            self.rebuild()
+
+    def reload(self) -> bool:
+        """Re-map the matrix file if another worker rebuilt it; False if unusable"""
+        try:
+            mtime = os.path.getmtime(self.path)
+            if self.matrix is not None and mtime == self._mtime:
+                return True
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            if meta.get("hubs") != self.names:
+                return False
+            matrix = np.load(self.path, mmap_mode="r")
+            if matrix.shape != (2, len(self.names), len(self.names)):
+                return False
+        except (OSError, ValueError):
+            return False
+        # Legs observed by other workers are merged under this worker's own observations
+        file_legs = {
+            self._pair(leg["from"], leg["to"]): (leg["distance_km"], leg["duration_min"])
+            for leg in meta.get("observed_legs", [])
+        }
+        with self._lock:
+            self.observed_legs = {**file_legs, **self.observed_legs}
+        self.built_at = meta.get("built_at", 0.0)
+        self.matrix = matrix
+        self._mtime = mtime
+        return True
+
+    def _observed(self) -> Dict[Tuple[str, str], Leg]:
+        with self._lock:
+            return dict(self.observed_legs)
+
+    def _legs(self, observed: Dict[Tuple[str, str], Leg]) -> Dict[Tuple[str, str], Leg]:
+        legs: Dict[Tuple[str, str], Leg] = {}
+        # Seed every hub with estimated legs to its nearest neighbours so the graph is connected
+        lats = np.array([self.hubs[n]["coordinates"]["lat"] for n in self.names])
+        lons = np.array([self.hubs[n]["coordinates"]["lon"] for n in self.names])
+        straight = haversine_km(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+        for i, name in enumerate(self.names):
+            for j in np.argsort(straight[i])[1:SEED_NEIGHBOURS + 1]:
+                km = float(straight[i, j]) * ROAD_DETOUR_FACTOR
+                legs[self._pair(name, self.names[j])] = (km, km * ESTIMATED_MINUTES_PER_KM)
+        # Surveyed legs override estimates, observed legs override both
+        for (a, b), leg in self.known_legs.items():
+            legs[self._pair(a, b)] = leg
+        legs.update(observed)
+        return legs
+
+    def compute(self, observed: Dict[Tuple[str, str], Leg] = None) -> np.ndarray:
+        """Fill the full matrix with shortest paths through the available legs"""
+        if observed is None:
+            observed = self._observed()
+        n = len(self.names)
+        dist = np.full((n, n), np.inf)
+        dur = np.full((n, n), np.inf)
+        np.fill_diagonal(dist, 0.0)
+        np.fill_diagonal(dur, 0.0)
+        legs = self._legs(observed)
+        for (a, b), (km, minutes) in legs.items():
+            i, j = self.index[a], self.index[b]
+            dist[i, j] = dist[j, i] = km
+            dur[i, j] = dur[j, i] = minutes
+
+        # Floyd-Warshall on duration; distance follows the fastest path
+        for k in range(n):
+            via = dur[:, k:k + 1] + dur[k:k + 1, :]
+            better = via < dur
+            dur = np.where(better, via, dur)
+            dist = np.where(better, dist[:, k:k + 1] + dist[k:k + 1, :], dist)
+
+        # Direct surveyed/observed legs are authoritative even if a detour looks faster
+        for (a, b), (km, minutes) in legs.items():
+            if (a, b) in observed or (a, b) in self.known_legs or (b, a) in self.known_legs:
+                i, j = self.index[a], self.index[b]
+                dist[i, j] = dist[j, i] = km
+                dur[i, j] = dur[j, i] = minutes
+        return np.stack([dist, dur]).astype(np.float32)
+
+    def rebuild(self):
+        """Recompute and atomically replace the stored matrix"""
+        with self._rebuild_lock:
+            with self._lock:
+                observed = dict(self.observed_legs)
+                included = self.pending_observations
+            matrix = self.compute(observed)
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, matrix)
+            meta = {
+                "hubs": self.names,
+                "built_at": time.time(),
+                "observed_legs": [
+                    {"from": a, "to": b, "distance_km": km, "duration_min": minutes}
+                    for (a, b), (km, minutes) in sorted(observed.items())
+                ]
+            }
+            tmp_meta = f"{self.meta_path}.{os.getpid()}.tmp"
+            with open(tmp_meta, "w") as f:
+                json.dump(meta, f)
+            os.replace(tmp_meta, self.meta_path)
+            os.replace(tmp_path, self.path)
+            with self._lock:
+                self.pending_observations -= included
+            self._mtime = -1.0
+        self.reload()
+
+    def record_observation(self, origin_hub: str, dest_hub: str, distance_km: float, duration_min: float):
+        """Blend a real routed hub-to-hub trip into the observed legs used by the next rebuild"""
+        if origin_hub == dest_hub or origin_hub not in self.index or dest_hub not in self.index:
+            return
+        key = self._pair(origin_hub, dest_hub)
+        with self._lock:
+            previous = self.observed_legs.get(key)
+            if previous is None:
+                self.observed_legs[key] = (distance_km, duration_min)
+            else:
+                self.observed_legs[key] = (
+                    previous[0] + OBSERVATION_WEIGHT * (distance_km - previous[0]),
+                    previous[1] + OBSERVATION_WEIGHT * (duration_min - previous[1])
+                )
+            self.pending_observations += 1
+
+    def lookup(self, origin_hub: str, dest_hub: str) -> Optional[Leg]:
+        """O(1) (distance_km, duration_min) between two hubs, or None if unknown"""
+        i, j = self.index.get(origin_hub), self.index.get(dest_hub)
+        if i is None or j is None or self.matrix is None:
+            return None
+        return float(self.matrix[0, i, j]), float(self.matrix[1, i, j])
+
+    def point_matrix(self, lats: np.ndarray, lons: np.ndarray, hub_names: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Estimated (distance_km, duration_min) matrices between arbitrary points.
+
+        Each point reaches its nearest hub by an estimated access leg and hubs
+        are joined through the matrix; points sharing a hub use a direct estimate.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        hub_idx = np.array([self.index[name] for name in hub_names])
+        hub_lats = np.array([self.hubs[name]["coordinates"]["lat"] for name in hub_names])
+        hub_lons = np.array([self.hubs[name]["coordinates"]["lon"] for name in hub_names])
+        access_km = haversine_km(lats, lons, hub_lats, hub_lons) * ROAD_DETOUR_FACTOR
+        direct_km = haversine_km(lats[:, None], lons[:, None], lats[None, :], lons[None, :]) * ROAD_DETOUR_FACTOR
+
+        matrix = self.matrix if self.matrix is not None else self.compute()
+        via_km = access_km[:, None] + matrix[0][hub_idx[:, None], hub_idx[None, :]] + access_km[None, :]
+        via_min = (access_km[:, None] + access_km[None, :]) * ESTIMATED_MINUTES_PER_KM + matrix[1][hub_idx[:, None], hub_idx[None, :]]
+        same_hub = hub_idx[:, None] == hub_idx[None, :]
+        dist = np.where(same_hub, direct_km, via_km)
+        dur = np.where(same_hub, direct_km * ESTIMATED_MINUTES_PER_KM, via_min)
+        np.fill_diagonal(dist, 0.0)
+        np.fill_diagonal(dur, 0.0)
+        return dist, dur
+
+    def pair_estimates(self, origin_lats: np.ndarray, origin_lons: np.ndarray, origin_hubs: List[str],
+                       dest_lats: np.ndarray, dest_lons: np.ndarray,
+                       dest_hubs: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(distance_km, duration_min) for each origin[i] -> destination[i], estimated like point_matrix"""
+        olat, olon = np.asarray(origin_lats, dtype=np.float64), np.asarray(origin_lons, dtype=np.float64)
+        dlat, dlon = np.asarray(dest_lats, dtype=np.float64), np.asarray(dest_lons, dtype=np.float64)
+        o_idx = np.array([self.index[name] for name in origin_hubs], dtype=np.int64)
+        d_idx = np.array([self.index[name] for name in dest_hubs], dtype=np.int64)
+        coords = lambda idx, axis: np.array([self.hubs[self.names[i]]["coordinates"][axis] for i in idx])
+        o_access = haversine_km(olat, olon, coords(o_idx, "lat"), coords(o_idx, "lon")) * ROAD_DETOUR_FACTOR
+        d_access = haversine_km(dlat, dlon, coords(d_idx, "lat"), coords(d_idx, "lon")) * ROAD_DETOUR_FACTOR
+        direct_km = haversine_km(olat, olon, dlat, dlon) * ROAD_DETOUR_FACTOR
+
+        matrix = self.matrix if self.matrix is not None else self.compute()
+        via_km = o_access + matrix[0][o_idx, d_idx] + d_access
+        via_min = (o_access + d_access) * ESTIMATED_MINUTES_PER_KM + matrix[1][o_idx, d_idx]
+        same_hub = o_idx == d_idx
+        return (np.where(same_hub, direct_km, via_km),
+                np.where(same_hub, direct_km * ESTIMATED_MINUTES_PER_KM, via_min))
+
+    def stats(self) -> dict:
+        return {
+            "hubs": len(self.names),
+            "observed_legs": len(self.observed_legs),
+            "pending_observations": self.pending_observations,
+            "built_at": datetime.fromtimestamp(self.built_at).isoformat() if self.built_at else None,
+            "path": self.path
+        }
+
@@ -0,0 +1,101 @@
+# Delhi Industrial Hubs Dataset - shared by the service (app.py) and offline tools (train_eta.py)
+DELHI_INDUSTRIAL_HUBS = {
+    "Okhla Industrial Area": {
+        "name": "Okhla Industrial Area",
+        "coordinates": {"lat": 28.5275, "lon": 77.2750},
+        "type": "Electronics & Textiles",
+        "traffic_level": "High",
+        "peak_hours": ["09:00-11:00", "17:00-19:00"]
+    },
+    "Naraina Industrial Area": {
+        "name": "Naraina Industrial Area", 
+        "coordinates": {"lat": 28.6167, "lon": 77.1167},
+        "type": "Engineering & Manufacturing",
+        "traffic_level": "Medium",
+        "peak_hours": ["08:00-10:00", "16:00-18:00"]
+    },
+    "Wazirpur Industrial Area": {
+        "name": "Wazirpur Industrial Area",
+        "coordinates": {"lat": 28.7000, "lon": 77.1000},
+        "type": "Steel & Engineering",
+        "traffic_level": "High",
+        "peak_hours": ["07:00-09:00", "15:00-17:00"]
+    },
+    "Mayapuri Industrial Area": {
+        "name": "Mayapuri Industrial Area",
+        "coordinates": {"lat": 28.6333, "lon": 77.1167},
+        "type": "Automotive & Spare Parts",
+        "traffic_level": "Medium",
+        "peak_hours": ["08:00-10:00", "16:00-18:00"]
+    },
+    "Kirti Nagar Industrial Area": {
+        "name": "Kirti Nagar Industrial Area",
+        "coordinates": {"lat": 28.6500, "lon": 77.1333},
+        "type": "Furniture & Wood",
+        "traffic_level": "Low",
+        "peak_hours": ["09:00-11:00", "17:00-19:00"]
+    },
+    "Lawrence Road Industrial Area": {
+        "name": "Lawrence Road Industrial Area",
+        "coordinates": {"lat": 28.6833, "lon": 77.1167},
+        "type": "Textiles & Garments",
+        "traffic_level": "High",
+        "peak_hours": ["08:00-10:00", "16:00-18:00"]
+    },
+    "Shahdara Industrial Area": {
+        "name": "Shahdara Industrial Area",
+        "coordinates": {"lat": 28.6833, "lon": 77.2833},
+        "type": "Electronics & Plastic",
+        "traffic_level": "Medium",
+        "peak_hours": ["07:00-09:00", "15:00-17:00"]
+    },
+    "Patparganj Industrial Area": {
+        "name": "Patparganj Industrial Area",
+        "coordinates": {"lat": 28.6167, "lon": 77.3167},
+        "type": "Pharmaceuticals & Chemicals",
+        "traffic_level": "Low",
+        "peak_hours": ["09:00-11:00", "17:00-19:00"]
+    },
+    "Bawana Industrial Area": {
+        "name": "Bawana Industrial Area",
+        "coordinates": {"lat": 28.8000, "lon": 77.0333},
+        "type": "Food Processing & Textiles",
+        "traffic_level": "Medium",
+        "peak_hours": ["08:00-10:00", "16:00-18:00"]
+    },
+    "Narela Industrial Area": {
+        "name": "Narela Industrial Area",
+        "coordinates": {"lat": 28.8500, "lon": 77.1000},
+        "type": "Heavy Industries & Manufacturing",
+        "traffic_level": "Low",
+        "peak_hours": ["07:00-09:00", "15:00-17:00"]
+    }
+}
+
+# Real Delhi Industrial Areas Distances (in km, minutes) - surveyed legs seeding the hub matrix
+DELHI_HUB_LEGS = {
+    # Narela Industrial Area (Base Point)
+    ("Narela Industrial Area", "Okhla Industrial Area"): (48, 65),  # 48 km, 65 min
+    ("Narela Industrial Area", "Bawana Industrial Area"): (11, 20),  # 11 km, 20 min
+    ("Narela Industrial Area", "Mayapuri Industrial Area"): (30, 45),  # 30 km, 45 min
+    ("Narela Industrial Area", "Patparganj Industrial Area"): (40, 55),  # 40 km, 55 min
+    ("Narela Industrial Area", "Kirti Nagar Industrial Area"): (28, 30),  # 28 km, 30 min
+    
+    # Okhla Industrial Area
+    ("Okhla Industrial Area", "Bawana Industrial Area"): (54, 70),  # 54 km, 70 min
+    ("Okhla Industrial Area", "Mayapuri Industrial Area"): (23, 40),  # 23 km, 40 min
+    ("Okhla Industrial Area", "Patparganj Industrial Area"): (15, 30),  # 15 km, 30 min
+    ("Okhla Industrial Area", "Kirti Nagar Industrial Area"): (20, 35),  # 20 km, 35 min
+    
+    # Bawana Industrial Area
+    ("Bawana Industrial Area", "Mayapuri Industrial Area"): (32, 45),  # 32 km, 45 min
+    ("Bawana Industrial Area", "Patparganj Industrial Area"): (42, 60),  # 42 km, 60 min
+    ("Bawana Industrial Area", "Kirti Nagar Industrial Area"): (30, 40),  # 30 km, 40 min
+    
+    # Mayapuri Industrial Area
+    ("Mayapuri Industrial Area", "Patparganj Industrial Area"): (28, 40),  # 28 km, 40 min
+    ("Mayapuri Industrial Area", "Kirti Nagar Industrial Area"): (10, 20),  # 10 km, 20 min
+    
+    # Patparganj Industrial Area
+    ("Patparganj Industrial Area", "Kirti Nagar Industrial Area"): (18, 30),  # 18 km, 30 min
+}
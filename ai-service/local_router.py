@@ -0,0 +1,154 @@
+import csv
+import heapq
+import math
+from typing import Dict, List, Optional, Tuple
+
+from spatial_index import SpatialIndex, point_distance_km
+
+# Off-graph access legs (point -> nearest node) are driven slowly on local streets
+ACCESS_DETOUR_FACTOR = 1.3
+ACCESS_SPEED_KMPH = 15.0
+
+
+class RoadGraph:
+    """Directed road graph answering fastest-path queries with A*.
+
+    Loaded from a CSV edge list with columns
+    from_lat,from_lon,to_lat,to_lon,distance_km,duration_min[,oneway];
+    nodes are identified by their coordinates. Edges are two-way unless
+    oneway is 1/true.
+    """
+
+    def __init__(self, max_snap_km: float = 5.0):
+        self.max_snap_km = max_snap_km
+        self.lats: List[float] = []
+        self.lons: List[float] = []
+        self.adjacency: List[List[Tuple[int, float, float]]] = []
+        self._node_ids: Dict[Tuple[float, float], int] = {}
+        self.max_speed_km_per_min = 0.0
+        self.node_index: Optional[SpatialIndex] = None
+
+    @classmethod
+    def from_csv(cls, path: str, max_snap_km: float = 5.0) -> "RoadGraph":
+        graph = cls(max_snap_km=max_snap_km)
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                oneway = str(row.get("oneway", "0")).strip().lower() in ("1", "true", "yes")
+                graph.add_edge(
+                    float(row["from_lat"]), float(row["from_lon"]),
+                    float(row["to_lat"]), float(row["to_lon"]),
+                    float(row["distance_km"]), float(row["duration_min"]),
+                    oneway=oneway
+                )
+        graph.finalize()
+        return graph
+
+    def _node(self, lat: float, lon: float) -> int:
+        key = (round(lat, 6), round(lon, 6))
+        node = self._node_ids.get(key)
+        if node is None:
+            node = len(self.lats)
+            self._node_ids[key] = node
+            self.lats.append(key[0])
+            self.lons.append(key[1])
+            self.adjacency.append([])
+        return node
+
+    def add_edge(self, from_lat: float, from_lon: float, to_lat: float, to_lon: float,
+                 distance_km: float, duration_min: float, oneway: bool = False):
+        u, v = self._node(from_lat, from_lon), self._node(to_lat, to_lon)
+        self.adjacency[u].append((v, distance_km, duration_min))
+        if not oneway:
+            self.adjacency[v].append((u, distance_km, duration_min))
+        if duration_min > 0:
+            # Admissible A* bound: nothing on the graph beats the fastest edge's speed
+            straight = point_distance_km(from_lat, from_lon, to_lat, to_lon)
+            self.max_speed_km_per_min = max(self.max_speed_km_per_min, straight / duration_min)
+
+    def finalize(self):
+        """Build the node spatial index used to snap coordinates onto the graph"""
+        self.node_index = SpatialIndex(self.lats, self.lons, cell_km=1.0)
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def snap(self, lat: float, lon: float) -> Tuple[int, float]:
+        node, _, snap_km = self.node_index.nearest(lat, lon, 1)[0]
+        if snap_km > self.max_snap_km:
+            raise ValueError(f"Point ({lat}, {lon}) is {snap_km:.1f} km from the road graph")
+        return node, snap_km
+
+    def shortest_path(self, source: int, target: int) -> Optional[Tuple[List[int], float, float]]:
+        """A* on duration; returns (node path, distance_km, duration_min) or None if unreachable"""
+        lats, lons, adjacency = self.lats, self.lons, self.adjacency
+        t_lat, t_lon = lats[target], lons[target]
+        speed = self.max_speed_km_per_min or 1.0
+
+        best = {source: 0.0}
+        distance = {source: 0.0}
+        parent = {source: -1}
+        heap = [(point_distance_km(lats[source], lons[source], t_lat, t_lon) / speed, 0.0, source)]
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == target:
+                path = []
+                while node != -1:
+                    path.append(node)
+                    node = parent[node]
+                return path[::-1], distance[target], cost
+            if cost > best[node]:
+                continue
+            for nxt, km, minutes in adjacency[node]:
+                new_cost = cost + minutes
+                if new_cost < best.get(nxt, math.inf):
+                    best[nxt] = new_cost
+                    distance[nxt] = distance[node] + km
+                    parent[nxt] = node
+                    heuristic = point_distance_km(lats[nxt], lons[nxt], t_lat, t_lon) / speed
+                    heapq.heappush(heap, (new_cost + heuristic, new_cost, nxt))
+        return None
+
+    def route(self, origin: dict, destination: dict) -> dict:
+        """Route between two coordinates in the same shape as get_real_route_data"""
+        source, source_snap = self.snap(origin["lat"], origin["lon"])
+        target, target_snap = self.snap(destination["lat"], destination["lon"])
+        result = self.shortest_path(source, target)
+        if result is None:
+            raise ValueError("No path between snapped nodes")
+        path, km, minutes = result
+
+        access_km = (source_snap + target_snap) * ACCESS_DETOUR_FACTOR
+        coordinates = [[origin["lon"], origin["lat"]]]
+        coordinates += [[self.lons[n], self.lats[n]] for n in path]
+        coordinates.append([destination["lon"], destination["lat"]])
+        return {
+            "distance_km": km + access_km,
+            "estimated_time_minutes": minutes + access_km / ACCESS_SPEED_KMPH * 60,
+            "steps": [],
+            "geometry": {"type": "LineString", "coordinates": coordinates},
+            "provider": "local"
+        }
+
+
+def write_synthetic_graph(path: str, lat_range: Tuple[float, float] = (28.45, 28.90),
+                          lon_range: Tuple[float, float] = (76.98, 77.36), step_deg: float = 0.03):
+    """Write a grid road network over NCR for offline testing.
+
+    Every fourth row and column is an arterial (40 km/h), the rest are local
+    roads (22 km/h); road length is the straight-line length plus 15%.
+    """
+    rows = int(round((lat_range[1] - lat_range[0]) / step_deg)) + 1
+    cols = int(round((lon_range[1] - lon_range[0]) / step_deg)) + 1
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["from_lat", "from_lon", "to_lat", "to_lon", "distance_km", "duration_min", "oneway"])
+        for r in range(rows):
+            for c in range(cols):
+                lat, lon = round(lat_range[0] + r * step_deg, 4), round(lon_range[0] + c * step_deg, 4)
+                for dr, dc, arterial in ((0, 1, r % 4 == 0), (1, 0, c % 4 == 0)):
+                    if r + dr >= rows or c + dc >= cols:
+                        continue
+                    lat2, lon2 = round(lat + dr * step_deg, 4), round(lon + dc * step_deg, 4)
+                    km = point_distance_km(lat, lon, lat2, lon2) * 1.15
+                    speed = 40.0 if arterial else 22.0
+                    writer.writerow([lat, lon, lat2, lon2, round(km, 3), round(km / speed * 60, 2), 0])
@@ -0,0 +1,204 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from metrics import HEDGES
+
+# Hedge delay used until a provider has enough samples for a meaningful p95
+DEFAULT_HEDGE_AFTER_SECONDS = 2.0
+MIN_HEDGE_AFTER_SECONDS = 0.05
+MIN_LATENCY_SAMPLES = 20
+
+
+def consume_exception(future: asyncio.Future):
+    """Done-callback marking a failure retrieved, so a task nobody awaits is not logged as unhandled"""
+    if not future.cancelled():
+        future.exception()
+
+
+class ProviderChainError(Exception):
+    """Every provider in a chain failed, was skipped or ran out of budget"""
+
+    def __init__(self, message: str, declined: bool = False):
+        super().__init__(message)
+        # True when every provider tried declined the request (e.g. no quota left), rather than failing
+        self.declined = declined
+
+
+class ProviderDeclined(Exception):
+    """A provider cannot answer this particular request; not counted against its breaker"""
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures; half-open lets one trial call through after a cool-down"""
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                self.trips += 1
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Give back a half-open trial slot whose call was abandoned without an outcome"""
+        self.trial_in_flight = False
+
+
+class Provider:
+    def __init__(self, name: str, call: Callable[..., Awaitable], timeout: float,
+                 breaker: CircuitBreaker = None, window: int = 200):
+        self.name = name
+        self.call = call
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies: deque = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+
+    def hedge_after(self) -> float:
+        """Seconds to wait on this provider before hedging: its recent p95 latency"""
+        if len(self.latencies) < MIN_LATENCY_SAMPLES:
+            return min(DEFAULT_HEDGE_AFTER_SECONDS, self.timeout)
+        ordered = sorted(self.latencies)
+        return max(MIN_HEDGE_AFTER_SECONDS, ordered[int(0.95 * (len(ordered) - 1))])
+
+    def stats(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "successes": self.successes,
+            "failures": self.failures,
+            "breaker_trips": self.breaker.trips,
+            "hedge_after_ms": round(self.hedge_after() * 1000, 1)
+        }
+
+
+class ProviderChain:
+    """Try providers in order under one latency budget.
+
+    A provider whose breaker is open is skipped. While a provider is still
+    running past its p95 the next one is started alongside it; the first
+    success wins and the losers are cancelled. A provider may be listed
+    twice to hedge against itself.
+    """
+
+    def __init__(self, name: str, providers: List[Provider], budget_seconds: float):
+        self.name = name
+        self.providers = providers
+        self.budget_seconds = budget_seconds
+
+    async def _run(self, provider: Provider, args: tuple, deadline: float):
+        start = time.monotonic()
+        value = await asyncio.wait_for(provider.call(*args), max(0.0, min(provider.timeout, deadline - start)))
+        return value, time.monotonic() - start
+
+    async def call(self, *args) -> Tuple[str, object]:
+        """Return (provider name, result) from the first provider to succeed"""
+        deadline = time.monotonic() + self.budget_seconds
+        queue = list(self.providers)
+        running: Dict[asyncio.Task, Provider] = {}
+        errors: List[str] = []
+        failed = False
+
+        def launch_next(hedge: bool) -> Optional[Provider]:
+            nonlocal failed
+            while queue:
+                provider = queue.pop(0)
+                if provider.breaker.allow():
+                    running[asyncio.ensure_future(self._run(provider, args, deadline))] = provider
+                    if hedge:
+                        HEDGES.inc(chain=self.name, provider=provider.name)
+                    return provider
+                errors.append(f"{provider.name}: circuit open")
+                failed = True
+            return None
+
+        latest = launch_next(hedge=False)
+        try:
+            while running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                wait = min(remaining, latest.hedge_after()) if queue else remaining
+                done, _ = await asyncio.wait(running, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if queue:
+                        latest = launch_next(hedge=True) or latest
+                    continue
+                # Settle every finished task, including failures that completed alongside the winner
+                winner = None
+                for task in done:
+                    provider = running.pop(task)
+                    if task.exception() is None:
+                        value, elapsed = task.result()
+                        provider.latencies.append(elapsed)
+                        provider.successes += 1
+                        provider.breaker.record_success()
+                        if winner is None:
+                            winner = provider.name, value
+                        continue
+                    if isinstance(task.exception(), ProviderDeclined):
+                        provider.breaker.release()
+                    else:
+                        provider.failures += 1
+                        provider.breaker.record_failure()
+                        failed = True
+                    errors.append(f"{provider.name}: {task.exception()!r}")
+                if winner is not None:
+                    return winner
+                if not running:
+                    latest = launch_next(hedge=False) or latest
+        finally:
+            # Hedge losers are cancelled without penalty; anything still running at the deadline timed out
+            out_of_time = time.monotonic() >= deadline
+            for task, provider in running.items():
+                # A loser may already have failed before the cancel lands
+                task.add_done_callback(consume_exception)
+                task.cancel()
+                if out_of_time:
+                    provider.failures += 1
+                    provider.breaker.record_failure()
+                else:
+                    provider.breaker.release()
+        raise ProviderChainError(
+            f"{self.name} providers failed: " + "; ".join(errors or ["latency budget exhausted"]),
+            declined=bool(errors) and not failed and not out_of_time
+        )
+
+    def stats(self) -> dict:
+        unique = {p.name: p for p in self.providers}
+        return {
+            "budget_seconds": self.budget_seconds,
+            "providers": {name: p.stats() for name, p in unique.items()}
+        }
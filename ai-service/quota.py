@@ -0,0 +1,286 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from providers import ProviderDeclined, consume_exception
+
+# Outbound call priorities, most urgent first
+INTERACTIVE, BATCH, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = ("interactive", "batch", "background")
+
+# Priority of the outbound calls made by the current request or background task
+call_priority: ContextVar[int] = ContextVar("call_priority", default=INTERACTIVE)
+
+
+class QuotaExhausted(ProviderDeclined):
+    """No provider budget for this call within its priority's limits"""
+
+
+async def with_priority(priority: int, awaitable: Awaitable):
+    """Await with outbound calls at priority, outside any shared computation's group; use as the body
+    of a task so the setting stays in it"""
+    call_priority.set(priority)
+    _priority_group.set(None)
+    return await awaitable
+
+
+class PriorityGroup:
+    """Priority of one shared computation: the most urgent of the callers waiting on it.
+
+    Single-flight layers run the computation inside its group and join()
+    every caller that attaches later, so a more urgent caller lifts calls the
+    computation already has queued at a quota instead of waiting behind it.
+    """
+
+    def __init__(self, priority: int, parent: Optional["PriorityGroup"] = None):
+        self.priority = priority
+        self._children: List["PriorityGroup"] = []
+        self._queued: List[Tuple["Quota", "_Queued"]] = []
+        if parent is not None:
+            parent._children.append(self)
+
+    def join(self, priority: int):
+        if priority >= self.priority:
+            return
+        self.priority = priority
+        for quota, entry in self._queued:
+            quota._upgrade(entry, priority)
+        for child in self._children:
+            child.join(priority)
+
+    async def run(self, awaitable: Awaitable):
+        """Await inside this group; use as the body of the computation's task"""
+        _priority_group.set(self)
+        return await awaitable
+
+
+_priority_group: ContextVar[Optional[PriorityGroup]] = ContextVar("priority_group", default=None)
+
+
+def current_priority() -> int:
+    group = _priority_group.get()
+    return group.priority if group is not None else call_priority.get()
+
+
+def priority_group() -> PriorityGroup:
+    """A group at the current priority, nested in the enclosing one so upgrades reach it"""
+    return PriorityGroup(current_priority(), _priority_group.get())
+
+
+class _Queued:
+    __slots__ = ("key", "priority", "cost", "factory", "deadline", "future", "task", "waiters", "state")
+
+    def __init__(self, key: Hashable, priority: int, cost: float, factory: Callable[[], Awaitable], deadline: float):
+        self.key = key
+        self.priority = priority
+        self.cost = cost
+        self.factory = factory
+        self.deadline = deadline
+        self.future = asyncio.get_running_loop().create_future()
+        self.future.add_done_callback(consume_exception)
+        self.task: Optional[asyncio.Future] = None
+        self.waiters = 0
+        self.state = "queued"  # -> running | dropped
+
+
+class Quota:
+    """Token-bucket budget for one provider key.
+
+    Tokens refill at per_minute and bank up to burst_seconds worth; an
+    optional per_day cap resets at UTC midnight. A call that finds no token
+    waits in a queue served most urgent first. Calls are declined at once
+    with QuotaExhausted when their estimated wait exceeds their priority's
+    max_wait, or when they would eat into the share of the daily budget kept
+    for more urgent work (day_share). Identical calls waiting in the queue
+    are merged and share one upstream request.
+    """
+
+    def __init__(self, name: str, key_id: str, per_minute: float, per_day: int = 0, burst_seconds: float = 20,
+                 max_wait: Sequence[float] = (2.0, 3.0, 3.0), day_share: Sequence[float] = (1.0, 0.9, 0.75)):
+        if per_minute <= 0:
+            raise ValueError(f"{name} quota: per_minute must be positive, got {per_minute}")
+        if per_day < 0:
+            raise ValueError(f"{name} quota: per_day must be positive, or 0 for no daily cap")
+        self.name = name
+        self.key_id = key_id
+        self.per_minute = per_minute
+        self.per_day = per_day
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, per_minute * burst_seconds / 60.0)
+        self.max_wait = tuple(max_wait)
+        self.day_share = tuple(day_share)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.day = int(time.time() // 86400)
+        self.used_today = 0.0
+        self._queue: List[Tuple[int, int, _Queued]] = []
+        self._pending: Dict[Hashable, _Queued] = {}
+        self._seq = itertools.count()
+        self._pump: Optional[asyncio.Task] = None
+        self.granted = [0] * len(PRIORITY_NAMES)
+        self.rejected = [0] * len(PRIORITY_NAMES)
+        self.merged = 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        day = int(time.time() // 86400)
+        if day != self.day:
+            self.day, self.used_today = day, 0.0
+
+    def _day_allows(self, priority: int, cost: float) -> bool:
+        return not self.per_day or self.used_today + cost <= self.per_day * self.day_share[priority]
+
+    def _estimated_wait(self, priority: int, cost: float) -> float:
+        ahead = sum(e.cost for e in self._pending.values() if e.priority <= priority)
+        return max(0.0, (ahead + cost - self.tokens) / self.rate)
+
+    def _take(self, priority: int, cost: float):
+        self.tokens -= cost
+        self.used_today += cost
+        self.granted[priority] += 1
+
+    def _decline(self, priority: int, reason: str) -> QuotaExhausted:
+        self.rejected[priority] += 1
+        return QuotaExhausted(f"{self.name} quota: {reason} for {PRIORITY_NAMES[priority]} calls")
+
+    async def call(self, key: Hashable, factory: Callable[[], Awaitable], cost: float = 1):
+        """Run factory() once budget allows; waiting calls with the same key share its result"""
+        priority = current_priority()
+        now = time.monotonic()
+        self._refill(now)
+        entry = self._pending.get(key)
+        if entry is not None:
+            self.merged += 1
+            # Served at the most urgent priority among the callers waiting on it
+            self._upgrade(entry, priority)
+        else:
+            if not self._day_allows(priority, cost):
+                raise self._decline(priority, "daily budget exhausted")
+            if not self._pending and self.tokens >= cost:
+                self._take(priority, cost)
+                return await factory()
+            wait = self._estimated_wait(priority, cost)
+            if wait > self.max_wait[priority]:
+                raise self._decline(priority, f"next slot in {wait:.1f}s, over the {self.max_wait[priority]}s limit")
+            entry = _Queued(key, priority, cost, factory, now + self.max_wait[priority])
+            self._pending[key] = entry
+            heapq.heappush(self._queue, (priority, next(self._seq), entry))
+            if self._pump is None:
+                self._pump = asyncio.ensure_future(self._drain())
+
+        group = _priority_group.get()
+        if group is not None:
+            group._queued.append((self, entry))
+        entry.waiters += 1
+        try:
+            return await asyncio.shield(entry.future)
+        except asyncio.CancelledError:
+            entry.waiters -= 1
+            if not entry.waiters:
+                self._abandon(entry)
+            raise
+
+    def _upgrade(self, entry: _Queued, priority: int):
+        if entry.state != "queued":
+            return
+        entry.deadline = max(entry.deadline, time.monotonic() + self.max_wait[priority])
+        if priority < entry.priority:
+            entry.priority = priority
+            heapq.heappush(self._queue, (priority, next(self._seq), entry))
+
+    def _abandon(self, entry: _Queued):
+        # Nobody is waiting any more: drop it from the queue, or cancel the request if it already started
+        if entry.state == "queued":
+            entry.state = "dropped"
+            self._pending.pop(entry.key, None)
+        elif entry.task is not None:
+            entry.task.cancel()
+
+    def _settle(self, entry: _Queued, task: asyncio.Future):
+        if entry.future.done():
+            return
+        if task.cancelled():
+            entry.future.cancel()
+        elif task.exception() is not None:
+            entry.future.set_exception(task.exception())
+        else:
+            entry.future.set_result(task.result())
+
+    async def _drain(self):
+        try:
+            while self._queue:
+                priority, _, entry = self._queue[0]
+                if entry.state != "queued" or priority != entry.priority:
+                    heapq.heappop(self._queue)
+                    continue
+                now = time.monotonic()
+                self._refill(now)
+                if now >= entry.deadline or not self._day_allows(priority, entry.cost):
+                    heapq.heappop(self._queue)
+                    entry.state = "dropped"
+                    self._pending.pop(entry.key, None)
+                    reason = "waited past its limit" if now >= entry.deadline else "daily budget exhausted"
+                    entry.future.set_exception(self._decline(priority, reason))
+                    continue
+                if self.tokens < entry.cost:
+                    await asyncio.sleep(min((entry.cost - self.tokens) / self.rate, entry.deadline - now))
+                    continue
+                heapq.heappop(self._queue)
+                self._pending.pop(entry.key, None)
+                entry.state = "running"
+                self._take(priority, entry.cost)
+                entry.task = asyncio.ensure_future(entry.factory())
+                entry.task.add_done_callback(lambda task, entry=entry: self._settle(entry, task))
+        finally:
+            self._pump = None
+
+    def stats(self) -> dict:
+        self._refill(time.monotonic())
+        queued = [0] * len(PRIORITY_NAMES)
+        for entry in self._pending.values():
+            queued[entry.priority] += 1
+        return {
+            "key": self.key_id,
+            "per_minute": self.per_minute,
+            "per_day": self.per_day or None,
+            "tokens": round(self.tokens, 2),
+            "used_today": round(self.used_today, 2),
+            "remaining_today": round(max(0.0, self.per_day - self.used_today), 2) if self.per_day else None,
+            "queued": dict(zip(PRIORITY_NAMES, queued)),
+            "granted": dict(zip(PRIORITY_NAMES, self.granted)),
+            "rejected": dict(zip(PRIORITY_NAMES, self.rejected)),
+            "merged": self.merged
+        }
+
+
+class QuotaDispatcher:
+    """One Quota per (provider, API key), configured from per-provider limits"""
+
+    def __init__(self, limits: Dict[str, dict], **defaults):
+        self.limits = limits
+        self.defaults = defaults
+        self.quotas: Dict[Tuple[str, str], Quota] = {}
+
+    def quota(self, provider: str, api_key: str = "") -> Quota:
+        # Keys are identified by a short hash so they never appear in /health or logs
+        key_id = hashlib.sha256(api_key.encode()).hexdigest()[:8] if api_key else "-"
+        quota = self.quotas.get((provider, key_id))
+        if quota is None:
+            quota = Quota(provider, key_id, **{**self.defaults, **self.limits[provider]})
+            self.quotas[(provider, key_id)] = quota
+        return quota
+
+    async def call(self, provider: str, api_key: str, key: Hashable, factory: Callable[[], Awaitable],
+                   cost: float = 1):
+        return await self.quota(provider, api_key).call(key, factory, cost)
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            provider if key_id == "-" else f"{provider}:{key_id}": quota.stats()
+            for (provider, key_id), quota in self.quotas.items()
+        }
@@ -0,0 +1,182 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from departure_windows import HUB_TIMEZONE, hub_local
+
+# (start_hour, end_hour, ttl_seconds) - first matching window wins, end is exclusive
+# and windows may wrap past midnight. Peak traffic goes stale fastest.
+DEFAULT_STALENESS_POLICY: List[Tuple[int, int, int]] = [
+    (7, 11, 15 * 60),
+    (16, 20, 15 * 60),
+    (22, 6, 24 * 3600),
+]
+DEFAULT_TTL_SECONDS = 4 * 3600
+
+
+def parse_departure(departure_time: Optional[str], field: str = "departure_time") -> datetime:
+    """Parse an ISO departure time into Delhi time (naive means Delhi wall-clock time), now when none is given;
+    ValueError when it cannot be read"""
+    if not departure_time:
+        return datetime.now(HUB_TIMEZONE)
+    try:
+        return hub_local(datetime.fromisoformat(departure_time.replace("Z", "+00:00")))
+    except ValueError:
+        raise ValueError(f"{field} must be an ISO 8601 datetime, got {departure_time!r}") from None
+
+
+class RouteStore:
+    """Persistent route result cache backed by SQLite with an in-memory front.
+
+    Entries are keyed by origin/destination snapped to a coordinate grid plus a
+    departure-time-of-day bucket. Freshness depends on the bucket's hour.
+    """
+
+    def __init__(self, path: str, snap_decimals: int = 3, bucket_minutes: int = 60,
+                 staleness_policy: List[Tuple[int, int, int]] = None,
+                 default_ttl_seconds: int = DEFAULT_TTL_SECONDS, memory_entries: int = 2048):
+        self.path = path
+        self.snap_decimals = snap_decimals
+        self.bucket_minutes = bucket_minutes
+        self.staleness_policy = staleness_policy or DEFAULT_STALENESS_POLICY
+        self.default_ttl_seconds = default_ttl_seconds
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[Tuple[str, int], Tuple[float, dict]]" = OrderedDict()
+        self._pending_hits: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL lets several worker processes read while one writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS routes (
+                lane TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (lane, bucket)
+            )"""
+        )
+        self._conn.commit()
+
+    def lane_key(self, origin: dict, destination: dict) -> str:
+        d = self.snap_decimals
+        return (
+            f"{round(origin['lat'], d)},{round(origin['lon'], d)}"
+            f"|{round(destination['lat'], d)},{round(destination['lon'], d)}"
+        )
+
+    def bucket_for(self, departure_time: Optional[str]) -> int:
+        departure = parse_departure(departure_time)
+        return (departure.hour * 60 + departure.minute) // self.bucket_minutes
+
+    def ttl_for_bucket(self, bucket: int) -> int:
+        hour = (bucket * self.bucket_minutes) // 60
+        for start, end, ttl in self.staleness_policy:
+            in_window = start <= hour < end if start <= end else (hour >= start or hour < end)
+            if in_window:
+                return ttl
+        return self.default_ttl_seconds
+
+    def _remember(self, key: Tuple[str, int], fetched_at: float, data: dict):
+        self._memory[key] = (fetched_at, data)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _hit(self, key: Tuple[str, int], entry: Tuple[float, dict]) -> dict:
+        self._memory.move_to_end(key)
+        self._pending_hits[key] = self._pending_hits.get(key, 0) + 1
+        self.hits += 1
+        return dict(entry[1])
+
+    def get_memory(self, origin: dict, destination: dict, departure_time: Optional[str] = None) -> Optional[dict]:
+        """Fresh route from the in-memory front only, or None; never touches SQLite, so safe on the event loop"""
+        key = (self.lane_key(origin, destination), self.bucket_for(departure_time))
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None or time.time() - entry[0] > self.ttl_for_bucket(key[1]):
+                return None
+            return self._hit(key, entry)
+
+    def get(self, origin: dict, destination: dict, departure_time: Optional[str] = None) -> Optional[dict]:
+        """Return a fresh cached route or None; may read SQLite, so call it from a worker thread"""
+        key = (self.lane_key(origin, destination), self.bucket_for(departure_time))
+        ttl = self.ttl_for_bucket(key[1])
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                row = self._conn.execute(
+                    "SELECT fetched_at, data FROM routes WHERE lane = ? AND bucket = ?", key
+                ).fetchone()
+                if row is not None:
+                    entry = (row[0], json.loads(row[1]))
+                    self._remember(key, *entry)
+            if entry is None or now - entry[0] > ttl:
+                self.misses += 1
+                return None
+            return self._hit(key, entry)
+
+    def get_many(self, lanes: List[Tuple[dict, dict, Optional[str]]]) -> List[Optional[dict]]:
+        """get() for many (origin, destination, departure_time) lanes in one worker-thread hop"""
+        return [self.get(origin, destination, departure_time) for origin, destination, departure_time in lanes]
+
+    def put(self, origin: dict, destination: dict, departure_time: Optional[str], data: dict):
+        key = (self.lane_key(origin, destination), self.bucket_for(departure_time))
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, data)
+            hits = self._pending_hits.pop(key, 0)
+            self._conn.execute(
+                """INSERT INTO routes (lane, bucket, data, fetched_at, hits) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(lane, bucket) DO UPDATE SET
+                       data = excluded.data, fetched_at = excluded.fetched_at, hits = hits + excluded.hits""",
+                (key[0], key[1], json.dumps(data), now, hits)
+            )
+            self._conn.commit()
+
+    def flush_hits(self):
+        """Persist hit counters so lane popularity survives restarts"""
+        with self._lock:
+            if not self._pending_hits:
+                return
+            self._conn.executemany(
+                "UPDATE routes SET hits = hits + ? WHERE lane = ? AND bucket = ?",
+                [(n, key[0], key[1]) for key, n in self._pending_hits.items()]
+            )
+            self._conn.commit()
+            self._pending_hits.clear()
+
+    def warm(self, limit: int = 500) -> int:
+        """Load the most frequently requested lanes into memory"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT lane, bucket, fetched_at, data FROM routes ORDER BY hits DESC LIMIT ?", (limit,)
+            ).fetchall()
+            for lane, bucket, fetched_at, data in reversed(rows):
+                self._remember((lane, bucket), fetched_at, json.loads(data))
+        return len(rows)
+
+    def close(self):
+        self.flush_hits()
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "path": self.path
+        }
@@ -0,0 +1,72 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from spatial_index import haversine_km
+
+# Worst value along the route for each scored weather field
+WORST_CASE = {
+    "precipitation_chance": np.argmax,
+    "visibility": np.argmin,
+    "wind_speed": np.argmax,
+    "temperature": np.argmax,
+}
+
+
+def route_coordinates(origin: dict, destination: dict, geometry: Optional[dict]) -> List[List[float]]:
+    """GeoJSON [lon, lat] line for a route, or the straight line when no geometry came back"""
+    if isinstance(geometry, dict) and len(geometry.get("coordinates") or []) >= 2:
+        return geometry["coordinates"]
+    return [[origin["lon"], origin["lat"]], [destination["lon"], destination["lat"]]]
+
+
+def sample_route(coordinates: List[List[float]], spacing_km: float = 5.0,
+                 max_samples: int = 40) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(lats, lons, fraction of route length) at even spacing along a line, both ends included"""
+    line = np.asarray(coordinates, dtype=np.float64)
+    lons, lats = line[:, 0], line[:, 1]
+    cum_km = np.concatenate([[0.0], np.cumsum(haversine_km(lats[:-1], lons[:-1], lats[1:], lons[1:]))])
+    total = cum_km[-1]
+    if total <= 0:
+        return lats[:1], lons[:1], np.zeros(1)
+    steps = min(max(1, max_samples - 1), max(1, int(math.ceil(total / spacing_km))))
+    at_km = np.linspace(0.0, total, steps + 1)
+    return np.interp(at_km, cum_km, lats), np.interp(at_km, cum_km, lons), at_km / total
+
+
+def aggregate_route_weather(samples: List[dict], minutes: List[float]) -> dict:
+    """Route-level weather: the first sample's conditions with each scored field at its worst along the way"""
+    route = dict(samples[0])
+    worst_at = {}
+    for field, pick in WORST_CASE.items():
+        if not all(field in s for s in samples):
+            continue
+        i = int(pick([s[field] for s in samples]))
+        route[field] = samples[i][field]
+        worst_at[field] = round(minutes[i], 1)
+    route["samples"] = len(samples)
+    route["worst_at_minutes"] = worst_at
+    return route
+
+
+class RouteSampler:
+    """Collects weather samples for many routes so shared grid cells are fetched once"""
+
+    def __init__(self, cell_for, spacing_km: float = 5.0, max_samples: int = 40):
+        self.cell_for = cell_for
+        self.spacing_km = spacing_km
+        self.max_samples = max_samples
+        self.cells: Dict[tuple, Tuple[float, float]] = {}
+        self.routes: List[List[Tuple[tuple, float]]] = []
+
+    def add(self, coordinates: List[List[float]], route_minutes: float) -> int:
+        """Register a route; returns its index. Samples are kept as (cell, minutes into the trip)"""
+        lats, lons, fractions = sample_route(coordinates, self.spacing_km, self.max_samples)
+        samples = []
+        for lat, lon, fraction in zip(lats.tolist(), lons.tolist(), fractions.tolist()):
+            cell = self.cell_for(lat, lon)
+            self.cells.setdefault(cell, (lat, lon))
+            samples.append((cell, fraction * route_minutes))
+        self.routes.append(samples)
+        return len(self.routes) - 1
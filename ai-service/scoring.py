@@ -0,0 +1,218 @@
+import operator
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Feature defaults used when a weather/route record lacks the field
+FEATURE_DEFAULTS = {
+    "precipitation_chance": 0.0,
+    "visibility": 10.0,
+    "wind_speed": 0.0,
+    "temperature": 25.0,
+    "estimated_time_minutes": 0.0,
+    "origin_high_traffic": 0.0,
+    "dest_high_traffic": 0.0,
+    "has_origin_hub": 0.0,
+    "has_dest_hub": 0.0,
+}
+
+# Condition name -> (feature, comparison, threshold)
+CONDITIONS: Dict[str, Tuple[str, str, float]] = {
+    "rain": ("precipitation_chance", ">", 50),
+    "low_visibility": ("visibility", "<", 5),
+    "high_wind": ("wind_speed", ">", 20),
+    "high_temperature": ("temperature", ">", 35),
+    "long_route": ("estimated_time_minutes", ">", 120),
+    "very_long_route": ("estimated_time_minutes", ">", 180),
+    "origin_high_traffic": ("origin_high_traffic", ">", 0),
+    "dest_high_traffic": ("dest_high_traffic", ">", 0),
+    "has_origin_hub": ("has_origin_hub", ">", 0),
+    "has_dest_hub": ("has_dest_hub", ">", 0),
+}
+CONDITION_ORDER = list(CONDITIONS)
+CONDITION_BIT = {name: 1 << i for i, name in enumerate(CONDITION_ORDER)}
+
+_OPS = {">": operator.gt, "<": operator.lt, ">=": operator.ge, "<=": operator.le}
+# (feature, comparison, threshold, default, bit) per condition, for the scalar path
+_SCALAR_CONDITIONS = [
+    (feature, _OPS[op], threshold, FEATURE_DEFAULTS[feature], CONDITION_BIT[name])
+    for name, (feature, op, threshold) in CONDITIONS.items()
+]
+
+# Weather impact rules, applied in order: (condition, severity or None, factor, delay minutes).
+# A later matching rule's severity replaces an earlier one.
+SEVERITY_LEVELS = ["low", "medium", "high"]
+WEATHER_IMPACT_RULES = [
+    ("rain", "high", "Rain expected", 30),
+    ("low_visibility", "medium", "Low visibility", 15),
+    ("high_wind", None, "High winds", 10),
+    ("high_temperature", None, "High temperature", 5),
+]
+
+# Risk score: base + points per matching condition, capped
+RISK_BASE = 20
+RISK_CAP = 100
+RISK_POINTS = [
+    ("rain", 25),
+    ("low_visibility", 20),
+    ("high_wind", 15),
+    ("high_temperature", 10),
+    ("very_long_route", 15),
+    ("origin_high_traffic", 10),
+    ("dest_high_traffic", 10),
+]
+
+# Suggestions, in output order: (condition or None for always, templates formatted with hub fields)
+SUGGESTION_RULES = [
+    ("long_route", ["Consider breaking journey into segments", "Plan for fuel stops along the way"]),
+    ("rain", ["Pack waterproof covers for cargo", "Allow extra time for loading/unloading"]),
+    ("high_temperature", ["Ensure proper ventilation for perishable goods", "Monitor temperature-sensitive cargo"]),
+    ("low_visibility", ["Use fog lights and drive carefully", "Consider delaying delivery if possible"]),
+    ("origin_high_traffic", ["High traffic expected at {origin[name]} during peak hours"]),
+    ("has_origin_hub", ["Industrial hub type: {origin[type]} - ensure appropriate packaging"]),
+    ("dest_high_traffic", ["Plan arrival at {dest[name]} outside peak hours: {dest[peak_hours]}"]),
+    (None, [
+        "Use real-time traffic updates for dynamic routing",
+        "Consider micro-warehouses for last-mile delivery",
+        "Monitor air quality for delivery personnel safety",
+    ]),
+]
+
+
+def hub_features(origin_hub: Optional[dict], dest_hub: Optional[dict]) -> dict:
+    return {
+        "origin_high_traffic": float(bool(origin_hub) and origin_hub["traffic_level"] == "High"),
+        "dest_high_traffic": float(bool(dest_hub) and dest_hub["traffic_level"] == "High"),
+        "has_origin_hub": float(bool(origin_hub)),
+        "has_dest_hub": float(bool(dest_hub)),
+    }
+
+
+def condition_bits(features: dict) -> int:
+    """Bitmask of the conditions one feature record satisfies"""
+    bits = 0
+    for feature, op, threshold, default, bit in _SCALAR_CONDITIONS:
+        value = features.get(feature)
+        if op(default if value is None else value, threshold):
+            bits |= bit
+    return bits
+
+
+def condition_bits_batch(columns: Dict[str, Sequence[float]], n: int) -> np.ndarray:
+    """Vectorized condition bitmasks for n records given columnar features (NaN = missing)"""
+    bits = np.zeros(n, dtype=np.int64)
+    for name, (feature, op, threshold) in CONDITIONS.items():
+        values = columns.get(feature)
+        if values is None:
+            values = np.full(n, FEATURE_DEFAULTS[feature])
+        else:
+            values = np.asarray(values, dtype=np.float64)
+            values = np.where(np.isnan(values), FEATURE_DEFAULTS[feature], values)
+        bits |= np.where(_OPS[op](values, threshold), CONDITION_BIT[name], 0)
+    return bits
+
+
+def risk_from_bits(bits):
+    """Risk score(s) for condition bitmask(s); works on ints and NumPy arrays"""
+    risk = RISK_BASE
+    for name, points in RISK_POINTS:
+        risk = risk + ((bits & CONDITION_BIT[name]) != 0) * points
+    return np.minimum(risk, RISK_CAP)
+
+
+def delay_from_bits(bits):
+    delay = 0
+    for name, _, _, minutes in WEATHER_IMPACT_RULES:
+        delay = delay + ((bits & CONDITION_BIT[name]) != 0) * minutes
+    return delay
+
+
+def severity_from_bits(bits) -> np.ndarray:
+    """Severity level index (into SEVERITY_LEVELS) for bitmask(s)"""
+    level = np.zeros_like(np.asarray(bits))
+    for name, severity, _, _ in WEATHER_IMPACT_RULES:
+        if severity is not None:
+            level = np.where((np.asarray(bits) & CONDITION_BIT[name]) != 0, SEVERITY_LEVELS.index(severity), level)
+    return level
+
+
+# Scores for every possible bitmask, computed once by the vectorized rules above. Batches index
+# the arrays; single records use the list copies, which skip NumPy call overhead.
+_ALL_BITS = np.arange(1 << len(CONDITION_ORDER))
+RISK_TABLE = risk_from_bits(_ALL_BITS).astype(np.int64)
+DELAY_TABLE = delay_from_bits(_ALL_BITS).astype(np.int64)
+SEVERITY_TABLE = severity_from_bits(_ALL_BITS)
+_RISK = RISK_TABLE.tolist()
+_DELAY = DELAY_TABLE.tolist()
+_SEVERITY = [SEVERITY_LEVELS[level] for level in SEVERITY_TABLE.tolist()]
+_FACTORS = [
+    tuple(factor for name, _, factor, _ in WEATHER_IMPACT_RULES if bits & CONDITION_BIT[name])
+    for bits in range(len(_ALL_BITS))
+]
+# (text, is_template) per bitmask; only hub templates need formatting per call
+_SUGGESTIONS = [
+    tuple(
+        (t, "{" in t)
+        for name, templates in SUGGESTION_RULES if name is None or bits & CONDITION_BIT[name]
+        for t in templates
+    )
+    for bits in range(len(_ALL_BITS))
+]
+
+
+def risk_score(bits: int) -> int:
+    """Risk score for one condition bitmask"""
+    return _RISK[bits]
+
+
+def weather_impact_from_bits(bits: int) -> dict:
+    return {
+        "severity": _SEVERITY[bits],
+        "factors": list(_FACTORS[bits]),
+        "estimated_delay": _DELAY[bits]
+    }
+
+
+def suggestions_from_bits(bits: int, origin_hub: Optional[dict] = None, dest_hub: Optional[dict] = None) -> List[str]:
+    return [
+        t.format(origin=origin_hub, dest=dest_hub) if is_template else t
+        for t, is_template in _SUGGESTIONS[bits]
+    ]
+
+
+def weather_columns(weathers: Sequence[dict]) -> Dict[str, np.ndarray]:
+    """Columnar weather features; missing fields become NaN and fall back to defaults"""
+    return {
+        feature: np.array([w.get(feature, np.nan) for w in weathers], dtype=np.float64)
+        for feature in ("precipitation_chance", "visibility", "wind_speed", "temperature")
+    }
+
+
+class ScoredBatch:
+    """Vectorized scores for a batch, gathered from the bitmask tables; per-row dicts are built lazily"""
+
+    def __init__(self, bits: np.ndarray):
+        self.bits = bits
+        self.risk_score = RISK_TABLE[bits]
+        self.estimated_delay = DELAY_TABLE[bits]
+        self.severity = SEVERITY_TABLE[bits]
+
+    def __len__(self) -> int:
+        return len(self.bits)
+
+    def weather_impact(self, i: int) -> dict:
+        return weather_impact_from_bits(int(self.bits[i]))
+
+    def suggestions(self, i: int, origin_hub: Optional[dict] = None, dest_hub: Optional[dict] = None) -> List[str]:
+        return suggestions_from_bits(int(self.bits[i]), origin_hub, dest_hub)
+
+
+def score_batch(weathers: Sequence[dict], route_minutes: Sequence[float],
+                origin_hubs: Sequence[Optional[dict]], dest_hubs: Sequence[Optional[dict]]) -> ScoredBatch:
+    """Score many deliveries at once from weather dicts, route times and hub records"""
+    columns = weather_columns(weathers)
+    columns["estimated_time_minutes"] = np.asarray(route_minutes, dtype=np.float64)
+    hubs = [hub_features(o, d) for o, d in zip(origin_hubs, dest_hubs)]
+    for feature in ("origin_high_traffic", "dest_high_traffic", "has_origin_hub", "has_dest_hub"):
+        columns[feature] = np.array([h[feature] for h in hubs], dtype=np.float64)
+    return ScoredBatch(condition_bits_batch(columns, len(route_minutes)))
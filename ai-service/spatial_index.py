@@ -0,0 +1,197 @@
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+# Below this many points a chunked brute-force distance matrix beats the grid walk
+BRUTE_FORCE_MAX_POINTS = 256
+BRUTE_FORCE_CHUNK = 4096
+# Single lookups over at most this many points loop in plain Python; NumPy call overhead dominates there
+SCALAR_MAX_POINTS = 64
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; accepts scalars or broadcastable NumPy arrays (degrees)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def degree_span(km: float, lat: float) -> Tuple[float, float]:
+    """(degrees of latitude, degrees of longitude) covering km at latitude lat"""
+    return km / KM_PER_DEGREE, km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+
+
+def point_distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Scalar haversine in km - avoids NumPy call overhead in tight Python loops"""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialIndex:
+    """Uniform-grid spatial index over array-backed coordinates.
+
+    Points are projected onto a local equirectangular plane (accurate to well
+    under 1% across NCR) and bucketed into square cells; candidates found
+    through the grid are always ranked by haversine distance.
+    """
+
+    def __init__(self, lats: Sequence[float], lons: Sequence[float], ids: Sequence[Any] = None,
+                 payloads: Sequence[Any] = None, cell_km: float = 2.0):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        if self.lats.shape != self.lons.shape or self.lats.ndim != 1:
+            raise ValueError("lats and lons must be 1-D arrays of equal length")
+        self.ids = list(ids) if ids is not None else list(range(len(self.lats)))
+        self.payloads = list(payloads) if payloads is not None else [None] * len(self.lats)
+        self.cell_km = cell_km
+        self._points = list(zip(self.lats.tolist(), self.lons.tolist()))
+
+        self._lat0 = float(self.lats.mean()) if len(self.lats) else 0.0
+        self._kx = KM_PER_DEGREE * math.cos(math.radians(self._lat0))
+        self._ky = KM_PER_DEGREE
+        self._build()
+
+    @classmethod
+    def from_records(cls, records: Dict[Any, dict], cell_km: float = 2.0) -> "SpatialIndex":
+        """Build from {id: {"coordinates": {"lat", "lon"}, ...}} records such as DELHI_INDUSTRIAL_HUBS"""
+        ids = list(records.keys())
+        return cls(
+            [records[i]["coordinates"]["lat"] for i in ids],
+            [records[i]["coordinates"]["lon"] for i in ids],
+            ids=ids,
+            payloads=[records[i] for i in ids],
+            cell_km=cell_km
+        )
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def _cells(self, lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        cx = np.floor(lons * self._kx / self.cell_km).astype(np.int64)
+        cy = np.floor(lats * self._ky / self.cell_km).astype(np.int64)
+        return cx, cy
+
+    def _build(self):
+        cx, cy = self._cells(self.lats, self.lons)
+        if len(cx):
+            self._x0, self._y0 = int(cx.min()), int(cy.min())
+            self._nx, self._ny = int(cx.max()) - self._x0 + 1, int(cy.max()) - self._y0 + 1
+        else:
+            self._x0 = self._y0 = 0
+            self._nx = self._ny = 0
+        # CSR layout: point indices sorted by flat cell id, with per-cell offsets
+        flat = (cy - self._y0) * self._nx + (cx - self._x0)
+        self._order = np.argsort(flat, kind="stable")
+        self._offsets = np.searchsorted(flat[self._order], np.arange(self._nx * self._ny + 1))
+
+    def _candidates(self, cx: int, cy: int, ring: int) -> np.ndarray:
+        """Point indices in the (2*ring+1)^2 block of cells around (cx, cy), clipped to the grid"""
+        x_lo, x_hi = max(cx - ring - self._x0, 0), min(cx + ring - self._x0, self._nx - 1)
+        y_lo, y_hi = max(cy - ring - self._y0, 0), min(cy + ring - self._y0, self._ny - 1)
+        if x_lo > x_hi or y_lo > y_hi:
+            return np.empty(0, dtype=np.int64)
+        parts = [
+            self._order[self._offsets[y * self._nx + x_lo]:self._offsets[y * self._nx + x_hi + 1]]
+            for y in range(y_lo, y_hi + 1)
+        ]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def _ring_bound(self, cx: int, cy: int) -> int:
+        """Ring radius that covers the whole grid from (cx, cy)"""
+        return max(
+            abs(cx - self._x0), abs(cx - (self._x0 + self._nx - 1)),
+            abs(cy - self._y0), abs(cy - (self._y0 + self._ny - 1))
+        )
+
+    def _search(self, lats: np.ndarray, lons: np.ndarray, cx: int, cy: int, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """k nearest points for a group of queries that share one grid cell"""
+        max_ring = self._ring_bound(cx, cy)
+        ring = 1
+        while True:
+            cand = self._candidates(cx, cy, ring)
+            if len(cand) >= k or ring >= max_ring:
+                dist = haversine_km(lats[:, None], lons[:, None], self.lats[cand][None, :], self.lons[cand][None, :])
+                kk = min(k, len(cand))
+                part = np.argpartition(dist, kk - 1, axis=1)[:, :kk] if kk < len(cand) else np.tile(np.arange(len(cand)), (len(lats), 1))
+                part_d = np.take_along_axis(dist, part, axis=1)
+                order = np.argsort(part_d, axis=1)
+                idx = cand[np.take_along_axis(part, order, axis=1)]
+                d = np.take_along_axis(part_d, order, axis=1)
+                # Anything outside the searched block is at least `ring` cells away
+                if ring >= max_ring or d[:, -1].max() <= ring * self.cell_km * 0.98:
+                    return idx, d
+            ring = min(ring * 2, max_ring)
+
+    def query(self, lats: Sequence[float], lons: Sequence[float], k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized k-nearest lookup: returns (indices, distances_km), each shaped (n, k)"""
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        k = min(k, len(self))
+        n = len(lats)
+        out_idx = np.full((n, k), -1, dtype=np.int64)
+        out_d = np.full((n, k), np.inf)
+        if n == 0 or k == 0:
+            return out_idx, out_d
+
+        if len(self) <= BRUTE_FORCE_MAX_POINTS:
+            all_idx = np.arange(len(self))
+            for start in range(0, n, BRUTE_FORCE_CHUNK):
+                sl = slice(start, start + BRUTE_FORCE_CHUNK)
+                dist = haversine_km(lats[sl, None], lons[sl, None], self.lats[None, :], self.lons[None, :])
+                order = np.argsort(dist, axis=1)[:, :k]
+                out_idx[sl] = all_idx[order]
+                out_d[sl] = np.take_along_axis(dist, order, axis=1)
+            return out_idx, out_d
+
+        # Group queries by cell so each group shares one candidate set
+        cx, cy = self._cells(lats, lons)
+        keys = np.stack([cx, cy], axis=1)
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        by_group = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[by_group], np.arange(len(groups) + 1))
+        for g, (gx, gy) in enumerate(groups):
+            members = by_group[bounds[g]:bounds[g + 1]]
+            idx, d = self._search(lats[members], lons[members], int(gx), int(gy), k)
+            out_idx[members] = idx
+            out_d[members] = d
+        return out_idx, out_d
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Tuple[Any, Any, float]]:
+        """k nearest points as (id, payload, distance_km), closest first"""
+        idx, d = self.query([lat], [lon], k)
+        return [(self.ids[i], self.payloads[i], float(dist)) for i, dist in zip(idx[0], d[0])]
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> List[Tuple[Any, Any, float]]:
+        """All points within radius_km as (id, payload, distance_km), closest first"""
+        if not len(self):
+            return []
+        cx, cy = self._cells(np.array([lat]), np.array([lon]))
+        ring = int(math.ceil(radius_km / self.cell_km))
+        cand = self._candidates(int(cx[0]), int(cy[0]), ring)
+        dist = haversine_km(lat, lon, self.lats[cand], self.lons[cand])
+        keep = dist <= radius_km
+        cand, dist = cand[keep], dist[keep]
+        order = np.argsort(dist)
+        return [(self.ids[i], self.payloads[i], float(dist[j])) for j, i in zip(order, cand[order])]
+
+    def nearest_index(self, lat: float, lon: float) -> int:
+        """Index of the single nearest point (-1 if empty); a scalar loop for small indexes, query() otherwise"""
+        if len(self) > SCALAR_MAX_POINTS:
+            idx, _ = self.query([lat], [lon], 1)
+            return int(idx[0, 0]) if len(self) else -1
+        best, best_d = -1, math.inf
+        for i, (plat, plon) in enumerate(self._points):
+            d = point_distance_km(lat, lon, plat, plon)
+            if d < best_d:
+                best, best_d = i, d
+        return best
+
+    def nearest_payload(self, lat: float, lon: float) -> Optional[Any]:
+        i = self.nearest_index(lat, lon)
+        return self.payloads[i] if i >= 0 else None
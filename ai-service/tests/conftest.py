@@ -0,0 +1,28 @@
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def service(tmp_path_factory):
+    """The app module with throwaway stores and every upstream answering 503"""
+    workdir = tmp_path_factory.mktemp("service")
+    os.environ.update(
+        OPENROUTE_API_KEY="test", OPENWEATHER_API_KEY="test", LOG_LEVEL="ERROR",
+        ROUTE_STORE_PATH=str(workdir / "routes.sqlite3"),
+        HUB_MATRIX_PATH=str(workdir / "hub_matrix.npy"),
+        WEATHER_PREFETCH_ENABLED="false", ETA_TRAINING_LOG_PATH="",
+    )
+    import app
+    app.http_client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+    return app
+
+
+@pytest.fixture
+def client(service):
+    from fastapi.testclient import TestClient
+    return TestClient(service.app)
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from coalescing import IdempotencyConflict, IdempotencyStore, RequestCoalescer
+
+
+def slow_compute(calls, result="done", delay=0.05, error=None):
+    async def compute():
+        calls.append(result)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+    return compute
+
+
+def test_identical_requests_share_one_computation():
+    async def scenario():
+        calls = []
+        coalescer = RequestCoalescer()
+        results = await asyncio.gather(*(coalescer.run("key", slow_compute(calls)) for _ in range(5)))
+        return calls, results, coalescer.stats()
+
+    calls, results, stats = asyncio.run(scenario())
+    assert calls == ["done"]
+    assert results == ["done"] * 5
+    assert stats == {"in_flight": 0, "computed": 1, "coalesced": 4}
+
+
+def test_leader_cancellation_does_not_cancel_followers():
+    async def scenario():
+        calls = []
+        coalescer = RequestCoalescer()
+        leader = asyncio.ensure_future(coalescer.run("key", slow_compute(calls)))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(coalescer.run("key", slow_compute(calls)))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return leader, await follower, calls
+
+    leader, result, calls = asyncio.run(scenario())
+    assert leader.cancelled()
+    assert result == "done"
+    assert calls == ["done"]
+
+
+def test_failure_reaches_every_caller_and_is_not_kept():
+    async def scenario():
+        calls = []
+        coalescer = RequestCoalescer()
+        failing = slow_compute(calls, error=RuntimeError("upstream down"))
+        results = await asyncio.gather(*(coalescer.run("key", failing) for _ in range(3)), return_exceptions=True)
+        retry = await coalescer.run("key", slow_compute(calls, result="retried"))
+        return results, retry
+
+    results, retry = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert retry == "retried"
+
+
+def test_idempotency_replays_and_rejects_a_different_request():
+    async def scenario():
+        calls = []
+        store = IdempotencyStore(ttl_seconds=60)
+        first = await store.run("key", ("a",), slow_compute(calls, result="first"))
+        replay = await store.run("key", ("a",), slow_compute(calls, result="second"))
+        with pytest.raises(IdempotencyConflict):
+            await store.run("key", ("b",), slow_compute(calls))
+        return first, replay, calls
+
+    first, replay, calls = asyncio.run(scenario())
+    assert first == ("first", False)
+    assert replay == ("first", True)
+    assert calls == ["first"]
+
+
+def test_idempotency_forgets_failures_and_survives_cancellation():
+    async def scenario():
+        calls = []
+        store = IdempotencyStore(ttl_seconds=60)
+        with pytest.raises(RuntimeError):
+            await store.run("failed", ("a",), slow_compute(calls, error=RuntimeError("boom")))
+        retried = await store.run("failed", ("a",), slow_compute(calls, result="ok"))
+
+        leader = asyncio.ensure_future(store.run("cancelled", ("a",), slow_compute(calls, result="kept")))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        replay = await store.run("cancelled", ("a",), slow_compute(calls, result="recomputed"))
+        return retried, replay
+
+    retried, replay = asyncio.run(scenario())
+    assert retried == ("ok", False)
+    assert replay == ("kept", True)
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from departure_windows import (
+    HUB_TIMEZONE, candidate_departures, compile_peak_masks, hub_local, pick_windows, travel_minutes_by_slot
+)
+
+
+def test_naive_times_are_delhi_time():
+    naive = hub_local(datetime(2026, 3, 1, 9, 0))
+    utc = hub_local(datetime(2026, 3, 1, 3, 30, tzinfo=timezone.utc))
+    assert naive == utc
+    assert (utc.hour, utc.minute) == (9, 0)
+    assert utc.utcoffset() == timedelta(hours=5, minutes=30)
+
+
+def test_candidate_slots_are_laid_out_in_delhi_time():
+    epochs, minutes = candidate_departures(datetime(2026, 3, 1, 16, 0, tzinfo=timezone.utc), 6, 30)
+    # 16:00 UTC is 21:30 in Delhi; six hours of half-hour slots wrap past midnight
+    assert len(epochs) == 12
+    assert minutes[0] == 21 * 60 + 30
+    assert minutes[5] == 0
+    np.testing.assert_array_equal(np.diff(epochs), 1800.0)
+    assert datetime.fromtimestamp(epochs[0], HUB_TIMEZONE).hour == 21
+
+
+def test_peak_masks_wrap_past_midnight():
+    masks = compile_peak_masks([{"peak_hours": ["22:00-02:00", "09:00-10:00"]}, {}])
+    assert masks[0, 23 * 60] and masks[0, 60] and masks[0, 9 * 60 + 59]
+    assert not masks[0, 2 * 60] and not masks[0, 10 * 60]
+    assert not masks[1].any()
+
+
+def test_peak_slows_the_leg_it_covers():
+    masks = compile_peak_masks([{"peak_hours": ["09:00-10:00"]}, {"peak_hours": []}])
+    slowdown = np.array([0.5, 0.5])
+    minutes, origin_peak, dest_peak = travel_minutes_by_slot(
+        np.array([60.0]), np.array([8 * 60, 9 * 60]), np.array([0]), np.array([1]), masks, slowdown
+    )
+    assert origin_peak.tolist() == [[False, True]]
+    assert not dest_peak.any()
+    assert minutes.tolist() == [[60.0, 75.0]]
+
+
+def test_windows_are_distinct_and_cheapest_first():
+    cost = np.array([5, 1, 1.02, 4, 4, 2, 2, 2, 6], dtype=np.float64)
+    windows = pick_windows(cost, count=3, tolerance=0.05)
+    assert windows[0] == (1, 2, 1)
+    assert windows[1] == (5, 7, 5)
+    slots = [set(range(first, last + 1)) for first, last, _ in windows]
+    assert all(not a & b for i, a in enumerate(slots) for b in slots[i + 1:])
+
+
+def test_endpoint_reports_windows_in_delhi_time(client):
+    route = {"origin": {"lat": 28.5275, "lon": 77.2750}, "destination": {"lat": 28.5300, "lon": 77.2800}}
+    bodies = [{"earliest": "2026-03-01T09:00:00"}, {"earliest": "2026-03-01T03:30:00Z"}]
+    results = []
+    for body in bodies:
+        response = client.post("/route/departure-windows", json={"routes": [route], "horizon_hours": 3, **body})
+        assert response.status_code == 200, response.text
+        results.append(response.json()["routes"][0]["windows"])
+    assert results[0] == results[1]
+    assert all(window["start"].endswith("+05:30") for window in results[0])
+
+
+def test_endpoint_rejects_an_unreadable_earliest(client):
+    route = {"origin": {"lat": 28.5275, "lon": 77.2750}, "destination": {"lat": 28.85, "lon": 77.1}}
+    response = client.post("/route/departure-windows", json={"routes": [route], "earliest": "tomorrow"})
+    assert response.status_code == 422
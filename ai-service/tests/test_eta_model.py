@@ -0,0 +1,108 @@
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+import train_eta
+from eta_model import COLUMNS, EtaFeatures, EtaModel, RouteLog, load_route_log, minute_of_day
+from hubs import DELHI_INDUSTRIAL_HUBS
+
+UTC_NINE_IST = datetime(2026, 3, 1, 3, 30, tzinfo=timezone.utc)
+
+
+@pytest.fixture(scope="module")
+def features():
+    return EtaFeatures(DELHI_INDUSTRIAL_HUBS)
+
+
+def synthetic_routes(n, seed=7):
+    """Random NCR lanes whose true travel time is slower than the baseline heuristic at peak hours"""
+    rng = np.random.default_rng(seed)
+    columns = {
+        "origin_lat": rng.uniform(28.45, 28.85, n), "origin_lon": rng.uniform(77.0, 77.35, n),
+        "dest_lat": rng.uniform(28.45, 28.85, n), "dest_lon": rng.uniform(77.0, 77.35, n),
+        "minute_of_day": rng.integers(0, 1440, n).astype(np.float64),
+        "precipitation_chance": rng.uniform(0, 100, n),
+        "visibility": np.full(n, 10.0), "wind_speed": np.full(n, 3.0),
+    }
+    km = np.hypot((columns["dest_lat"] - columns["origin_lat"]) * 111, (columns["dest_lon"] - columns["origin_lon"]) * 98)
+    peak = ((columns["minute_of_day"] >= 540) & (columns["minute_of_day"] < 660)).astype(np.float64)
+    distance = km * 1.25
+    minutes = distance * (2.2 + 0.8 * peak + columns["precipitation_chance"] / 200)
+    return columns, distance, minutes
+
+
+def test_minute_of_day_is_delhi_time():
+    assert minute_of_day(UTC_NINE_IST) == 9 * 60
+    assert minute_of_day(datetime(2026, 3, 1, 9, 0)) == 9 * 60
+
+
+def test_route_log_records_delhi_minutes_and_rotates(tmp_path):
+    path = str(tmp_path / "route_log.jsonl")
+    origin, destination = {"lat": 28.5275, "lon": 77.2750}, {"lat": 28.8426, "lon": 77.0926}
+    route = {"distance_km": 48, "estimated_time_minutes": 65, "provider": "ors"}
+    RouteLog(str(tmp_path / "sizing.jsonl")).append(origin, destination, UTC_NINE_IST, route, {})
+    # Room for three records per file
+    log = RouteLog(path, max_bytes=int((tmp_path / "sizing.jsonl").stat().st_size * 3.5))
+    for _ in range(5):
+        log.append(origin, destination, UTC_NINE_IST, route, {"precipitation_chance": 20})
+    assert log.rotations == 1
+    columns, distance, minutes = load_route_log([path + ".1", path])
+    assert len(distance) == 5
+    assert set(columns) == set(COLUMNS)
+    assert (columns["minute_of_day"] == 540).all()
+    assert np.isnan(columns["visibility"]).all()
+    assert distance.tolist() == [48] * 5 and minutes.tolist() == [65] * 5
+
+
+def test_trained_model_beats_the_baseline_and_round_trips(features, tmp_path):
+    columns, distance, minutes = synthetic_routes(2000)
+    train, test = slice(0, 1500), slice(1500, None)
+    model = EtaModel(features).fit({k: v[train] for k, v in columns.items()}, distance[train], minutes[train])
+    report = model.evaluate({k: v[test] for k, v in columns.items()}, distance[test], minutes[test])
+    assert report["minutes"]["mape"] < report["baseline"]["minutes"]["mape"]
+    assert report["distance_km"]["mape"] < report["baseline"]["distance_km"]["mape"]
+
+    path = str(tmp_path / "eta_model.json")
+    model.save(path)
+    loaded = EtaModel.load(path, features)
+    np.testing.assert_allclose(loaded.predict(columns)[1], model.predict(columns)[1])
+
+
+def test_model_for_a_different_feature_set_is_not_loaded(features, tmp_path):
+    path = tmp_path / "eta_model.json"
+    path.write_text(json.dumps({"features": ["bias"], "scale": [1.0], "weights": [[0.0, 0.0]]}))
+    assert EtaModel.load(str(path), features) is None
+
+
+def test_train_eta_writes_a_model_from_the_route_log(tmp_path, monkeypatch, capsys):
+    columns, distance, minutes = synthetic_routes(300)
+    log = tmp_path / "route_log.jsonl"
+    with open(log, "w") as f:
+        for i in range(len(distance)):
+            f.write(json.dumps({
+                "origin": {"lat": columns["origin_lat"][i], "lon": columns["origin_lon"][i]},
+                "destination": {"lat": columns["dest_lat"][i], "lon": columns["dest_lon"][i]},
+                "minute_of_day": int(columns["minute_of_day"][i]),
+                "distance_km": distance[i], "minutes": minutes[i],
+                "precipitation_chance": columns["precipitation_chance"][i],
+            }) + "\n")
+    out = tmp_path / "eta_model.json"
+    monkeypatch.setattr(sys, "argv", ["train_eta.py", "--log", str(log), "--out", str(out)])
+    train_eta.main()
+    saved = json.loads(out.read_text())
+    assert saved["samples"] + saved["holdout"]["samples"] == 300
+    assert "saved" in capsys.readouterr().out
+
+
+def test_estimates_use_the_delhi_minute_of_day(client, service, monkeypatch):
+    seen = []
+    predict = service.eta_model.predict
+    monkeypatch.setattr(service.eta_model, "predict", lambda columns: seen.append(columns["minute_of_day"]) or predict(columns))
+    route = {"origin": {"lat": 28.5275, "lon": 77.2750}, "destination": {"lat": 28.8426, "lon": 77.0926}}
+    for departure in ("2026-03-01T03:30:00Z", "2026-03-01T09:00:00", (UTC_NINE_IST + timedelta(hours=1)).isoformat()):
+        response = client.post("/eta/estimate", json={"routes": [{**route, "departure_time": departure}]})
+        assert response.status_code == 200, response.text
+    assert [values.tolist() for values in seen] == [[540.0], [540.0], [600.0]]
@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from departure_windows import HUB_TIMEZONE
+from forecast import ForecastSeries, weather_at, weather_columns_at
+
+# 09:00 in Delhi; forecast steps follow three and six hours later
+OBSERVED = datetime(2026, 3, 1, 9, 0, tzinfo=HUB_TIMEZONE).timestamp()
+CURRENT = {"temperature": 20.0, "feels_like": 19.0, "humidity": 60, "pressure": 1012, "wind_speed": 2.0,
+           "visibility": 8.0, "condition": "Haze", "description": "haze"}
+
+
+def step(hours, temp, pop, condition):
+    return {"dt": OBSERVED + hours * 3600, "pop": pop, "visibility": 6000,
+            "main": {"temp": temp, "feels_like": temp, "humidity": 50, "pressure": 1010},
+            "wind": {"speed": 4.0}, "weather": [{"main": condition, "description": condition.lower()}]}
+
+
+@pytest.fixture
+def snapshot():
+    series = ForecastSeries.from_openweather(CURRENT, OBSERVED, {"list": [step(3, 26.0, 0.2, "Clear"), step(6, 32.0, 0.8, "Rain")]})
+    return {**CURRENT, "forecast_series": series}
+
+
+def test_series_interpolates_between_steps_and_clamps_at_the_ends(snapshot):
+    series = snapshot["forecast_series"]
+    assert len(series) == 3
+    midway = series.at(OBSERVED + 4.5 * 3600)
+    assert midway["temperature"] == 29.0
+    assert midway["precipitation_chance"] == 50
+    assert series.at(OBSERVED + 4 * 3600)["condition"] == "Clear"
+    assert series.at(OBSERVED + 48 * 3600)["temperature"] == 32.0
+    np.testing.assert_allclose(series.columns_at([OBSERVED, OBSERVED + 3 * 3600])["visibility"], [8.0, 6.0])
+
+
+def test_naive_and_utc_departures_are_read_in_delhi_time(snapshot):
+    aware = weather_at(snapshot, datetime(2026, 3, 1, 12, 0, tzinfo=HUB_TIMEZONE))
+    assert weather_at(snapshot, datetime(2026, 3, 1, 12, 0)) == aware
+    assert weather_at(snapshot, datetime(2026, 3, 1, 6, 30, tzinfo=timezone.utc)) == aware
+    assert aware["temperature"] == 26.0
+    assert aware["forecast_time"] == "2026-03-01T12:00:00+05:30"
+    assert "forecast_series" not in aware
+
+
+def test_without_a_time_the_current_observation_is_kept(snapshot):
+    now = weather_at(snapshot)
+    assert now["temperature"] == 20.0 and now["condition"] == "Haze"
+    # The series is long past, so the chance 24 hours ahead is the last step's
+    assert now["precipitation_chance"] == 80
+    assert "forecast_time" not in now
+
+
+def test_snapshot_without_a_series_is_constant():
+    columns = weather_columns_at(CURRENT, [OBSERVED, OBSERVED + 3600])
+    assert columns["temperature"].tolist() == [20.0, 20.0]
+    assert np.isnan(columns["precipitation_chance"]).all()
+    assert weather_at(CURRENT, datetime(2026, 3, 1, 12, 0)) == CURRENT
@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from geometry import decode_polyline, douglas_peucker, encode_polyline
+
+
+def test_encode_matches_reference_polyline():
+    # Reference example from the encoded polyline format documentation, as GeoJSON [lon, lat]
+    line = [[-120.2, 38.5], [-120.95, 40.7], [-126.453, 43.252]]
+    assert encode_polyline(line) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+@pytest.mark.parametrize("precision", [5, 6])
+def test_round_trip(precision):
+    rng = random.Random(precision)
+    line = [[round(rng.uniform(76.8, 77.5), precision), round(rng.uniform(28.3, 29.0), precision)] for _ in range(200)]
+    decoded = decode_polyline(encode_polyline(line, precision), precision)
+    assert len(decoded) == len(line)
+    for (lon, lat), (dlon, dlat) in zip(line, decoded):
+        assert dlon == pytest.approx(lon, abs=10 ** -precision / 2)
+        assert dlat == pytest.approx(lat, abs=10 ** -precision / 2)
+
+
+def test_round_trip_single_point_and_negative_coordinates():
+    for line in ([[77.2, 28.6]], [[-0.1278, 51.5074], [-73.9857, -40.7484]]):
+        decoded = decode_polyline(encode_polyline(line))
+        assert [pytest.approx(point) for point in line] == decoded
+
+
+def test_simplification_drops_jitter_and_keeps_corners():
+    line = [[77.0 + i * 0.001, 28.5 + (0.00001 if i % 2 else 0.0)] for i in range(100)]
+    kept = douglas_peucker(line, tolerance_m=50)
+    assert kept.tolist() == [0, len(line) - 1]
+    bent = line[:50] + [[77.05, 28.6]] + line[51:]
+    assert 50 in douglas_peucker(bent, tolerance_m=50).tolist()
@@ -0,0 +1,88 @@
+import threading
+
+import numpy as np
+import pytest
+
+from hub_matrix import ROAD_DETOUR_FACTOR, HubMatrix
+from spatial_index import haversine_km
+
+OKHLA, NARELA = "Okhla", "Narela"
+HUBS = {
+    name: {"coordinates": {"lat": lat, "lon": lon}}
+    for name, lat, lon in (
+        (OKHLA, 28.5275, 77.2750),
+        (NARELA, 28.8426, 77.0926),
+        ("Mayapuri", 28.6358, 77.1278),
+        ("Patparganj", 28.6400, 77.3050),
+        ("Bawana", 28.7960, 77.0450),
+    )
+}
+LEGS = {(NARELA, OKHLA): (48, 65)}
+
+
+@pytest.fixture
+def matrix(tmp_path):
+    hub_matrix = HubMatrix(str(tmp_path / "hub_matrix.npy"), HUBS, LEGS)
+    hub_matrix.load_or_build()
+    return hub_matrix
+
+
+def test_surveyed_legs_and_symmetry(matrix):
+    assert matrix.lookup(NARELA, OKHLA) == (48, 65)
+    assert matrix.lookup(OKHLA, NARELA) == (48, 65)
+    assert matrix.lookup(OKHLA, OKHLA) == (0, 0)
+    assert np.isfinite(matrix.matrix).all()
+    np.testing.assert_array_equal(matrix.matrix, matrix.matrix.transpose(0, 2, 1))
+
+
+def test_rebuild_applies_observations_and_other_workers_pick_them_up(matrix, tmp_path):
+    matrix.record_observation(OKHLA, NARELA, 44.0, 58.0)
+    matrix.record_observation(NARELA, OKHLA, 54.0, 68.0)
+    assert matrix.pending_observations == 2
+    matrix.rebuild()
+    assert matrix.pending_observations == 0
+    # First observation is taken as is, later ones blend in
+    assert matrix.lookup(OKHLA, NARELA) == pytest.approx((46.0, 60.0))
+
+    other = HubMatrix(str(tmp_path / "hub_matrix.npy"), HUBS, LEGS)
+    other.load_or_build()
+    assert other.lookup(NARELA, OKHLA) == pytest.approx((46.0, 60.0))
+
+
+def test_observations_during_rebuilds_are_not_lost(matrix):
+    names = matrix.names
+    stop = threading.Event()
+
+    def rebuild():
+        while not stop.is_set():
+            matrix.rebuild()
+
+    worker = threading.Thread(target=rebuild)
+    worker.start()
+    try:
+        for i in range(2000):
+            matrix.record_observation(names[i % len(names)], names[(i + 1) % len(names)], 10.0, 15.0)
+    finally:
+        stop.set()
+        worker.join()
+    matrix.rebuild()
+    assert matrix.pending_observations == 0
+    assert len(matrix.observed_legs) == len(names)
+
+
+def test_pair_estimates_use_access_legs(matrix):
+    okhla = HUBS[OKHLA]["coordinates"]
+    narela = HUBS[NARELA]["coordinates"]
+    origin = (okhla["lat"] + 0.01, okhla["lon"])
+    near_origin = (okhla["lat"], okhla["lon"] + 0.02)
+    destination = (narela["lat"], narela["lon"] - 0.01)
+    km, minutes = matrix.pair_estimates(
+        [origin[0], origin[0], origin[0]], [origin[1], origin[1], origin[1]], [OKHLA, OKHLA, OKHLA],
+        [destination[0], near_origin[0], origin[0]], [destination[1], near_origin[1], origin[1]], [NARELA, OKHLA, OKHLA]
+    )
+    # Across hubs: both access legs plus the surveyed leg
+    assert km[0] > 48 and minutes[0] > 65
+    # Same hub: a direct estimate rather than zero
+    assert km[1] == pytest.approx(haversine_km(*origin, *near_origin) * ROAD_DETOUR_FACTOR)
+    assert km[1] > 0 and minutes[1] > 0
+    assert km[2] == 0
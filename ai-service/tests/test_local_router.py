@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from local_router import RoadGraph
+
+SYNTHETIC_GRAPH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ncr_synthetic_roads.csv")
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return RoadGraph.from_csv(SYNTHETIC_GRAPH)
+
+
+def test_fastest_path_takes_the_arterials(graph):
+    # Straight along local row 28.48 is four 9.2 min edges; dropping to the arterial row 28.45 is faster
+    route = graph.route({"lat": 28.48, "lon": 76.98}, {"lat": 28.48, "lon": 77.10})
+    points = [(lat, lon) for lon, lat in route["geometry"]["coordinates"][1:-1]]
+    assert points == [(28.48, 76.98)] + [(28.45, round(76.98 + i * 0.03, 2)) for i in range(5)] + [(28.48, 77.10)]
+    assert route["estimated_time_minutes"] == pytest.approx(5.75 + 4 * 5.06 + 5.75)
+    assert route["distance_km"] == pytest.approx(2 * 3.836 + 4 * 3.373)
+    assert route["provider"] == "local"
+
+
+def test_points_off_the_graph_are_refused(graph):
+    with pytest.raises(ValueError, match=r"Point \(28\.2, 77\.1\) is \d+\.\d km from the road graph"):
+        graph.route({"lat": 28.2, "lon": 77.1}, {"lat": 28.48, "lon": 77.10})
+
+
+def test_unreachable_pair_is_refused(tmp_path):
+    with open(SYNTHETIC_GRAPH) as f:
+        edges = f.read()
+    # An island north of the grid, close enough to snap onto but with no road to it
+    path = tmp_path / "roads.csv"
+    path.write_text(edges + "28.99,77.0,28.99,77.03,3.373,5.06,0\n")
+    graph = RoadGraph.from_csv(str(path))
+    with pytest.raises(ValueError, match="No path"):
+        graph.route({"lat": 28.48, "lon": 76.98}, {"lat": 28.99, "lon": 77.01})
+
+
+def test_service_does_not_route_locally_by_default(service):
+    assert service.road_graph is None
+    assert service.local_provider not in service.route_chain.providers
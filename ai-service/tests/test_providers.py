@@ -0,0 +1,109 @@
+import asyncio
+import gc
+import time
+
+import pytest
+
+from providers import CircuitBreaker, Provider, ProviderChain, ProviderChainError, ProviderDeclined
+
+
+def provider(name, calls, delay=0.0, error=None, timeout=1.0, breaker=None):
+    async def call(*args):
+        calls.append(name)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return name
+    return Provider(name, call, timeout=timeout, breaker=breaker)
+
+
+def test_falls_back_to_the_next_provider():
+    calls = []
+    primary = provider("primary", calls, error=RuntimeError("down"))
+    chain = ProviderChain("test", [primary, provider("backup", calls)], budget_seconds=1.0)
+    assert asyncio.run(chain.call()) == ("backup", "backup")
+    assert calls == ["primary", "backup"]
+    assert primary.failures == 1
+
+
+def test_open_breaker_skips_the_provider():
+    calls = []
+    primary = provider("primary", calls, error=RuntimeError("down"),
+                       breaker=CircuitBreaker(failure_threshold=2, reset_seconds=60))
+    chain = ProviderChain("test", [primary, provider("backup", calls)], budget_seconds=1.0)
+    for _ in range(4):
+        asyncio.run(chain.call())
+    assert primary.breaker.state == "open"
+    assert calls.count("primary") == 2
+    assert calls.count("backup") == 4
+
+
+def test_slow_primary_is_hedged_without_penalty():
+    calls = []
+    primary = provider("primary", calls, delay=1.0, timeout=5.0)
+    # Enough fast samples that the hedge fires at the primary's p95 instead of the default delay
+    primary.latencies.extend([0.05] * 20)
+    chain = ProviderChain("test", [primary, provider("backup", calls)], budget_seconds=5.0)
+    start = time.monotonic()
+    assert asyncio.run(chain.call()) == ("backup", "backup")
+    assert time.monotonic() - start < 0.5
+    assert primary.failures == 0
+    assert primary.breaker.state == "closed"
+
+
+def test_budget_bounds_the_whole_chain():
+    calls = []
+    chain = ProviderChain(
+        "test", [provider("a", calls, delay=1.0), provider("b", calls, delay=1.0)], budget_seconds=0.2
+    )
+    start = time.monotonic()
+    with pytest.raises(ProviderChainError) as error:
+        asyncio.run(chain.call())
+    assert time.monotonic() - start < 0.5
+    assert not error.value.declined
+
+
+def test_declines_do_not_trip_the_breaker():
+    calls = []
+    only = provider("only", calls, error=ProviderDeclined("no quota"),
+                    breaker=CircuitBreaker(failure_threshold=1, reset_seconds=60))
+    chain = ProviderChain("test", [only], budget_seconds=1.0)
+    for _ in range(3):
+        with pytest.raises(ProviderChainError) as error:
+            asyncio.run(chain.call())
+        assert error.value.declined
+    assert only.breaker.state == "closed"
+    assert calls == ["only"] * 3
+
+
+def test_failure_finishing_with_the_winner_is_counted_and_retrieved():
+    async def scenario():
+        unhandled = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+        gate = asyncio.Event()
+
+        async def fail():
+            await gate.wait()
+            raise RuntimeError("down")
+
+        async def answer():
+            await gate.wait()
+            return "backup"
+
+        primary = Provider("primary", fail, timeout=5.0)
+        primary.latencies.extend([0.01] * 20)
+        chain = ProviderChain("test", [primary, Provider("backup", answer, timeout=5.0)], budget_seconds=5.0)
+        call = asyncio.ensure_future(chain.call())
+        # Past the primary's hedge delay, then release both so they finish in the same loop iteration
+        await asyncio.sleep(0.06)
+        gate.set()
+        result = await call
+        gc.collect()
+        return result, primary.failures, unhandled
+
+    # Which of the two finished tasks is looked at first varies from run to run
+    for _ in range(20):
+        result, failures, unhandled = asyncio.run(scenario())
+        assert result == ("backup", "backup")
+        assert failures == 1
+        assert unhandled == []
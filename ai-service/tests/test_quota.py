@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+import pytest
+
+from quota import BACKGROUND, BATCH, INTERACTIVE, PriorityGroup, Quota, QuotaExhausted, call_priority
+
+
+def recorder(order):
+    def factory(name):
+        async def call():
+            order.append(name)
+            return name
+        return call
+    return factory
+
+
+async def call_at(quota, priority, key, factory):
+    call_priority.set(priority)
+    return await quota.call(key, factory)
+
+
+@pytest.mark.parametrize("per_minute", [0, -5])
+def test_rate_must_be_positive(per_minute):
+    with pytest.raises(ValueError):
+        Quota("test", "-", per_minute=per_minute)
+
+
+def test_refill_follows_rate_and_caps_at_burst():
+    quota = Quota("test", "-", per_minute=60, burst_seconds=20)
+    assert quota.capacity == 20
+    quota.tokens = 0.0
+    quota.updated = time.monotonic() - 5
+    assert quota.stats()["tokens"] == pytest.approx(5, abs=0.1)
+    quota.updated = time.monotonic() - 3600
+    assert quota.stats()["tokens"] == 20
+
+
+def test_queued_calls_are_served_most_urgent_first():
+    async def scenario():
+        order = []
+        factory = recorder(order)
+        # One token, refilled every 0.1 s
+        quota = Quota("test", "-", per_minute=600, burst_seconds=0.1)
+        await quota.call("first", factory("first"))
+        background = asyncio.ensure_future(call_at(quota, BACKGROUND, "background", factory("background")))
+        batch = asyncio.ensure_future(call_at(quota, BATCH, "batch", factory("batch")))
+        await asyncio.sleep(0)
+        interactive = asyncio.ensure_future(call_at(quota, INTERACTIVE, "interactive", factory("interactive")))
+        await asyncio.gather(background, batch, interactive)
+        return order, quota.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["first", "interactive", "batch", "background"]
+    assert stats["granted"] == {"interactive": 2, "batch": 1, "background": 1}
+
+
+def test_declines_when_the_wait_exceeds_the_priority_limit():
+    async def scenario():
+        quota = Quota("test", "-", per_minute=6, burst_seconds=10, max_wait=(2.0, 3.0, 3.0))
+        await quota.call("first", recorder([])("first"))
+        with pytest.raises(QuotaExhausted):
+            await quota.call("second", recorder([])("second"))
+        return quota.stats()
+
+    assert asyncio.run(scenario())["rejected"]["interactive"] == 1
+
+
+def test_daily_share_is_kept_for_more_urgent_calls():
+    async def scenario():
+        quota = Quota("test", "-", per_minute=600, per_day=4, day_share=(1.0, 0.9, 0.5))
+        factory = recorder([])
+        for key in ("a", "b"):
+            await call_at(quota, BACKGROUND, key, factory(key))
+        with pytest.raises(QuotaExhausted):
+            await call_at(quota, BACKGROUND, "c", factory("c"))
+        await call_at(quota, INTERACTIVE, "d", factory("d"))
+        return quota.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["used_today"] == 3
+    assert stats["rejected"]["background"] == 1
+
+
+def test_identical_queued_calls_share_one_request():
+    async def scenario():
+        order = []
+        factory = recorder(order)
+        quota = Quota("test", "-", per_minute=600, burst_seconds=0.1)
+        await quota.call("first", factory("first"))
+        results = await asyncio.gather(*(quota.call("same", factory("same")) for _ in range(3)))
+        return order, results, quota.merged
+
+    order, results, merged = asyncio.run(scenario())
+    assert order == ["first", "same"]
+    assert results == ["same"] * 3
+    assert merged == 2
+
+
+def test_priority_group_lifts_queued_calls():
+    async def scenario():
+        order = []
+        factory = recorder(order)
+        quota = Quota("test", "-", per_minute=600, burst_seconds=0.1)
+        await quota.call("first", factory("first"))
+        other = asyncio.ensure_future(call_at(quota, BATCH, "other", factory("other")))
+        group = PriorityGroup(BATCH)
+        shared = asyncio.ensure_future(group.run(call_at(quota, BATCH, "shared", factory("shared"))))
+        await asyncio.sleep(0)
+        # An interactive caller attaches to the shared computation while its call is queued
+        group.join(INTERACTIVE)
+        await asyncio.gather(other, shared)
+        return order
+
+    assert asyncio.run(scenario()) == ["first", "shared", "other"]
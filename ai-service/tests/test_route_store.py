@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+import pytest
+
+from route_store import RouteStore, parse_departure
+
+OKHLA = {"lat": 28.5275, "lon": 77.2750}
+NARELA = {"lat": 28.8426, "lon": 77.0926}
+
+
+@pytest.fixture
+def store(tmp_path):
+    route_store = RouteStore(str(tmp_path / "routes.sqlite3"))
+    yield route_store
+    route_store.close()
+
+
+def test_departures_are_read_in_delhi_time():
+    utc = parse_departure("2026-03-01T03:30:00Z")
+    assert (utc.hour, utc.minute) == (9, 0)
+    assert utc.utcoffset() == timedelta(hours=5, minutes=30)
+    assert parse_departure("2026-03-01T09:00:00") == utc
+    assert parse_departure("2026-03-01T04:30:00+01:00") == utc
+    assert parse_departure(None).utcoffset() == timedelta(hours=5, minutes=30)
+
+
+def test_utc_departure_in_delhi_peak_gets_the_peak_bucket(store):
+    # 03:30 UTC is 09:00 in Delhi: morning peak, where routes go stale after 15 minutes
+    bucket = store.bucket_for("2026-03-01T03:30:00Z")
+    assert bucket == 9
+    assert store.ttl_for_bucket(bucket) == 15 * 60
+    store.put(OKHLA, NARELA, "2026-03-01T03:30:00Z", {"distance_km": 48})
+    assert store.get(OKHLA, NARELA, "2026-03-01T09:15:00+05:30") == {"distance_km": 48}
+    assert store.get(OKHLA, NARELA, "2026-03-01T03:30:00") is None
+
+
+def test_unreadable_departure_is_a_value_error():
+    with pytest.raises(ValueError, match="departure_time must be an ISO 8601 datetime"):
+        parse_departure("tomorrow")
+
+
+def test_endpoints_reject_unreadable_departure_times(client):
+    route = {"origin": OKHLA, "destination": NARELA}
+    for path, body in (
+        ("/route/optimize", {**route, "departure_time": "tomorrow"}),
+        ("/route/optimize/batch", {"routes": [route, {**route, "departure_time": "soon"}]}),
+    ):
+        assert client.post(path, json=body).status_code == 422, path
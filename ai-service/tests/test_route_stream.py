@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import pytest
+
+OKHLA = {"lat": 28.5275, "lon": 77.2750}
+NARELA = {"lat": 28.8426, "lon": 77.0926}
+
+
+@pytest.fixture
+def optimize(service, monkeypatch):
+    """Stand-in for coalesced_optimize_route: later routes finish first, one in five fails"""
+    running = {"now": 0, "peak": 0}
+
+    async def fake(route):
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        try:
+            await asyncio.sleep(0.002 * (10 - route.origin["index"]))
+            if route.origin["index"] % 5 == 4:
+                raise ValueError("no route")
+            return {"status": "success", "distance_km": route.origin["index"]}
+        finally:
+            running["now"] -= 1
+
+    monkeypatch.setattr(service, "coalesced_optimize_route", fake)
+    return running
+
+
+def job(n, **body):
+    return {"routes": [{"origin": {**OKHLA, "index": i}, "destination": NARELA} for i in range(n)], **body}
+
+
+def test_ndjson_streams_every_route_then_a_summary(client, optimize):
+    response = client.post("/route/optimize/stream", json=job(10, concurrency=3))
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    *results, done = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(r["index"] for r in results) == list(range(10))
+    # Results arrive as they finish, not in request order
+    assert [r["index"] for r in results] != list(range(10))
+    assert all(r["distance_km"] == r["index"] for r in results if r["status"] == "success")
+    assert {r["index"]: r["error"] for r in results if r["status"] == "error"} == {4: "ValueError: no route", 9: "ValueError: no route"}
+    assert (done["status"], done["count"], done["succeeded"], done["failed"]) == ("done", 10, 8, 2)
+    assert optimize["peak"] == 3
+
+
+def test_sse_frames_results_and_done_events(client, optimize):
+    response = client.post("/route/optimize/stream", json=job(3, format="sse"))
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [frame.split("\n") for frame in response.text.strip().split("\n\n")]
+    assert [lines[0] for lines in events] == ["event: result"] * 3 + ["event: done"]
+    assert json.loads(events[-1][1][len("data: "):])["succeeded"] == 3
+
+
+def test_bad_jobs_are_rejected_before_streaming(client, service, monkeypatch, optimize):
+    assert client.post("/route/optimize/stream", json=job(2, format="csv")).status_code == 422
+    bad_time = job(2)
+    bad_time["routes"][1]["departure_time"] = "soon"
+    assert client.post("/route/optimize/stream", json=bad_time).status_code == 422
+    monkeypatch.setattr(service, "ROUTE_JOB_MAX_ROUTES", 5)
+    assert client.post("/route/optimize/stream", json=job(6)).status_code == 413
+    assert optimize["peak"] == 0
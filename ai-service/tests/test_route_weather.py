@@ -0,0 +1,75 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from route_weather import RouteSampler, aggregate_route_weather, route_coordinates, sample_route
+
+OKHLA = {"lat": 28.5275, "lon": 77.2750}
+NARELA = {"lat": 28.8426, "lon": 77.0926}
+CLEAR = {"temperature": 24.0, "precipitation_chance": 10, "visibility": 10.0, "wind_speed": 3.0, "condition": "Clear"}
+
+
+def test_samples_are_evenly_spaced_with_both_ends():
+    line = route_coordinates(OKHLA, NARELA, None)
+    assert line == [[OKHLA["lon"], OKHLA["lat"]], [NARELA["lon"], NARELA["lat"]]]
+    lats, lons, fractions = sample_route(line, spacing_km=5.0)
+    # About 39 km, so eight 4.9 km steps
+    assert len(lats) == 9
+    assert (lats[0], lons[0]) == (OKHLA["lat"], OKHLA["lon"])
+    assert (lats[-1], lons[-1]) == (NARELA["lat"], NARELA["lon"])
+    np.testing.assert_allclose(np.diff(fractions), 1 / 8)
+    assert len(sample_route(line, spacing_km=0.1, max_samples=40)[0]) == 40
+    assert len(sample_route([[77.2, 28.6], [77.2, 28.6]])[0]) == 1
+
+
+def test_route_takes_the_worst_of_each_field_and_when_it_is_met():
+    samples = [dict(CLEAR), {**CLEAR, "precipitation_chance": 70, "visibility": 4.0}, {**CLEAR, "temperature": 38.0}]
+    route = aggregate_route_weather(samples, [0, 30, 60])
+    assert (route["precipitation_chance"], route["visibility"], route["temperature"]) == (70, 4.0, 38.0)
+    assert route["condition"] == "Clear"
+    assert route["worst_at_minutes"] == {"precipitation_chance": 30, "visibility": 30, "wind_speed": 0, "temperature": 60}
+    assert route["samples"] == 3
+
+
+def test_routes_over_the_same_cells_share_lookups():
+    sampler = RouteSampler(lambda lat, lon: (int(lat // 0.1), int(lon // 0.1)))
+    line = route_coordinates(OKHLA, NARELA, None)
+    assert sampler.add(line, 60) == 0
+    cells = dict(sampler.cells)
+    assert sampler.add(line[::-1], 60) == 1
+    assert sampler.cells == cells
+    assert [minutes for _, minutes in sampler.routes[0]][-1] == 60
+
+
+@pytest.fixture
+def weather_cache(service):
+    service.weather_cache.clear()
+    yield service.weather_cache
+    service.weather_cache.clear()
+
+
+def test_cold_cells_take_the_nearer_route_end(service, weather_cache):
+    storm = {**CLEAR, "precipitation_chance": 90, "condition": "Rain"}
+    sampler = service.new_route_sampler()
+    sampler.add(route_coordinates(OKHLA, NARELA, None), 80)
+    samples = sampler.routes[0]
+    # Only the middle sample's cell is warm, and it is raining there
+    middle, minutes = samples[len(samples) // 2]
+    weather_cache.put(middle, storm)
+
+    async def run():
+        routes = service.sample_route_weather(sampler, [None], [(CLEAR, {**CLEAR, "wind_speed": 12.0})])
+        warming = len(service.route_weather_warming)
+        await asyncio.gather(*service.route_weather_warming)
+        return routes, warming
+
+    (route,), warming = asyncio.run(run())
+    # Some of the cold cells are fetched in the background for later requests
+    assert warming == service.ROUTE_WEATHER_WARM_CELLS
+    assert route["precipitation_chance"] == 90
+    assert route["worst_at_minutes"]["precipitation_chance"] == pytest.approx(minutes, abs=0.1)
+    # The destination snapshot stands in for the cold cells past half way
+    assert route["wind_speed"] == 12.0 and route["worst_at_minutes"]["wind_speed"] > 40
+    warm = sum(cell == middle for cell, _ in samples)
+    assert route["endpoint_samples"] == len(samples) - warm
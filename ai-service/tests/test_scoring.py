@@ -0,0 +1,109 @@
+import random
+
+import numpy as np
+import pytest
+
+from hubs import DELHI_INDUSTRIAL_HUBS
+from scoring import (
+    CONDITION_ORDER, SEVERITY_LEVELS, condition_bits, condition_bits_batch, delay_from_bits, risk_from_bits,
+    risk_score, score_batch, severity_from_bits, suggestions_from_bits, weather_impact_from_bits
+)
+
+HUBS = list(DELHI_INDUSTRIAL_HUBS.values()) + [None]
+
+
+def if_chain_impact(weather):
+    """analyze_weather_impact before the rule engine"""
+    impact = {"severity": "low", "factors": [], "estimated_delay": 0}
+    if weather.get("precipitation_chance", 0) > 50:
+        impact["severity"] = "high"
+        impact["factors"].append("Rain expected")
+        impact["estimated_delay"] += 30
+    if weather.get("visibility", 10) < 5:
+        impact["severity"] = "medium"
+        impact["factors"].append("Low visibility")
+        impact["estimated_delay"] += 15
+    if weather.get("wind_speed", 0) > 20:
+        impact["factors"].append("High winds")
+        impact["estimated_delay"] += 10
+    if weather.get("temperature", 25) > 35:
+        impact["factors"].append("High temperature")
+        impact["estimated_delay"] += 5
+    return impact
+
+
+def if_chain_risk(weather, minutes, origin_hub, dest_hub):
+    """calculate_risk_score before the rule engine"""
+    risk = 20
+    risk += 25 * (weather.get("precipitation_chance", 0) > 50) + 20 * (weather.get("visibility", 10) < 5)
+    risk += 15 * (weather.get("wind_speed", 0) > 20) + 10 * (weather.get("temperature", 25) > 35)
+    risk += 15 * (minutes > 180)
+    risk += 10 * bool(origin_hub and origin_hub["traffic_level"] == "High")
+    risk += 10 * bool(dest_hub and dest_hub["traffic_level"] == "High")
+    return min(risk, 100)
+
+
+def if_chain_suggestions(weather, minutes, origin_hub, dest_hub):
+    """generate_ai_suggestions before the rule engine"""
+    suggestions = []
+    if minutes > 120:
+        suggestions += ["Consider breaking journey into segments", "Plan for fuel stops along the way"]
+    if weather.get("precipitation_chance", 0) > 50:
+        suggestions += ["Pack waterproof covers for cargo", "Allow extra time for loading/unloading"]
+    if weather.get("temperature", 25) > 35:
+        suggestions += ["Ensure proper ventilation for perishable goods", "Monitor temperature-sensitive cargo"]
+    if weather.get("visibility", 10) < 5:
+        suggestions += ["Use fog lights and drive carefully", "Consider delaying delivery if possible"]
+    if origin_hub:
+        if origin_hub["traffic_level"] == "High":
+            suggestions.append(f"High traffic expected at {origin_hub['name']} during peak hours")
+        suggestions.append(f"Industrial hub type: {origin_hub['type']} - ensure appropriate packaging")
+    if dest_hub and dest_hub["traffic_level"] == "High":
+        suggestions.append(f"Plan arrival at {dest_hub['name']} outside peak hours: {dest_hub['peak_hours']}")
+    return suggestions + [
+        "Use real-time traffic updates for dynamic routing",
+        "Consider micro-warehouses for last-mile delivery",
+        "Monitor air quality for delivery personnel safety",
+    ]
+
+
+@pytest.fixture(scope="module")
+def deliveries():
+    rng = random.Random(5)
+    fields = {"precipitation_chance": (0, 100), "visibility": (0, 12), "wind_speed": (0, 30), "temperature": (15, 45)}
+    rows = []
+    for _ in range(3000):
+        # Fields go missing at random to exercise the defaults; thresholds are hit exactly now and then
+        weather = {field: rng.choice([rng.uniform(*bounds), {"visibility": 5, "temperature": 35}.get(field, 50)])
+                   for field, bounds in fields.items() if rng.random() < 0.85}
+        rows.append((weather, rng.choice([60, 120, 150, 180, 240]), rng.choice(HUBS), rng.choice(HUBS)))
+    return rows
+
+
+def test_tables_match_the_vectorized_rules_for_every_bitmask():
+    for bits in range(1 << len(CONDITION_ORDER)):
+        assert risk_score(bits) == int(risk_from_bits(np.array([bits]))[0])
+        impact = weather_impact_from_bits(bits)
+        assert impact["estimated_delay"] == int(delay_from_bits(np.array([bits]))[0])
+        assert impact["severity"] == SEVERITY_LEVELS[int(severity_from_bits(np.array([bits]))[0])]
+
+
+def test_single_and_batch_scores_match_the_if_chains(service, deliveries):
+    batch = score_batch([w for w, *_ in deliveries], [m for _, m, *_ in deliveries],
+                        [o for *_, o, _ in deliveries], [d for *_, d in deliveries])
+    for i, (weather, minutes, origin_hub, dest_hub) in enumerate(deliveries):
+        route = {"estimated_time_minutes": minutes}
+        assert service.analyze_weather_impact(weather) == if_chain_impact(weather)
+        assert service.calculate_risk_score(weather, route, origin_hub, dest_hub) == if_chain_risk(weather, minutes, origin_hub, dest_hub)
+        expected = if_chain_suggestions(weather, minutes, origin_hub, dest_hub)
+        assert service.generate_ai_suggestions(weather, route, origin_hub, dest_hub) == expected
+        assert batch.risk_score[i] == if_chain_risk(weather, minutes, origin_hub, dest_hub)
+        assert batch.weather_impact(i) == if_chain_impact(weather)
+        assert batch.suggestions(i, origin_hub, dest_hub) == expected
+
+
+def test_batch_bits_treat_nan_as_missing():
+    columns = {"precipitation_chance": [np.nan, 80.0], "visibility": [np.nan, 2.0]}
+    bits = condition_bits_batch(columns, 2)
+    assert bits.tolist() == [condition_bits({}), condition_bits({"precipitation_chance": 80.0, "visibility": 2.0})]
+    assert suggestions_from_bits(int(bits[0]))[0] == "Use real-time traffic updates for dynamic routing"
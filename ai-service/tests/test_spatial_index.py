@@ -0,0 +1,61 @@
+import random
+
+import numpy as np
+import pytest
+
+from hubs import DELHI_INDUSTRIAL_HUBS
+from spatial_index import BRUTE_FORCE_MAX_POINTS, SpatialIndex, haversine_km
+
+
+def random_points(n, seed):
+    rng = random.Random(seed)
+    return [rng.uniform(28.3, 29.0) for _ in range(n)], [rng.uniform(76.8, 77.5) for _ in range(n)]
+
+
+def brute_force(lats, lons, qlats, qlons, k):
+    dist = haversine_km(np.array(qlats)[:, None], np.array(qlons)[:, None], np.array(lats)[None, :], np.array(lons)[None, :])
+    order = np.argsort(dist, axis=1)[:, :k]
+    return order, np.take_along_axis(dist, order, axis=1)
+
+
+@pytest.mark.parametrize("n", [50, BRUTE_FORCE_MAX_POINTS * 8])
+@pytest.mark.parametrize("k", [1, 3])
+def test_query_matches_brute_force(n, k):
+    lats, lons = random_points(n, seed=n)
+    qlats, qlons = random_points(300, seed=n + 1)
+    index = SpatialIndex(lats, lons, cell_km=1.0)
+    idx, dist = index.query(qlats, qlons, k)
+    expected_idx, expected_dist = brute_force(lats, lons, qlats, qlons, k)
+    np.testing.assert_array_equal(idx, expected_idx)
+    np.testing.assert_allclose(dist, expected_dist)
+
+
+def test_query_far_outside_the_grid():
+    lats, lons = random_points(BRUTE_FORCE_MAX_POINTS * 4, seed=7)
+    index = SpatialIndex(lats, lons, cell_km=1.0)
+    idx, _ = index.query([19.07], [72.87], 2)
+    expected_idx, _ = brute_force(lats, lons, [19.07], [72.87], 2)
+    np.testing.assert_array_equal(idx, expected_idx)
+
+
+def test_scalar_nearest_matches_query():
+    index = SpatialIndex.from_records(DELHI_INDUSTRIAL_HUBS)
+    qlats, qlons = random_points(1000, seed=3)
+    idx, _ = index.query(qlats, qlons, 1)
+    assert [index.nearest_index(lat, lon) for lat, lon in zip(qlats, qlons)] == idx[:, 0].tolist()
+    assert index.nearest_payload(28.5275, 77.2750)["name"] == "Okhla Industrial Area"
+
+
+def test_within_radius_matches_brute_force():
+    lats, lons = random_points(500, seed=11)
+    index = SpatialIndex(lats, lons, cell_km=2.0)
+    found = index.within_radius(28.6, 77.2, 7.5)
+    dist = haversine_km(28.6, 77.2, np.array(lats), np.array(lons))
+    assert sorted(i for i, _, _ in found) == sorted(np.flatnonzero(dist <= 7.5).tolist())
+    assert [d for _, _, d in found] == sorted(d for _, _, d in found)
+
+
+def test_empty_index():
+    index = SpatialIndex([], [])
+    assert index.nearest_payload(28.6, 77.2) is None
+    assert index.query([28.6], [77.2], 1)[0].shape == (1, 0)
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from departure_windows import HUB_TIMEZONE
+from truck_matching import TruckMatcher, TruckTrip, densify
+
+NARELA = {"lat": 28.8426, "lon": 77.0926}
+OKHLA = {"lat": 28.5275, "lon": 77.2750}
+# Points a few hundred metres off the Narela -> Okhla straight line
+PICKUP = {"lat": 28.7640, "lon": 77.1410}
+DROP = {"lat": 28.6060, "lon": 77.2290}
+# Trips are dropped once their window closes, so plan for tomorrow
+NINE_IST = (datetime.now(HUB_TIMEZONE) + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+
+
+def trip(trip_id="T1", departure=NINE_IST, origin=NARELA, destination=OKHLA, **kwargs):
+    path = densify([[origin["lon"], origin["lat"]], [destination["lon"], destination["lat"]]])
+    options = {"window_minutes": 60, "max_weight": 1000, "current_weight": 200, "info": {}, **kwargs}
+    return TruckTrip(trip_id, origin, destination, departure, path=path, distance_km=48, **options)
+
+
+@pytest.fixture
+def matcher():
+    return TruckMatcher(corridor_km=2.0, bucket_minutes=30)
+
+
+def test_trip_along_the_way_is_matched_with_savings(matcher):
+    matcher.add_trip(trip())
+    (match,) = matcher.match(PICKUP, DROP, weight=300, earliest=NINE_IST, flexibility_minutes=60)
+    assert match["trip_id"] == "T1"
+    assert match["remaining_weight"] == 800
+    assert 0 < match["estimated_cost"] and match["cost_savings"] > 0
+    # Too heavy, or going the other way
+    assert matcher.match(PICKUP, DROP, weight=900, earliest=NINE_IST) == []
+    assert matcher.match(DROP, PICKUP, weight=300, earliest=NINE_IST) == []
+
+
+def test_naive_and_offset_times_are_delhi_time(matcher):
+    matcher.add_trip(trip(departure=NINE_IST.astimezone(timezone.utc)))
+    assert matcher.trips["T1"].departure == NINE_IST
+    naive_nine = NINE_IST.replace(tzinfo=None)
+    assert matcher.match(PICKUP, DROP, 300, earliest=naive_nine, flexibility_minutes=30)
+    # The same wall-clock time read as UTC would be 14:30 in Delhi, after the truck has gone
+    assert not matcher.match(PICKUP, DROP, 300, earliest=naive_nine.replace(tzinfo=timezone.utc), flexibility_minutes=30)
+
+
+def test_trip_details_do_not_override_match_fields(matcher):
+    matcher.add_trip(trip(info={"company": "ABC", "trip_id": "spoof", "cost_savings": 1e9}))
+    (match,) = matcher.match(PICKUP, DROP, 300, earliest=NINE_IST)
+    assert match["company"] == "ABC"
+    assert match["trip_id"] == "T1"
+    assert match["cost_savings"] < 1e9
+
+
+def test_trips_are_dropped_once_their_window_closes(matcher):
+    now = datetime.now(HUB_TIMEZONE)
+    matcher.add_trip(trip("gone", departure=now - timedelta(minutes=90)))
+    matcher.add_trip(trip("leaving", departure=now - timedelta(minutes=30)))
+    matcher.add_trip(trip("later", departure=now + timedelta(hours=2)))
+    assert set(matcher.trips) == {"leaving", "later"}
+    assert matcher.expire(now.timestamp() + 31 * 60) == 1
+    assert set(matcher.trips) == {"later"}
+    # Replacing a trip with a later departure keeps it past the old window
+    matcher.add_trip(trip("later", departure=now + timedelta(hours=5)))
+    assert matcher.expire(now.timestamp() + 4 * 3600) == 0
+    assert matcher.stats()["expired"] == 2
+
+
+def test_corridor_covers_corridor_km_away_from_delhi(matcher):
+    north = {"lat": 60.10, "lon": 24.90}
+    south = {"lat": 60.40, "lon": 24.95}
+    matcher.add_trip(trip(origin=north, destination=south))
+    # 1.5 km east of the route, inside the 2 km corridor
+    pickup = {"lat": 60.20, "lon": 24.9167 + 0.027}
+    drop = {"lat": 60.35, "lon": 24.9417 + 0.027}
+    assert matcher.match(pickup, drop, 100, earliest=NINE_IST)
+
+
+def test_endpoint_matches_a_utc_trip_to_a_delhi_consignment(client):
+    geometry = {"type": "LineString", "coordinates": [[NARELA["lon"], NARELA["lat"]], [OKHLA["lon"], OKHLA["lat"]]]}
+    body = {"id": "T-api", "origin": NARELA, "destination": OKHLA, "max_weight": 1000, "geometry": geometry,
+            "departure_time": NINE_IST.astimezone(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "details": {"company": "ABC", "trip_id": "spoof"}}
+    assert client.post("/shared-trucks/trips", json=body).status_code == 200
+    try:
+        ready = NINE_IST.replace(tzinfo=None).isoformat()
+        response = client.post("/shared-trucks/match", json={"pickup": PICKUP, "drop": DROP, "weight": 300,
+                                                              "ready_time": ready, "flexibility_minutes": 30})
+        assert response.status_code == 200, response.text
+        (match,) = response.json()["matches"]
+        assert (match["trip_id"], match["company"]) == ("T-api", "ABC")
+        assert match["departure_time"] == NINE_IST.isoformat()
+    finally:
+        client.delete("/shared-trucks/trips/T-api")
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import vrp_solver
+from vrp_solver import VRPProblem
+
+INF = float("inf")
+
+
+def line_problem(demand, capacities, earliest=None, latest=None):
+    """Depot at 0 and stops along a line, one minute and one km per unit"""
+    positions = np.arange(len(demand), dtype=np.float64)
+    travel = np.abs(positions[:, None] - positions[None, :])
+    n = len(demand)
+    return VRPProblem(
+        travel, travel, travel, demand,
+        earliest=earliest or [0.0] * n, latest=latest or [INF] * n, service=[0.0] * n, capacities=capacities
+    )
+
+
+def test_every_stop_is_served_within_capacity():
+    problem = line_problem([0, 4, 4, 4, 4, 4, 4], capacities=[10, 10, 10])
+    solution = vrp_solver.solve(problem, time_budget_seconds=0.2, workers=1)
+    assert solution["unassigned"] == []
+    assert sorted(node for plan in solution["routes"] for node in plan["stops"]) == [1, 2, 3, 4, 5, 6]
+    assert all(plan["load"] <= 10 for plan in solution["routes"])
+    assert len(solution["routes"]) == 3
+
+
+def test_arrivals_wait_for_windows_and_unreachable_stops_are_left_out():
+    # Stop 2 opens at minute 30; stop 3 closes before anyone can reach it
+    problem = line_problem([0, 1, 1, 1], capacities=[10], earliest=[0, 0, 30, 0], latest=[INF, INF, INF, 1])
+    solution = vrp_solver.solve(problem, time_budget_seconds=0.2, workers=1)
+    assert solution["unassigned"] == [3]
+    (plan,) = solution["routes"]
+    arrivals = dict(zip(plan["stops"], plan["arrival_minutes"]))
+    assert arrivals[1] == pytest.approx(1)
+    assert arrivals[2] == pytest.approx(30)
+    assert plan["duration_minutes"] == pytest.approx(32)
+
+
+def test_endpoint_reads_stop_windows_in_delhi_time(client):
+    body = {
+        "depot": {"lat": 28.5275, "lon": 77.2750},
+        "stops": [{"id": "S1", "lat": 28.5300, "lon": 77.2800, "weight": 1, "window_start": "09:30", "service_minutes": 0}],
+        "vehicles": [{"id": "V1", "capacity": 10}],
+        "time_budget_seconds": 0.2,
+    }
+    arrivals = []
+    for departure in ("2026-03-01T03:30:00Z", "2026-03-01T09:00:00"):
+        response = client.post("/route/vrp", json={**body, "departure_time": departure})
+        assert response.status_code == 200, response.text
+        arrivals.append(response.json()["routes"][0]["arrival_minutes"])
+    # Leaving at 09:00 Delhi time, the 09:30 window opens 30 minutes in
+    assert arrivals == [[30.0], [30.0]]
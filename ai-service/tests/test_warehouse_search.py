@@ -0,0 +1,95 @@
+import random
+
+import numpy as np
+import pytest
+
+from spatial_index import haversine_km
+from warehouse_index import WarehouseIndex
+
+OKHLA = {"lat": 28.5275, "lon": 77.2750}
+
+
+@pytest.fixture
+def listings(client):
+    rng = random.Random(1)
+    warehouses = [
+        {
+            "id": f"W{i}",
+            "lat": OKHLA["lat"] + rng.uniform(-0.05, 0.05),
+            "lon": OKHLA["lon"] + rng.uniform(-0.05, 0.05),
+            "available_sqft": 1000,
+            "price_per_sqft_day": 30,
+        }
+        for i in range(500)
+    ]
+    assert client.post("/warehouses", json={"warehouses": warehouses}).status_code == 200
+    yield warehouses
+    for warehouse in warehouses:
+        client.delete(f"/warehouses/{warehouse['id']}")
+
+
+def search(client, **body):
+    response = client.post("/warehouses/search", json={"destination": OKHLA, **body})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_pages_walk_one_fixed_shortlist(client, listings, service):
+    first = search(client, page=1, limit=50)
+    pagination = first["pagination"]
+    assert pagination["matched"] == len(listings)
+    assert pagination["total"] == min(len(listings), service.WAREHOUSE_RANK_MAX)
+    assert pagination["pages"] == -(-pagination["total"] // 50)
+
+    seen = []
+    for page in range(1, pagination["pages"] + 2):
+        seen += [w["id"] for w in search(client, page=page, limit=50)["warehouses"]]
+    assert len(seen) == pagination["total"]
+    assert len(set(seen)) == len(seen)
+
+
+def test_repeated_search_returns_the_same_page(client, listings):
+    ids = lambda result: [w["id"] for w in result["warehouses"]]
+    assert ids(search(client, page=3, limit=20)) == ids(search(client, page=3, limit=20))
+
+
+def test_invalid_paging_is_rejected(client):
+    for body in ({"page": 0}, {"limit": 0}, {"limit": 500}):
+        response = client.post("/warehouses/search", json={"destination": OKHLA, **body})
+        assert response.status_code == 422
+
+
+@pytest.mark.parametrize("lat", [28.6, 60.0])
+def test_index_matches_brute_force_away_from_delhi(lat):
+    rng = np.random.default_rng(3)
+    lats, lons = lat + rng.uniform(-0.2, 0.2, 2000), 77.2 + rng.uniform(-0.4, 0.4, 2000)
+    index = WarehouseIndex(cell_km=1.0)
+    for i, (a, b) in enumerate(zip(lats, lons)):
+        index.upsert(f"W{i}", a, b, 1000, 30)
+    rows, dist = index.search([lat], [77.2], radius_km=8)
+    expected = np.flatnonzero(haversine_km(lats, lons, lat, 77.2) <= 8)
+    assert sorted(index.ids[r] for r in rows) == sorted(f"W{i}" for i in expected)
+    assert (np.diff(dist) >= 0).all()
+
+
+def test_details_do_not_override_indexed_fields(client):
+    listing = {"id": "W-real", "lat": OKHLA["lat"], "lon": OKHLA["lon"], "available_sqft": 1000, "price_per_sqft_day": 30,
+               "details": {"name": "Okhla cold store", "id": "W-spoof", "available_sqft": 99999}}
+    assert client.post("/warehouses", json={"warehouses": [listing]}).status_code == 200
+    try:
+        (found,) = [w for w in search(client, limit=50)["warehouses"] if w["name"] == "Okhla cold store"]
+        assert found["id"] == "W-real"
+        assert found["available_sqft"] == 1000
+    finally:
+        client.delete("/warehouses/W-real")
+
+
+def test_search_radius_is_bounded(client, service):
+    for radius in (0, -1, service.SEARCH_MAX_RADIUS_KM + 1, 1e9):
+        response = client.post("/warehouses/search", json={"destination": OKHLA, "radius_km": radius})
+        assert response.status_code == 422, radius
+        response = client.post("/industrial-hubs/nearest", json={"points": [OKHLA], "radius_km": radius})
+        assert response.status_code == 422, radius
+    response = client.post("/industrial-hubs/nearest", json={"points": [OKHLA], "radius_km": service.SEARCH_MAX_RADIUS_KM})
+    assert response.status_code == 200
+    assert search(client, radius_km=5)["pagination"]["matched"] == 0
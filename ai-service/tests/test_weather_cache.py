@@ -0,0 +1,47 @@
+import asyncio
+
+from weather_cache import WeatherCache
+
+
+def test_leader_cancellation_does_not_cancel_followers():
+    async def scenario():
+        calls = []
+        cache = WeatherCache(cell_size_deg=0.05, ttl_seconds=60)
+
+        async def fetch(lat, lon):
+            calls.append((lat, lon))
+            await asyncio.sleep(0.05)
+            return {"temperature": 30}
+
+        leader = asyncio.ensure_future(cache.get_or_fetch(28.61, 77.21, fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.get_or_fetch(28.611, 77.211, fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await follower
+        return result, calls, cache.peek(28.61, 77.21)
+
+    result, calls, cached = asyncio.run(scenario())
+    assert result == {"temperature": 30}
+    assert len(calls) == 1
+    assert cached == {"temperature": 30}
+
+
+def test_concurrent_misses_share_one_fetch_and_later_lookups_hit():
+    async def scenario():
+        calls = []
+        cache = WeatherCache(cell_size_deg=0.05, ttl_seconds=60)
+
+        async def fetch(lat, lon):
+            calls.append((lat, lon))
+            await asyncio.sleep(0.01)
+            return {"temperature": 30}
+
+        await asyncio.gather(*(cache.get_or_fetch(28.61, 77.21, fetch) for _ in range(4)))
+        await cache.get_or_fetch(28.62, 77.22, fetch)
+        return calls, cache.stats()
+
+    calls, stats = asyncio.run(scenario())
+    assert calls == [(28.625, 77.225)]
+    assert (stats["misses"], stats["shared_inflight"], stats["hits"]) == (1, 3, 1)
+    assert stats["hit_ratio"] == 0.8
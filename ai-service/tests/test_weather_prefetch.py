@@ -0,0 +1,44 @@
+import asyncio
+
+import weather_cache
+from weather_cache import WeatherCache
+from weather_prefetch import WeatherPrefetcher, tile_grid
+
+
+def prefetcher(cache, step_deg, **kwargs):
+    async def fetch(lat, lon):
+        return {"temperature": 30}
+
+    points = tile_grid((28.40, 28.90), (76.85, 77.55), step_deg)
+    return WeatherPrefetcher(cache, fetch, points, interval_seconds=480, rate_per_minute=25, batch_size=5,
+                             calls_per_fetch=2, calls_per_minute=30, calls_per_day=15000, **kwargs)
+
+
+def test_quota_stretched_rounds_keep_cells_until_the_next_round(monkeypatch):
+    cache = WeatherCache(cell_size_deg=0.05, ttl_seconds=600)
+    warm = prefetcher(cache, 0.05)
+    # 140 cells at two calls each fit 15000 calls a day only every 1612.8 s, well past the TTL
+    assert len(warm.cells) == 140
+    assert warm.interval_seconds == 1612.8
+    assert warm.hold_seconds >= warm.interval_seconds
+
+    async def no_wait(seconds):
+        pass
+
+    monkeypatch.setattr(asyncio, "sleep", no_wait)
+    asyncio.run(warm.refresh_once())
+    now = weather_cache.time.monotonic()
+    monkeypatch.setattr(weather_cache.time, "monotonic", lambda: now + warm.interval_seconds * 1.2)
+    assert all(cache.peek(*cache.cell_center(cell)) for cell in warm.cells)
+    # Cells fetched on the request path still expire after the TTL
+    cache.put((0, 0), {"temperature": 20})
+    monkeypatch.setattr(weather_cache.time, "monotonic", lambda: now + warm.interval_seconds * 1.2 + 601)
+    assert cache.peek(*cache.cell_center((0, 0))) is None
+
+
+
+def test_default_grid_is_refreshed_within_the_cache_ttl(service):
+    warm = service.weather_prefetcher
+    assert len(warm.cells) == 40
+    assert warm.interval_seconds == warm.configured_interval_seconds < service.weather_cache.ttl_seconds
+    assert warm.stats()["upstream_calls_per_day"] <= service.openweather_quota.per_day * service.WEATHER_PREFETCH_QUOTA_SHARE
@@ -0,0 +1,94 @@
+"""Train the fast-ETA model from logged upstream route responses.
+
+Reads the route log written by the service (ETA_TRAINING_LOG_PATH) and,
+optionally, the persistent route store, holds out a share of lanes, fits the
+model on the rest and prints its accuracy on the held-out lanes next to the
+baseline heuristic. The model and report are written to ETA_MODEL_PATH.
+
+    python train_eta.py --log route_log.jsonl
+    python train_eta.py --log route_log.jsonl --route-store route_cache.sqlite3 --holdout 0.2
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+
+import numpy as np
+
+from eta_model import COLUMNS, LANE_COLUMNS, WEATHER_COLUMNS, EtaFeatures, EtaModel, load_route_log
+from hubs import DELHI_INDUSTRIAL_HUBS
+
+
+def load_route_store(path: str, bucket_minutes: int):
+    """Stored routes as route-log columns; departure is the bucket midpoint and weather is unknown"""
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute("SELECT lane, bucket, data FROM routes").fetchall()
+    finally:
+        conn.close()
+    records = []
+    for lane, bucket, data in rows:
+        route = json.loads(data)
+        if not route.get("distance_km") or not route.get("estimated_time_minutes"):
+            continue
+        origin, destination = (tuple(map(float, end.split(","))) for end in lane.split("|"))
+        records.append((*origin, *destination, bucket * bucket_minutes + bucket_minutes / 2,
+                        route["distance_km"], route["estimated_time_minutes"]))
+    values = np.array(records, dtype=np.float64).reshape(-1, 7)
+    columns = {name: values[:, i] for i, name in enumerate(LANE_COLUMNS + ("minute_of_day",))}
+    columns.update({name: np.full(len(values), np.nan) for name in WEATHER_COLUMNS})
+    return columns, values[:, 5], values[:, 6]
+
+
+def holdout_mask(columns: dict, share: float) -> np.ndarray:
+    """Hold out whole lanes (origin/destination to ~100 m) so the report measures unseen trips"""
+    lanes = np.round(np.column_stack([columns[name] for name in LANE_COLUMNS]), 3)
+    buckets = np.array([
+        hashlib.blake2b(row.tobytes(), digest_size=4).digest()[0] / 256 for row in lanes
+    ])
+    return buckets < share
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--log", action="append", default=[], help="route log (JSON lines); repeatable")
+    parser.add_argument("--route-store", help="also train on routes in this route store")
+    parser.add_argument("--route-store-bucket-minutes", type=int, default=60)
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of lanes held out for the report")
+    parser.add_argument("--min-samples", type=int, default=50)
+    parser.add_argument("--out", default=os.getenv("ETA_MODEL_PATH", "eta_model.json"))
+    args = parser.parse_args()
+
+    sources = [load_route_log(args.log)] if args.log else []
+    if args.route_store:
+        sources.append(load_route_store(args.route_store, args.route_store_bucket_minutes))
+    if not sources:
+        parser.error("give at least one --log or --route-store")
+    columns = {name: np.concatenate([s[0][name] for s in sources]) for name in COLUMNS}
+    distance = np.concatenate([s[1] for s in sources])
+    minutes = np.concatenate([s[2] for s in sources])
+
+    test = holdout_mask(columns, args.holdout)
+    train = ~test
+    if train.sum() < args.min_samples or not test.any():
+        print(f"Not enough data: {int(train.sum())} training and {int(test.sum())} held-out routes", file=sys.stderr)
+        sys.exit(1)
+
+    model = EtaModel(EtaFeatures(DELHI_INDUSTRIAL_HUBS))
+    model.fit({k: v[train] for k, v in columns.items()}, distance[train], minutes[train])
+    report = model.evaluate({k: v[test] for k, v in columns.items()}, distance[test], minutes[test])
+    model.info["holdout"] = report
+    model.save(args.out)
+
+    print(f"trained on {int(train.sum())} routes, evaluated on {report['samples']} held-out routes")
+    print(f"{'':12}{'model MAE':>12}{'MAPE':>8}{'p90 APE':>9}{'baseline MAE':>15}{'MAPE':>8}{'p90 APE':>9}")
+    for target in ("minutes", "distance_km"):
+        m, b = report[target], report["baseline"][target]
+        print(f"{target:12}{m['mae']:>12}{m['mape']:>8.1%}{m['p90_ape']:>9.1%}{b['mae']:>15}{b['mape']:>8.1%}{b['p90_ape']:>9.1%}")
+    print(f"saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
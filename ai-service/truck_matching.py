@@ -0,0 +1,218 @@
+import heapq
+import math
+import time
+from datetime import datetime
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+from departure_windows import hub_local
+from spatial_index import degree_span, haversine_km, point_distance_km
+
+# Dedicated-vehicle cost and the share of it a consignment pays when riding along
+DEFAULT_RATE_PER_KM = 25.0
+SHARED_RATE_FRACTION = 0.6
+ROAD_DETOUR_FACTOR = 1.35
+SAMPLE_SPACING_KM = 0.5
+
+
+class TruckTrip:
+    def __init__(self, trip_id: str, origin: dict, destination: dict, departure: datetime,
+                 window_minutes: float, max_weight: float, current_weight: float,
+                 path: List[Tuple[float, float]], distance_km: float, info: dict = None):
+        self.id = trip_id
+        self.origin = origin
+        self.destination = destination
+        self.departure = hub_local(departure)
+        self.window_minutes = window_minutes
+        self.max_weight = max_weight
+        self.current_weight = current_weight
+        self.path = path  # densified (lat, lon) samples along the route
+        self.path_lat = np.array([p[0] for p in path])
+        self.path_lon = np.array([p[1] for p in path])
+        steps = haversine_km(self.path_lat[:-1], self.path_lon[:-1], self.path_lat[1:], self.path_lon[1:])
+        self.cum_km = np.concatenate([[0.0], np.cumsum(steps)])
+        self.distance_km = distance_km
+        self.info = info or {}
+        self.cells: Set[Tuple[int, int]] = set()
+        self.buckets: Set[int] = set()
+
+    @property
+    def remaining_weight(self) -> float:
+        return self.max_weight - self.current_weight
+
+    @property
+    def window_end(self) -> float:
+        """Epoch seconds after which the truck has left"""
+        return self.departure.timestamp() + self.window_minutes * 60
+
+
+def densify(coordinates: List[List[float]], spacing_km: float = SAMPLE_SPACING_KM) -> List[Tuple[float, float]]:
+    """(lat, lon) samples at most spacing_km apart along a GeoJSON [lon, lat] line"""
+    samples = [(coordinates[0][1], coordinates[0][0])]
+    for (lon1, lat1), (lon2, lat2) in zip(coordinates, coordinates[1:]):
+        steps = max(1, int(math.ceil(point_distance_km(lat1, lon1, lat2, lon2) / spacing_km)))
+        for s in range(1, steps + 1):
+            f = s / steps
+            samples.append((lat1 + (lat2 - lat1) * f, lon1 + (lon2 - lon1) * f))
+    return samples
+
+
+class TruckMatcher:
+    """Incremental index of live truck trips by route corridor and departure window.
+
+    A trip is registered in every grid cell within corridor_km of its route
+    and in every time bucket its departure window touches, so a consignment
+    only inspects trips whose corridor covers both its pickup and drop cells
+    and whose window overlaps its own.
+    """
+
+    def __init__(self, corridor_km: float = 2.0, bucket_minutes: int = 30,
+                 rate_per_km: float = DEFAULT_RATE_PER_KM):
+        self.corridor_km = corridor_km
+        self.bucket_minutes = bucket_minutes
+        self.rate_per_km = rate_per_km
+        self.trips: Dict[str, TruckTrip] = {}
+        self._by_cell: Dict[Tuple[int, int], Set[str]] = {}
+        self._by_bucket: Dict[int, Set[str]] = {}
+        # (window end, trip id) of every trip added; entries for replaced trips are skipped when they surface
+        self._expiry: List[Tuple[float, str]] = []
+        self.expired = 0
+        # Cells are corridor_km square at the latitude of the first trip; set by _grid
+        self._cell_lat = self._cell_lon = 0.0
+
+    def _grid(self, lat: float):
+        if not self._cell_lat:
+            self._cell_lat, self._cell_lon = degree_span(self.corridor_km, lat)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (int(math.floor(lat / self._cell_lat)), int(math.floor(lon / self._cell_lon)))
+
+    def _bucket_range(self, start: datetime, minutes: float) -> range:
+        first = int(start.timestamp() // 60 // self.bucket_minutes)
+        last = int((start.timestamp() // 60 + minutes) // self.bucket_minutes)
+        return range(first, last + 1)
+
+    def add_trip(self, trip: TruckTrip):
+        self.expire()
+        if trip.id in self.trips:
+            self.remove_trip(trip.id)
+        self._grid(float(trip.path_lat[0]))
+        # Buffer the corridor by registering each sample's cell neighbourhood; further from the equator
+        # than the grid's latitude, corridor_km spans more than one cell of longitude
+        _, span_lon = degree_span(self.corridor_km, float(np.abs(trip.path_lat).max()))
+        ring_x = int(math.ceil(span_lon / self._cell_lon))
+        cys = np.floor(trip.path_lat / self._cell_lat).astype(np.int64)
+        cxs = np.floor(trip.path_lon / self._cell_lon).astype(np.int64)
+        for cy, cx in set(zip(cys.tolist(), cxs.tolist())):
+            for dy in (-1, 0, 1):
+                for dx in range(-ring_x, ring_x + 1):
+                    trip.cells.add((cy + dy, cx + dx))
+        trip.buckets = set(self._bucket_range(trip.departure, trip.window_minutes))
+        for cell in trip.cells:
+            self._by_cell.setdefault(cell, set()).add(trip.id)
+        for bucket in trip.buckets:
+            self._by_bucket.setdefault(bucket, set()).add(trip.id)
+        self.trips[trip.id] = trip
+        heapq.heappush(self._expiry, (trip.window_end, trip.id))
+
+    def remove_trip(self, trip_id: str) -> bool:
+        trip = self.trips.pop(trip_id, None)
+        if trip is None:
+            return False
+        for cell in trip.cells:
+            ids = self._by_cell.get(cell)
+            if ids is not None:
+                ids.discard(trip_id)
+                if not ids:
+                    del self._by_cell[cell]
+        for bucket in trip.buckets:
+            ids = self._by_bucket.get(bucket)
+            if ids is not None:
+                ids.discard(trip_id)
+                if not ids:
+                    del self._by_bucket[bucket]
+        return True
+
+    def expire(self, now: float = None) -> int:
+        """Drop trips whose departure window has closed; returns how many were dropped"""
+        now = time.time() if now is None else now
+        dropped = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            window_end, trip_id = heapq.heappop(self._expiry)
+            trip = self.trips.get(trip_id)
+            if trip is not None and trip.window_end == window_end:
+                self.remove_trip(trip_id)
+                dropped += 1
+        self.expired += dropped
+        return dropped
+
+    def update_load(self, trip_id: str, current_weight: float) -> bool:
+        trip = self.trips.get(trip_id)
+        if trip is None:
+            return False
+        trip.current_weight = current_weight
+        return True
+
+    def _closest_sample(self, trip: TruckTrip, lat: float, lon: float, start: int = 0) -> Tuple[int, float]:
+        km = haversine_km(lat, lon, trip.path_lat[start:], trip.path_lon[start:])
+        best = int(np.argmin(km))
+        return start + best, float(km[best])
+
+    def match(self, pickup: dict, drop: dict, weight: float, earliest: datetime,
+              flexibility_minutes: float = 120, limit: int = 10) -> List[dict]:
+        """Rank trips that can carry weight from pickup to drop within the time window"""
+        self.expire()
+        if not self.trips:
+            return []
+        earliest = hub_local(earliest)
+        pickup_ids = self._by_cell.get(self._cell(pickup["lat"], pickup["lon"]))
+        drop_ids = self._by_cell.get(self._cell(drop["lat"], drop["lon"]))
+        if not pickup_ids or not drop_ids:
+            return []
+        candidates = pickup_ids & drop_ids
+        in_window: Set[str] = set()
+        for bucket in self._bucket_range(earliest, flexibility_minutes):
+            in_window |= self._by_bucket.get(bucket, set()) & candidates
+        if not in_window:
+            return []
+
+        solo_km = point_distance_km(pickup["lat"], pickup["lon"], drop["lat"], drop["lon"]) * ROAD_DETOUR_FACTOR
+        solo_cost = solo_km * self.rate_per_km
+        matches = []
+        for trip_id in in_window:
+            trip = self.trips[trip_id]
+            if trip.remaining_weight < weight:
+                continue
+            pick_at, pick_km = self._closest_sample(trip, pickup["lat"], pickup["lon"])
+            drop_at, drop_km = self._closest_sample(trip, drop["lat"], drop["lon"], pick_at)
+            if pick_km > self.corridor_km or drop_km > self.corridor_km:
+                continue
+            # Truck leaves its route to the pickup and the drop and comes back
+            detour_km = 2 * (pick_km + drop_km) * ROAD_DETOUR_FACTOR
+            carried_km = float(trip.cum_km[drop_at] - trip.cum_km[pick_at])
+            shared_cost = (carried_km * SHARED_RATE_FRACTION + detour_km) * self.rate_per_km
+            savings = solo_cost - shared_cost
+            if savings <= 0:
+                continue
+            matches.append({
+                **trip.info,
+                "trip_id": trip.id,
+                "detour_km": round(detour_km, 2),
+                "remaining_weight": round(trip.remaining_weight, 2),
+                "departure_time": trip.departure.isoformat(),
+                "estimated_cost": round(shared_cost, 2),
+                "cost_savings": round(savings, 2),
+                "cost_savings_percent": round(100 * savings / solo_cost, 1) if solo_cost else 0.0
+            })
+        # Cheapest for the shipper first; among equals prefer less detour, then more spare capacity
+        matches.sort(key=lambda m: (-m["cost_savings"], m["detour_km"], -m["remaining_weight"]))
+        return matches[:limit]
+
+    def stats(self) -> dict:
+        return {
+            "trips": len(self.trips),
+            "indexed_cells": len(self._by_cell),
+            "indexed_buckets": len(self._by_bucket),
+            "expired": self.expired
+        }
@@ -0,0 +1,347 @@
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Cost charged per stop that could not be placed on any vehicle, so restarts
+# that serve more stops always win
+UNASSIGNED_PENALTY = 1e6
+NEIGHBOURS = 12
+MAX_SEGMENT = 3
+SAVINGS_NOISE = 0.15
+EPS = 1e-9
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+
+
+class VRPProblem:
+    """Capacitated VRP with time windows; node 0 is the depot.
+
+    cost drives the search (it may fold risk into travel time), while
+    duration is used for schedules and distance for reporting. Time windows
+    are minutes after departure from the depot.
+    """
+
+    def __init__(self, cost: np.ndarray, duration: np.ndarray, distance: np.ndarray, demand: np.ndarray,
+                 earliest: np.ndarray, latest: np.ndarray, service: np.ndarray, capacities: List[float]):
+        self.n = len(demand)
+        self.cost = np.asarray(cost, dtype=np.float64)
+        self.duration = np.asarray(duration, dtype=np.float64)
+        self.distance = np.asarray(distance, dtype=np.float64)
+        self.demand = [float(d) for d in demand]
+        self.earliest = [float(e) for e in earliest]
+        self.latest = [float(x) for x in latest]
+        self.service = [float(s) for s in service]
+        self.capacities = [float(c) for c in capacities]
+
+
+class _Search:
+    """Construction + local search state for one restart"""
+
+    def __init__(self, problem: VRPProblem):
+        self.p = problem
+        self.c = problem.cost.tolist()
+        self.t = problem.duration.tolist()
+        order = np.argsort(problem.cost[1:, 1:] + problem.cost[1:, 1:].T, axis=1)
+        self.neighbours = [[int(j) + 1 for j in row if j + 1 != i + 1][:NEIGHBOURS] for i, row in enumerate(order)]
+        self.neighbours.insert(0, [])
+
+    def schedule_ok(self, route: List[int]) -> bool:
+        p, t_mat = self.p, self.t
+        now, prev = 0.0, 0
+        for node in route:
+            now += t_mat[prev][node]
+            if now < p.earliest[node]:
+                now = p.earliest[node]
+            if now > p.latest[node]:
+                return False
+            now += p.service[node]
+            prev = node
+        return True
+
+    def route_cost(self, route: List[int]) -> float:
+        c = self.c
+        total, prev = 0.0, 0
+        for node in route:
+            total += c[prev][node]
+            prev = node
+        return total + c[prev][0]
+
+    def load(self, route: List[int]) -> float:
+        return sum(self.p.demand[node] for node in route)
+
+    def clarke_wright(self, rng: random.Random, noise: float) -> List[List[int]]:
+        """Savings construction against the largest vehicle capacity"""
+        p = self.p
+        n = p.n
+        cap = max(p.capacities)
+        cost = p.cost
+        savings = cost[1:, :1] + cost[:1, 1:] - cost[1:, 1:]
+        if noise:
+            savings = savings * (1 + noise * np.random.default_rng(rng.randrange(2 ** 32)).random(savings.shape))
+        np.fill_diagonal(savings, -np.inf)
+        flat = np.argsort(-savings, axis=None)
+        flat = flat[savings.ravel()[flat] > 0]
+
+        routes: Dict[int, List[int]] = {}
+        loads: Dict[int, float] = {}
+        route_of = [0] * n
+        for node in range(1, n):
+            if p.demand[node] <= cap and self.schedule_ok([node]):
+                routes[node] = [node]
+                loads[node] = p.demand[node]
+                route_of[node] = node
+
+        m = n - 1
+        for k in flat.tolist():
+            i, j = k // m + 1, k % m + 1
+            ri, rj = route_of[i], route_of[j]
+            if not ri or not rj or ri == rj:
+                continue
+            a, b = routes[ri], routes[rj]
+            if a[-1] != i or b[0] != j or loads[ri] + loads[rj] > cap:
+                continue
+            merged = a + b
+            if not self.schedule_ok(merged):
+                continue
+            routes[ri] = merged
+            loads[ri] += loads.pop(rj)
+            del routes[rj]
+            for node in b:
+                route_of[node] = ri
+        return list(routes.values())
+
+    def assign(self, routes: List[List[int]]) -> Tuple[List[List[int]], List[int], List[int]]:
+        """Fit routes onto vehicles (largest load first, smallest vehicle that fits)"""
+        free = sorted(range(len(self.p.capacities)), key=lambda v: self.p.capacities[v])
+        assigned, vehicles, leftovers = [], [], []
+        for route in sorted(routes, key=self.load, reverse=True):
+            load = self.load(route)
+            fit = next((v for v in free if self.p.capacities[v] >= load), None)
+            if fit is None:
+                leftovers.extend(route)
+                continue
+            free.remove(fit)
+            assigned.append(route)
+            vehicles.append(fit)
+        placed = {node for route in assigned for node in route}
+        leftovers.extend(node for node in range(1, self.p.n) if node not in placed and node not in leftovers)
+        return assigned, vehicles, leftovers
+
+    def insert_leftovers(self, routes: List[List[int]], vehicles: List[int], leftovers: List[int]) -> List[int]:
+        """Cheapest feasible insertion of stops that did not fit anywhere"""
+        c = self.c
+        remaining = []
+        for node in leftovers:
+            best = None
+            for r, route in enumerate(routes):
+                if self.load(route) + self.p.demand[node] > self.p.capacities[vehicles[r]]:
+                    continue
+                path = [0] + route + [0]
+                for pos in range(len(path) - 1):
+                    delta = c[path[pos]][node] + c[node][path[pos + 1]] - c[path[pos]][path[pos + 1]]
+                    if best is None or delta < best[0]:
+                        candidate = route[:pos] + [node] + route[pos:]
+                        if self.schedule_ok(candidate):
+                            best = (delta, r, candidate)
+            if best is None:
+                remaining.append(node)
+            else:
+                routes[best[1]] = best[2]
+        return remaining
+
+    def two_opt(self, route: List[int], deadline: float) -> List[int]:
+        """Segment reversal with O(1) deltas from forward/backward prefix sums"""
+        c = self.c
+        improved = True
+        while improved and time.time() < deadline:
+            improved = False
+            path = [0] + route + [0]
+            fwd, rev = [0.0], [0.0]
+            for k in range(len(path) - 1):
+                fwd.append(fwd[-1] + c[path[k]][path[k + 1]])
+                rev.append(rev[-1] + c[path[k + 1]][path[k]])
+            for i in range(1, len(path) - 2):
+                for j in range(i + 1, len(path) - 1):
+                    before = c[path[i - 1]][path[i]] + (fwd[j] - fwd[i]) + c[path[j]][path[j + 1]]
+                    after = c[path[i - 1]][path[j]] + (rev[j] - rev[i]) + c[path[i]][path[j + 1]]
+                    if after < before - EPS:
+                        candidate = path[1:i] + path[i:j + 1][::-1] + path[j + 1:-1]
+                        if self.schedule_ok(candidate):
+                            route = candidate
+                            improved = True
+                            break
+                if improved:
+                    break
+        return route
+
+    def or_opt(self, routes: List[List[int]], vehicles: List[int], deadline: float) -> bool:
+        """Move segments of 1-3 stops next to a cost-neighbour, within or across routes"""
+        c, demand = self.c, self.p.demand
+        route_of, pos_of = {}, {}
+        for r, route in enumerate(routes):
+            for k, node in enumerate(route):
+                route_of[node], pos_of[node] = r, k
+        loads = [self.load(route) for route in routes]
+
+        moved = False
+        for seg_len in range(1, MAX_SEGMENT + 1):
+            for first in list(route_of):
+                if time.time() > deadline:
+                    return moved
+                ra, pa = route_of[first], pos_of[first]
+                a = routes[ra]
+                if pa + seg_len > len(a):
+                    continue
+                seg = a[pa:pa + seg_len]
+                seg_load = sum(demand[node] for node in seg)
+                prev_a = a[pa - 1] if pa > 0 else 0
+                next_a = a[pa + seg_len] if pa + seg_len < len(a) else 0
+                gain = c[prev_a][seg[0]] + c[seg[-1]][next_a] - c[prev_a][next_a]
+
+                for v in self.neighbours[first]:
+                    rb = route_of.get(v)
+                    if rb is None or v in seg:
+                        continue
+                    if rb != ra and loads[rb] + seg_load > self.p.capacities[vehicles[rb]]:
+                        continue
+                    b = routes[rb]
+                    pv = pos_of[v]
+                    for x, y, at in ((b[pv - 1] if pv > 0 else 0, v, pv), (v, b[pv + 1] if pv + 1 < len(b) else 0, pv + 1)):
+                        if x in seg or y in seg or (x == prev_a and y == next_a and rb == ra):
+                            continue
+                        delta = c[x][seg[0]] + c[seg[-1]][y] - c[x][y] - gain
+                        if delta >= -EPS:
+                            continue
+                        if rb == ra:
+                            rest = a[:pa] + a[pa + seg_len:]
+                            insert_at = at - seg_len if at > pa else at
+                            new_a = rest[:insert_at] + seg + rest[insert_at:]
+                            if not self.schedule_ok(new_a):
+                                continue
+                            routes[ra] = new_a
+                            changed = [ra]
+                        else:
+                            new_a = a[:pa] + a[pa + seg_len:]
+                            new_b = b[:at] + seg + b[at:]
+                            if not self.schedule_ok(new_a) or not self.schedule_ok(new_b):
+                                continue
+                            routes[ra], routes[rb] = new_a, new_b
+                            loads[ra] -= seg_load
+                            loads[rb] += seg_load
+                            changed = [ra, rb]
+                        for r in changed:
+                            for k, node in enumerate(routes[r]):
+                                route_of[node], pos_of[node] = r, k
+                        moved = True
+                        break
+                    else:
+                        continue
+                    break
+        return moved
+
+    def run(self, rng: random.Random, noise: float, deadline: float) -> Tuple[float, List[List[int]], List[int], List[int]]:
+        routes = self.clarke_wright(rng, noise)
+        routes, vehicles, leftovers = self.assign(routes)
+        leftovers = self.insert_leftovers(routes, vehicles, leftovers)
+        improved = True
+        while improved and time.time() < deadline:
+            routes = [self.two_opt(route, deadline) for route in routes]
+            improved = self.or_opt(routes, vehicles, deadline)
+        keep = [r for r, route in enumerate(routes) if route]
+        routes, vehicles = [routes[r] for r in keep], [vehicles[r] for r in keep]
+        total = sum(self.route_cost(route) for route in routes) + UNASSIGNED_PENALTY * len(leftovers)
+        return total, routes, vehicles, leftovers
+
+
+def _search_worker(problem: VRPProblem, seed: int, deadline: float):
+    """Randomized restarts until the deadline; the first restart is plain Clarke-Wright"""
+    search = _Search(problem)
+    rng = random.Random(seed)
+    best, restarts = None, 0
+    while True:
+        noise = 0.0 if seed == 0 and restarts == 0 else SAVINGS_NOISE
+        result = search.run(rng, noise, deadline)
+        restarts += 1
+        if best is None or result[0] < best[0]:
+            best = result
+        if time.time() >= deadline:
+            return best, restarts
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        shutdown_pool()
+        # spawn keeps workers independent of the server's threads and event loop
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _pool_workers = workers
+    return _pool
+
+
+def default_workers() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def warm_pool(workers: int):
+    """Start worker processes ahead of the first solve so spawn cost stays off the request path"""
+    if workers > 1:
+        pool = _get_pool(workers)
+        for f in [pool.submit(default_workers) for _ in range(workers)]:
+            f.result()
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def solve(problem: VRPProblem, time_budget_seconds: float = 3.0, workers: int = None) -> dict:
+    """Best solution found across parallel restarts within the time budget"""
+    workers = workers or default_workers()
+    deadline = time.time() + time_budget_seconds
+    if workers <= 1 or problem.n <= 3:
+        results = [_search_worker(problem, 0, deadline)]
+    else:
+        pool = _get_pool(workers)
+        results = [f.result() for f in [pool.submit(_search_worker, problem, seed, deadline) for seed in range(workers)]]
+
+    (total, routes, vehicles, leftovers), _ = min(results, key=lambda r: r[0][0])
+    duration = problem.duration.tolist()
+    distance = problem.distance.tolist()
+    plans = []
+    for route, vehicle in zip(routes, vehicles):
+        now, prev, km, arrivals = 0.0, 0, 0.0, []
+        for node in route:
+            now += duration[prev][node]
+            km += distance[prev][node]
+            now = max(now, problem.earliest[node])
+            arrivals.append(now)
+            now += problem.service[node]
+            prev = node
+        now += duration[prev][0]
+        km += distance[prev][0]
+        plans.append({
+            "vehicle": vehicle,
+            "stops": route,
+            "arrival_minutes": arrivals,
+            "load": sum(problem.demand[node] for node in route),
+            "distance_km": km,
+            "duration_minutes": now
+        })
+    return {
+        "routes": plans,
+        "unassigned": leftovers,
+        "cost": total - UNASSIGNED_PENALTY * len(leftovers),
+        "restarts": sum(r[1] for r in results)
+    }
@@ -0,0 +1,177 @@
+import math
+from bisect import bisect_right
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from spatial_index import degree_span, haversine_km
+
+# Upper edges of the price bands (INR per sq ft per day); the last band is open-ended
+DEFAULT_PRICE_BANDS = (20.0, 35.0, 50.0, 65.0, 80.0, 100.0, 150.0)
+DISTANCE_CHUNK = 4096
+
+
+class WarehouseIndex:
+    """Incremental index of micro-warehouse listings by grid cell and price band.
+
+    Each listing sits in one (cell, band) bucket, so a search only visits cells
+    within its radius and bands at or below its price cap. Available space
+    changes on every booking, so it is a column updated in place and filtered
+    over the candidates instead of being part of the bucket key.
+    """
+
+    def __init__(self, cell_km: float = 1.0, price_bands: Sequence[float] = DEFAULT_PRICE_BANDS,
+                 capacity: int = 1024):
+        self.cell_km = cell_km
+        self.price_bands = sorted(price_bands)
+        self.lats = np.zeros(capacity)
+        self.lons = np.zeros(capacity)
+        self.available = np.zeros(capacity)
+        self.prices = np.zeros(capacity)
+        self.ids: List[Optional[str]] = [None] * capacity
+        self.details: List[dict] = [{} for _ in range(capacity)]
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self._keys: Dict[int, Tuple[int, int, int]] = {}
+        self._buckets: Dict[Tuple[int, int, int], Set[int]] = {}
+        self.updates = 0
+        # Cells are cell_km square at the latitude of the first listing; set by _grid
+        self._cell_lat = self._cell_lon = 0.0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (int(math.floor(lat / self._cell_lat)), int(math.floor(lon / self._cell_lon)))
+
+    def _grid(self, lat: float):
+        if not self._cell_lat:
+            self._cell_lat, self._cell_lon = degree_span(self.cell_km, lat)
+
+    def _band(self, price: float) -> int:
+        return bisect_right(self.price_bands, price)
+
+    def _grow(self):
+        size = len(self.ids)
+        for name in ("lats", "lons", "available", "prices"):
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(size)]))
+        self.ids.extend([None] * size)
+        self.details.extend({} for _ in range(size))
+        self._free.extend(range(2 * size - 1, size - 1, -1))
+
+    def _place(self, row: int):
+        key = (*self._cell(self.lats[row], self.lons[row]), self._band(self.prices[row]))
+        old = self._keys.get(row)
+        if old == key:
+            return
+        if old is not None:
+            self._unplace(row)
+        self._keys[row] = key
+        self._buckets.setdefault(key, set()).add(row)
+
+    def _unplace(self, row: int):
+        key = self._keys.pop(row)
+        rows = self._buckets[key]
+        rows.discard(row)
+        if not rows:
+            del self._buckets[key]
+
+    def upsert(self, warehouse_id: str, lat: float, lon: float, available_sqft: float,
+               price_per_sqft_day: float, details: dict = None):
+        row = self._rows.get(warehouse_id)
+        if row is None:
+            self._grid(lat)
+            if not self._free:
+                self._grow()
+            row = self._free.pop()
+            self._rows[warehouse_id] = row
+            self.ids[row] = warehouse_id
+        self.lats[row], self.lons[row] = lat, lon
+        self.available[row] = available_sqft
+        self.prices[row] = price_per_sqft_day
+        self.details[row] = details or {}
+        self._place(row)
+        self.updates += 1
+
+    def update_availability(self, warehouse_id: str, available_sqft: Optional[float] = None,
+                            price_per_sqft_day: Optional[float] = None) -> bool:
+        row = self._rows.get(warehouse_id)
+        if row is None:
+            return False
+        if available_sqft is not None:
+            self.available[row] = available_sqft
+        if price_per_sqft_day is not None:
+            self.prices[row] = price_per_sqft_day
+            self._place(row)
+        self.updates += 1
+        return True
+
+    def remove(self, warehouse_id: str) -> bool:
+        row = self._rows.pop(warehouse_id, None)
+        if row is None:
+            return False
+        self._unplace(row)
+        self.ids[row] = None
+        self.details[row] = {}
+        self._free.append(row)
+        self.updates += 1
+        return True
+
+    def search(self, lats: Sequence[float], lons: Sequence[float], radius_km: float, min_sqft: float = 0,
+               max_price: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows within radius_km of any anchor point that have the space and price, as (rows, distance_km), closest first"""
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        if not len(self) or not len(lats):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        max_band = self._band(max_price) if max_price is not None else len(self.price_bands)
+        # The radius spans more longitude cells where it reaches further from the equator than the grid's latitude
+        span_lat, _ = degree_span(radius_km, 0.0)
+        _, span_lon = degree_span(radius_km, float(np.abs(lats).max()) + span_lat)
+        ring_y = int(math.ceil(span_lat / self._cell_lat))
+        ring_x = int(math.ceil(span_lon / self._cell_lon))
+        anchor_cells = set(zip(
+            np.floor(lats / self._cell_lat).astype(np.int64).tolist(),
+            np.floor(lons / self._cell_lon).astype(np.int64).tolist()
+        ))
+        cells = {(cy + dy, cx + dx) for cy, cx in anchor_cells
+                 for dy in range(-ring_y, ring_y + 1) for dx in range(-ring_x, ring_x + 1)}
+        rows: Set[int] = set()
+        for cy, cx in cells:
+            for band in range(max_band + 1):
+                bucket = self._buckets.get((cy, cx, band))
+                if bucket:
+                    rows |= bucket
+        cand = np.fromiter(rows, dtype=np.int64, count=len(rows))
+        keep = self.available[cand] >= min_sqft
+        if max_price is not None:
+            keep &= self.prices[cand] <= max_price
+        cand = cand[keep]
+
+        dist = np.empty(len(cand))
+        for start in range(0, len(cand), DISTANCE_CHUNK):
+            part = cand[start:start + DISTANCE_CHUNK]
+            dist[start:start + len(part)] = haversine_km(
+                self.lats[part][:, None], self.lons[part][:, None], lats[None, :], lons[None, :]
+            ).min(axis=1)
+        within = dist <= radius_km
+        cand, dist = cand[within], dist[within]
+        order = np.argsort(dist, kind="stable")
+        return cand[order], dist[order]
+
+    def listing(self, row: int) -> dict:
+        # Free-form details never override the indexed fields
+        return {
+            **self.details[row],
+            "id": self.ids[row],
+            "coordinates": {"lat": float(self.lats[row]), "lon": float(self.lons[row])},
+            "available_sqft": float(self.available[row]),
+            "price_per_sqft_day": float(self.prices[row])
+        }
+
+    def stats(self) -> dict:
+        return {
+            "warehouses": len(self),
+            "indexed_buckets": len(self._buckets),
+            "updates": self.updates
+        }
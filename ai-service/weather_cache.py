@@ -0,0 +1,88 @@
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from coalescing import RequestCoalescer
+
+Cell = Tuple[int, int]
+
+
+class WeatherCache:
+    """TTL + LRU cache for weather keyed on a quantized lat/lon grid cell.
+
+    Entries live for ttl_seconds unless installed with a longer hold, as the
+    prefetcher does when its rounds are further apart than the TTL.
+    Concurrent misses for the same cell share a single in-flight fetch
+    through a RequestCoalescer keyed on the cell.
+    """
+
+    def __init__(self, cell_size_deg: float = 0.05, ttl_seconds: float = 600, max_entries: int = 1024):
+        self.cell_size_deg = cell_size_deg
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Cell, Tuple[float, dict]]" = OrderedDict()  # cell -> (expires at, value)
+        self._fetches = RequestCoalescer()
+        self.hits = 0
+        self.evictions = 0
+
+    def cell_for(self, lat: float, lon: float) -> Cell:
+        """Snap coordinates onto the cache grid"""
+        return (int(lat // self.cell_size_deg), int(lon // self.cell_size_deg))
+
+    def cell_center(self, cell: Cell) -> Tuple[float, float]:
+        """Representative coordinates used when fetching a cell"""
+        return (
+            round((cell[0] + 0.5) * self.cell_size_deg, 4),
+            round((cell[1] + 0.5) * self.cell_size_deg, 4)
+        )
+
+    def peek(self, lat: float, lon: float) -> Optional[dict]:
+        """Return a fresh cached value without fetching or touching counters"""
+        entry = self._entries.get(self.cell_for(lat, lon))
+        if entry and time.monotonic() < entry[0]:
+            return dict(entry[1])
+        return None
+
+    def put(self, cell: Cell, value: dict, ttl_seconds: float = None):
+        self._entries[cell] = (time.monotonic() + (ttl_seconds or self.ttl_seconds), value)
+        self._entries.move_to_end(cell)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_fetch(self, lat: float, lon: float, fetch: Callable[[float, float], Awaitable[dict]]) -> dict:
+        """Return cached weather for the cell containing (lat, lon), fetching it on a miss"""
+        cell = self.cell_for(lat, lon)
+        entry = self._entries.get(cell)
+        if entry and time.monotonic() < entry[0]:
+            self._entries.move_to_end(cell)
+            self.hits += 1
+            return dict(entry[1])
+        return dict(await self._fetches.run(cell, lambda: self._fetch(cell, fetch)))
+
+    async def _fetch(self, cell: Cell, fetch: Callable[[float, float], Awaitable[dict]]) -> dict:
+        value = await fetch(*self.cell_center(cell))
+        self.put(cell, value)
+        return value
+
+    def put_many(self, values: Dict[Cell, dict], ttl_seconds: float = None):
+        """Install a batch of fresh values in one step, so readers never see a half-applied refresh"""
+        for cell, value in values.items():
+            self.put(cell, value, ttl_seconds)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        misses, shared = self._fetches.computed, self._fetches.coalesced
+        lookups = self.hits + misses + shared
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": misses,
+            "shared_inflight": shared,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + shared) / lookups, 4) if lookups else 0.0,
+            "ttl_seconds": self.ttl_seconds,
+            "cell_size_deg": self.cell_size_deg
+        }
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from weather_cache import Cell, WeatherCache
+
+logger = logging.getLogger("cargocrazee.weather_prefetch")
+
+
+def tile_grid(lat_range: Tuple[float, float], lon_range: Tuple[float, float], step_deg: float) -> List[Tuple[float, float]]:
+    """Tile centres covering a lat/lon box"""
+    rows = max(1, int(round((lat_range[1] - lat_range[0]) / step_deg)))
+    cols = max(1, int(round((lon_range[1] - lon_range[0]) / step_deg)))
+    return [
+        (round(lat_range[0] + (r + 0.5) * step_deg, 4), round(lon_range[0] + (c + 0.5) * step_deg, 4))
+        for r in range(rows) for c in range(cols)
+    ]
+
+
+class WeatherPrefetcher:
+    """Keeps the weather cache warm for a fixed set of locations.
+
+    Every interval the cells covering the locations are refetched in small
+    concurrent batches, paced to stay under rate_per_minute with jitter so
+    several workers do not hit the upstream in lockstep. Each batch is
+    installed into the cache in one step once all of its fetches finish.
+
+    Given an upstream call budget (calls_per_fetch upstream calls per cell),
+    the pace and interval are stretched so a day of rounds fits in it.
+    Prefetched cells are held in the cache until the next round has had
+    time to refresh them, even when that outlasts the cache TTL.
+    Fetches that throttled() says were refused for quota are counted apart
+    from failures.
+    """
+
+    def __init__(self, cache: WeatherCache, fetch: Callable[[float, float], Awaitable[dict]],
+                 points: Iterable[Tuple[float, float]], interval_seconds: float = 480,
+                 rate_per_minute: float = 30, batch_size: int = 5, jitter: float = 0.2,
+                 calls_per_fetch: float = 1, calls_per_minute: float = 0, calls_per_day: float = 0,
+                 throttled: Callable[[Exception], bool] = lambda e: False):
+        self.cache = cache
+        self.fetch = fetch
+        self.cells: List[Cell] = list(dict.fromkeys(cache.cell_for(lat, lon) for lat, lon in points))
+        self.configured_interval_seconds = interval_seconds
+        if calls_per_minute > 0:
+            rate_per_minute = min(rate_per_minute, calls_per_minute / calls_per_fetch)
+        if calls_per_day > 0:
+            interval_seconds = max(interval_seconds, 86400.0 * len(self.cells) * calls_per_fetch / calls_per_day)
+        self.interval_seconds = interval_seconds
+        self.rate_per_minute = rate_per_minute
+        self.calls_per_fetch = calls_per_fetch
+        self.throttled = throttled
+        self.batch_size = max(1, batch_size)
+        self.jitter = jitter
+        # Longest gap between two refreshes of one cell: a jittered interval, plus the cell sliding later in
+        # its round as the paced batches ahead of it are jittered
+        round_seconds = 60.0 * len(self.cells) / self.rate_per_minute
+        self.hold_seconds = max(cache.ttl_seconds, max(interval_seconds, round_seconds) * (1 + jitter) + round_seconds * jitter)
+        self.rounds = 0
+        self.fetched = 0
+        self.failed = 0
+        self.throttled_fetches = 0
+        self.last_throttled_at: Optional[str] = None
+        self.last_round_seconds = 0.0
+        self.last_round_at = None
+
+    def _jittered(self, seconds: float) -> float:
+        return seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _fetch_cell(self, cell: Cell):
+        return cell, await self.fetch(*self.cache.cell_center(cell))
+
+    async def refresh_once(self) -> int:
+        """Refetch every cell once; returns how many were refreshed"""
+        start = time.monotonic()
+        refreshed = 0
+        throttled = 0
+        pause = 60.0 * self.batch_size / self.rate_per_minute
+        for i in range(0, len(self.cells), self.batch_size):
+            if i:
+                await asyncio.sleep(self._jittered(pause))
+            results = await asyncio.gather(
+                *(self._fetch_cell(cell) for cell in self.cells[i:i + self.batch_size]),
+                return_exceptions=True
+            )
+            batch: Dict[Cell, dict] = {}
+            for result in results:
+                if isinstance(result, Exception):
+                    # Keep serving the previous snapshot for this cell until the next round
+                    if self.throttled(result):
+                        throttled += 1
+                    else:
+                        self.failed += 1
+                    continue
+                batch[result[0]] = result[1]
+            self.cache.put_many(batch, self.hold_seconds)
+            refreshed += len(batch)
+        self.fetched += refreshed
+        self.rounds += 1
+        if throttled:
+            self.throttled_fetches += throttled
+            self.last_throttled_at = datetime.now().isoformat()
+            logger.warning("Weather prefetch throttled by the upstream quota", extra={"fields": {
+                "cells": len(self.cells), "throttled": throttled, "refreshed": refreshed
+            }})
+        self.last_round_seconds = time.monotonic() - start
+        self.last_round_at = datetime.now().isoformat()
+        return refreshed
+
+    async def run(self):
+        # Spread worker start-up so replicas do not refresh in lockstep
+        await asyncio.sleep(random.uniform(0, min(5.0, self.interval_seconds * self.jitter)))
+        if self.interval_seconds > self.configured_interval_seconds:
+            logger.warning("Weather prefetch interval stretched to fit the upstream quota", extra={"fields": {
+                "cells": len(self.cells), "configured_seconds": self.configured_interval_seconds,
+                "interval_seconds": round(self.interval_seconds, 1),
+                "cache_ttl_seconds": self.cache.ttl_seconds
+            }})
+        while True:
+            started = time.monotonic()
+            try:
+                refreshed = await self.refresh_once()
+                logger.info("Weather prefetch round complete", extra={"fields": {
+                    "cells": len(self.cells), "refreshed": refreshed, "seconds": round(self.last_round_seconds, 2)
+                }})
+            except Exception:
+                logger.exception("Weather prefetch round failed")
+            await asyncio.sleep(max(0.0, self._jittered(self.interval_seconds) - (time.monotonic() - started)))
+
+    def stats(self) -> dict:
+        return {
+            "cells": len(self.cells),
+            "rounds": self.rounds,
+            "fetched": self.fetched,
+            "failed": self.failed,
+            "throttled": self.throttled_fetches,
+            "last_throttled_at": self.last_throttled_at,
+            "interval_seconds": round(self.interval_seconds, 1),
+            "configured_interval_seconds": self.configured_interval_seconds,
+            "rate_per_minute": round(self.rate_per_minute, 2),
+            "hold_seconds": round(self.hold_seconds, 1),
+            "upstream_calls_per_day": round(86400.0 / self.interval_seconds * len(self.cells) * self.calls_per_fetch),
+            "last_round_seconds": round(self.last_round_seconds, 2),
+            "last_round_at": self.last_round_at
+        }